@@ -0,0 +1,117 @@
+import argparse
+import csv
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from simulator import Simulation, SIMULATION_START_CONFIG, BLOB_CONFIG, FOOD_CONFIG
+
+# Per-frame statistics that get aggregated across replicates (everything except the frame number itself)
+AGGREGATED_STATISTICS = (
+    "blob_count",
+    "blob_avg_speed", "blob_min_speed", "blob_max_speed",
+    "blob_avg_size", "blob_min_size", "blob_max_size",
+    "blob_avg_energy", "blob_min_energy", "blob_max_energy",
+    "food_count", "num_offsprings", "num_mutations"
+)
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def replicate_seeds(master_seed, n_replicates):
+    '''Returns n_replicates independent 32 bit seeds derived from master_seed (random if None)'''
+    return [int(seed) for seed in np.random.SeedSequence(master_seed).generate_state(n_replicates)]
+
+def run_replicate(seed, max_frames, stop_on_extinction=True,
+                  start_config=SIMULATION_START_CONFIG, blob_config=BLOB_CONFIG, food_config=FOOD_CONFIG):
+    """
+    Runs one headless simulation seeded with seed and returns its statistics_log.
+    Stops after max_frames frames, or as soon as every blob has died if stop_on_extinction.
+    """
+    simulation = Simulation(start_config, blob_config, food_config, seed=seed)
+    simulation.populate()
+
+    while simulation.frame_count < max_frames:
+        statistics = simulation.step()
+        if stop_on_extinction and statistics["blob_count"] == 0:
+            break
+
+    return simulation.statistics_log
+
+def run_batch(n_replicates, max_frames, master_seed=None, workers=None, stop_on_extinction=True,
+              start_config=SIMULATION_START_CONFIG, blob_config=BLOB_CONFIG, food_config=FOOD_CONFIG):
+    """
+    Runs n_replicates independent seeded replicates across a process pool.
+    Returns a list of (seed, statistics_log) in replicate order.
+    """
+    seeds = replicate_seeds(master_seed, n_replicates)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_replicate, seed, max_frames, stop_on_extinction, start_config, blob_config, food_config)
+            for seed in seeds
+        ]
+        return [(seed, future.result()) for seed, future in zip(seeds, futures)]
+
+def aggregate_statistics(statistics_logs, quantiles=DEFAULT_QUANTILES):
+    """
+    Aggregates per-frame statistics across replicates. Returns one dict per frame with the number of
+    replicates still running plus mean, std and quantiles of every statistic in AGGREGATED_STATISTICS.
+
+    Replicates that stopped early (extinction) count as 0 blobs for blob_count afterwards and are left
+    out of every other statistic for those frames.
+    """
+    n_frames = max(len(log) for log in statistics_logs)
+    n_replicates = len(statistics_logs)
+
+    rows = []
+    for frame in range(n_frames):
+        rows.append({"frame": frame, "replicates_running": sum(frame < len(log) for log in statistics_logs)})
+
+    for statistic in AGGREGATED_STATISTICS:
+        values = np.full((n_replicates, n_frames), np.nan)
+        for replicate, log in enumerate(statistics_logs):
+            values[replicate, :len(log)] = [np.nan if entry[statistic] is None else entry[statistic] for entry in log]
+            if statistic == "blob_count":
+                values[replicate, len(log):] = 0
+
+        has_values = ~np.isnan(values).all(axis=0)
+        means = np.full(n_frames, np.nan)
+        stds = np.full(n_frames, np.nan)
+        quantile_values = np.full((len(quantiles), n_frames), np.nan)
+        means[has_values] = np.nanmean(values[:, has_values], axis=0)
+        stds[has_values] = np.nanstd(values[:, has_values], axis=0)
+        quantile_values[:, has_values] = np.nanquantile(values[:, has_values], quantiles, axis=0)
+
+        for frame, row in enumerate(rows):
+            row[f"{statistic}_mean"] = means[frame]
+            row[f"{statistic}_std"] = stds[frame]
+            for quantile, quantile_row in zip(quantiles, quantile_values):
+                row[f"{statistic}_q{round(quantile * 100):02d}"] = quantile_row[frame]
+
+    return rows
+
+def save_rows_to_csv(rows, filename):
+    """Saves a list of dicts (all with the same keys) to a CSV file, creating its directory if needed."""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    temporary_filename = filename + ".tmp"
+    with open(temporary_filename, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temporary_filename, filename) # Atomic, so readers never see a half-written file
+    print(f"Batch statistics saved to {filename}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded simulation replicates in parallel and aggregate their statistics.")
+    parser.add_argument("--replicates", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=5000, help="Frame budget per replicate")
+    parser.add_argument("--seed", type=int, default=None, help="Master seed every replicate seed is derived from")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--no-extinction-stop", action="store_true", help="Keep stepping replicates after all blobs die")
+    parser.add_argument("--output", default=f"data/batch_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    args = parser.parse_args()
+
+    results = run_batch(args.replicates, args.frames, args.seed, args.workers, not args.no_extinction_stop)
+    save_rows_to_csv(aggregate_statistics([log for _, log in results]), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from profiling import BLOB_PHASES, COUNTERS
+from simulator import Simulation, SIMULATION_START_CONFIG, BLOB_CONFIG, FOOD_CONFIG, ARENA_WIDTH, ARENA_HEIGHT
+
+# FrameProfiler phases timed inside Simulation.step (render/flip/idle only happen with a renderer).
+# blob_update is reported both as a whole and split into BLOB_PHASES
+PHASES = ("spawn", "shuffle", "blob_update") + BLOB_PHASES + ("stats",)
+DEFAULT_BLOB_COUNTS = (10, 100, 1000, 10000)
+DEFAULT_FOOD_COUNTS = (50, 500, 5000)
+
+
+def build_simulation(n_blobs, n_foods, seed, width=ARENA_WIDTH, height=ARENA_HEIGHT):
+    '''Returns a populated Simulation with n_blobs blobs and n_foods foods (created through generate_blob/generate_food)'''
+    start_config = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=n_blobs, N_STARTING_FOOD=n_foods)
+    simulation = Simulation(start_config, copy.deepcopy(BLOB_CONFIG), copy.deepcopy(FOOD_CONFIG), width, height,
+                            keep_statistics_log=False, seed=seed)
+    simulation.populate()
+    return simulation
+
+def benchmark_case(n_blobs, n_foods, frames, seed, width=ARENA_WIDTH, height=ARENA_HEIGHT):
+    """
+    Benchmarks one world size by stepping it with the real Simulation.step, profiler on. Returns a dict with
+    frames/sec, and per step phase (as timed by the FrameProfiler, including the BLOB_PHASES split of
+    blob_update) seconds and ns per blob alive at the start of the frame, plus the profiler counters
+    summed over all frames.
+    """
+    simulation = build_simulation(n_blobs, n_foods, seed, width, height)
+    profiler = simulation.profiler
+    profiler.enabled = True
+    timings = dict.fromkeys(PHASES, 0.0)
+    counters = dict.fromkeys(COUNTERS, 0)
+    blobs_processed = 0
+    step_seconds = 0.0
+    for _ in range(frames):
+        blobs_processed += len(simulation.blobs)
+        start = time.perf_counter()
+        simulation.step()
+        step_seconds += time.perf_counter() - start
+        phase_times, frame_counters, _ = profiler.last_frame
+        for phase in PHASES:
+            timings[phase] += phase_times[phase]
+        for counter in COUNTERS:
+            counters[counter] += frame_counters[counter]
+
+    return {
+        "blobs": n_blobs,
+        "foods": n_foods,
+        "frames": frames,
+        "frames_per_second": frames / step_seconds if step_seconds else None,
+        "ms_per_frame": step_seconds / frames * 1000,
+        "phases": {
+            phase: {
+                "seconds": timings[phase],
+                "ns_per_entity": timings[phase] / blobs_processed * 1e9 if blobs_processed else None
+            }
+            for phase in PHASES
+        },
+        "counters": counters
+    }
+
+def run_benchmarks(blob_counts, food_counts, frames, seed, width=ARENA_WIDTH, height=ARENA_HEIGHT):
+    '''Runs benchmark_case for every (blob count, food count) pair and returns the results together with run metadata'''
+    cases = []
+    for n_blobs in blob_counts:
+        for n_foods in food_counts:
+            case = benchmark_case(n_blobs, n_foods, frames, seed, width, height)
+            print(format_case(case))
+            cases.append(case)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "arena": [width, height],
+        "cases": cases
+    }
+
+def format_case(case):
+    phases = "  ".join(f"{phase} {values['ns_per_entity']:.0f}ns" for phase, values in case["phases"].items() if values["ns_per_entity"] is not None)
+    return f"blobs {case['blobs']:>7}  foods {case['foods']:>7}  {case['frames_per_second']:9.1f} fps  {case['ms_per_frame']:9.3f} ms/frame  |  {phases}"
+
+def compare_results(baseline, current, tolerance=0.25):
+    '''Prints the ms/frame change of every case in current against the same case in baseline, flagging slowdowns beyond tolerance'''
+    baseline_cases = {(case["blobs"], case["foods"]): case for case in baseline["cases"]}
+    regressions = 0
+    for case in current["cases"]:
+        old_case = baseline_cases.get((case["blobs"], case["foods"]))
+        if old_case is None:
+            continue
+        ratio = case["ms_per_frame"] / old_case["ms_per_frame"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"blobs {case['blobs']:>7}  foods {case['foods']:>7}  {old_case['ms_per_frame']:9.3f} -> {case['ms_per_frame']:9.3f} ms/frame  (x{ratio:.2f}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark how the simulation step scales with the number of blobs and foods.")
+    parser.add_argument("--blobs", type=int, nargs="+", default=DEFAULT_BLOB_COUNTS)
+    parser.add_argument("--foods", type=int, nargs="+", default=DEFAULT_FOOD_COUNTS)
+    parser.add_argument("--frames", type=int, default=20, help="Frames timed per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, default=ARENA_WIDTH, help="Arena width")
+    parser.add_argument("--height", type=int, default=ARENA_HEIGHT, help="Arena height")
+    parser.add_argument("--output", default=f"data/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument("--compare", help="Earlier benchmark JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative ms/frame slowdown reported as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.blobs, args.foods, args.frames, args.seed, args.width, args.height)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"Benchmark results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            if compare_results(json.load(file), results, args.tolerance):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
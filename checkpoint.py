@@ -0,0 +1,96 @@
+import os
+import pickle
+import queue
+import threading
+import zlib
+
+# File layout: MAGIC, then one version byte, then the zlib compressed pickle of the state dict
+MAGIC = b"SOTFCKPT"
+VERSION = 1
+COMPRESSION_LEVEL = 1 # Checkpoints are written often and read rarely, so favour speed
+
+
+def pack_checkpoint(pickled_state):
+    '''Returns the checkpoint file contents for a pickled Simulation.get_state() dict'''
+    return MAGIC + bytes([VERSION]) + zlib.compress(pickled_state, COMPRESSION_LEVEL)
+
+def write_atomic(filename, data):
+    '''Writes data to filename so that the file is always either the old or the complete new checkpoint'''
+    temporary_filename = filename + ".tmp"
+    with open(temporary_filename, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno()) # On disk before the rename, so a crash can not leave a renamed but empty file
+    os.replace(temporary_filename, filename)
+
+def load_state(filename):
+    '''Returns the state dict stored in a checkpoint file'''
+    with open(filename, "rb") as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{filename} is not a simulation checkpoint")
+    version = data[len(MAGIC)]
+    if version != VERSION:
+        raise ValueError(f"{filename} is a version {version} checkpoint, this code reads version {VERSION}")
+    return pickle.loads(zlib.decompress(data[len(MAGIC) + 1:]))
+
+def load_simulation(filename):
+    '''Returns a Simulation restored from a checkpoint file, ready to continue where the checkpoint was taken'''
+    from simulator import Simulation
+    return Simulation.from_state(load_state(filename))
+
+class CheckpointWriter:
+    """
+    Simulation observer that saves the full world state (including every RNG stream) to filename every
+    interval frames. Resuming from it with load_simulation continues bit-identically to a run that was
+    never interrupted. The state is taken in on_frame_end, after the frame is complete and frame_count
+    counts it, so a checkpoint saved at frame_count n resumes by stepping frame n. A crash or Ctrl+C loses
+    at most the frames since the last checkpoint.
+
+    The simulation thread only pickles the state (a consistent copy of the world at the end of the
+    frame). Compression and the atomic write happen on a background thread. If the previous checkpoint
+    is still being written, the new one is skipped (counted in skipped_checkpoints) rather than stalling
+    the step loop; the file on disk always holds the last complete checkpoint.
+    """
+
+    def __init__(self, filename, interval):
+        self.filename = filename
+        self.interval = interval
+        self.skipped_checkpoints = 0
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+
+        self.pending = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self.write_pending, daemon=True)
+        self.thread.start()
+
+    def on_step(self, simulation, statistics):
+        pass
+
+    def on_frame_end(self, simulation):
+        # Called once the frame is complete, so the saved state resumes at the next frame as it is
+        if simulation.frame_count % self.interval:
+            return
+        if self.pending.full():
+            self.skipped_checkpoints += 1
+            return
+
+        state = simulation.get_state()
+        self.pending.put_nowait(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)) # Pickled here, while the world is consistent
+
+    def on_finish(self, simulation):
+        self.close()
+
+    def write_pending(self):
+        while True:
+            pickled_state = self.pending.get()
+            if pickled_state is None: # close() was called
+                break
+            write_atomic(self.filename, pack_checkpoint(pickled_state))
+
+    def close(self):
+        if self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+            if self.skipped_checkpoints:
+                print(f"[WARNING] {self.skipped_checkpoints} checkpoints skipped because the disk could not keep up")
+            print(f"Checkpoint saved to {self.filename}")
@@ -0,0 +1,50 @@
+class EntityStore:
+    """
+    List-like container for entities with a unique id attribute (Blob, Food).
+
+    append, remove and lookup by id are all O(1). Removal swaps the last entity into the freed slot
+    instead of shifting everything after it (and never goes through the entities' __eq__), so the
+    order of entities is not preserved across removals. Iterate, index, slice and len() it like a list.
+    """
+
+    def __init__(self, entities=()):
+        self.items = []
+        self.positions = {}  # id -> index in items
+        self.extend(entities)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __contains__(self, entity):
+        return entity.id in self.positions
+
+    def get(self, entity_id):
+        '''Returns the entity with entity_id, or None'''
+        position = self.positions.get(entity_id)
+        return None if position is None else self.items[position]
+
+    def append(self, entity):
+        self.positions[entity.id] = len(self.items)
+        self.items.append(entity)
+
+    def extend(self, entities):
+        for entity in entities:
+            self.append(entity)
+
+    def remove(self, entity):
+        position = self.positions.pop(entity.id)
+        last = self.items.pop()
+        if last is not entity: # Move the last entity into the freed slot
+            self.items[position] = last
+            self.positions[last.id] = position
+
+    def shuffle(self, rng):
+        '''Shuffles the order in place with rng (a random.Random)'''
+        rng.shuffle(self.items)
+        self.positions = {entity.id: position for position, entity in enumerate(self.items)}
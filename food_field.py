@@ -0,0 +1,167 @@
+import math
+import numpy as np
+
+
+def load_density_map(density_map):
+    '''Returns a 2D float array of relative spawn weights from a nested list/array or a .npy filename (None stays None)'''
+    if density_map is None:
+        return None
+    weights = np.load(density_map) if isinstance(density_map, str) else np.asarray(density_map, dtype=np.float64)
+    if weights.ndim != 2 or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("FOOD_DENSITY_MAP must be a 2D grid of non-negative weights with a positive sum")
+    return weights
+
+class FoodField:
+    """
+    Decides how much food spawns every frame and where, from food_config:
+
+    - FOOD_SPAWN_MODE "chance": one food with probability FOOD_SPAWN_CHANCE_PER_FRAME, rolled on
+      spawn_rng (the original model). "poisson": Poisson(FOOD_SPAWN_RATE) foods, spawned as one batch.
+    - FOOD_CAPACITY: no food spawns beyond this many foods in the world (None for no limit).
+    - FOOD_DENSITY_MAP: 2D grid of relative weights stretched over the arena. Foods land in a cell with
+      probability proportional to its weight, uniformly inside it. None spawns uniformly.
+
+    All batch draws come from rng (a np.random.Generator), vectorized over the batch.
+    """
+
+    def __init__(self, food_config, width, height, spawn_rng, rng):
+        self.width = width
+        self.height = height
+        self.spawn_rng = spawn_rng
+        self.rng = rng
+        self.mode = food_config["FOOD_SPAWN_MODE"]
+        if self.mode not in ("chance", "poisson"):
+            raise ValueError(f"Unknown FOOD_SPAWN_MODE '{self.mode}'. Expected 'chance' or 'poisson'")
+        self.spawn_chance = food_config["FOOD_SPAWN_CHANCE_PER_FRAME"]
+        self.spawn_rate = food_config["FOOD_SPAWN_RATE"]
+        self.capacity = food_config["FOOD_CAPACITY"]
+
+        self.density = load_density_map(food_config["FOOD_DENSITY_MAP"])
+        if self.density is not None:
+            self.cumulative_density = np.cumsum(self.density.ravel()) / self.density.sum()
+
+    @property
+    def batched(self):
+        '''False when spawning follows the original one-food-at-a-time model exactly (Simulation.generate_food)'''
+        return self.mode != "chance" or self.density is not None
+
+    def spawn_count(self, food_count):
+        '''Returns how many foods to spawn this frame, given food_count foods in the world'''
+        if self.mode == "poisson":
+            count = int(self.rng.poisson(self.spawn_rate))
+        else:
+            count = 1 if self.spawn_rng.random() < self.spawn_chance else 0
+        if self.capacity is not None:
+            count = max(0, min(count, self.capacity - food_count))
+        return count
+
+    def positions(self, sizes):
+        '''Returns integer (x, y) arrays placing foods of the given sizes fully inside the arena, following the density map'''
+        sizes = np.asarray(sizes)
+        if self.density is None:
+            return self.rng.integers(sizes, self.width - sizes, endpoint=True), self.rng.integers(sizes, self.height - sizes, endpoint=True)
+
+        rows, cols = self.density.shape
+        cells = np.searchsorted(self.cumulative_density, self.rng.random(len(sizes)), side="right")
+        cells = np.minimum(cells, len(self.cumulative_density) - 1)
+        cell_width = self.width / cols
+        cell_height = self.height / rows
+        x = (cells % cols + self.rng.random(len(sizes))) * cell_width
+        y = (cells // cols + self.rng.random(len(sizes))) * cell_height
+        x = np.clip(x.astype(np.int64), sizes, self.width - sizes)
+        y = np.clip(y.astype(np.int64), sizes, self.height - sizes)
+        return x, y
+
+class FoodMass:
+    """
+    Food as aggregated energy per grid cell instead of individual Food objects, for worlds too large for
+    them: a (rows, cols) float64 array of food energy. Spawned food adds its energy to the cell it lands
+    in. A blob eats up to bite energy per frame from the cell it is in, or heads for the nearest cell
+    that has food.
+    """
+
+    def __init__(self, cell_size, width, height, bite):
+        self.cell_size = cell_size
+        self.cols = math.ceil(width / cell_size)
+        self.rows = math.ceil(height / cell_size)
+        self.mass = np.zeros((self.rows, self.cols))
+        self.bite = bite
+        self.total = 0.0  # Running sum of mass, so food_count never needs a full reduction
+        self.max_ring = max(self.rows, self.cols)
+
+    def cell_of(self, x, y):
+        return min(max(int(y // self.cell_size), 0), self.rows - 1), min(max(int(x // self.cell_size), 0), self.cols - 1)
+
+    def add(self, x, y, energies):
+        '''Adds energies (arrays, one entry per spawned food at x, y) to their cells'''
+        cell_y = np.clip(np.asarray(y) // self.cell_size, 0, self.rows - 1).astype(np.int64)
+        cell_x = np.clip(np.asarray(x) // self.cell_size, 0, self.cols - 1).astype(np.int64)
+        np.add.at(self.mass, (cell_y, cell_x), energies)
+        self.total += float(np.sum(energies))
+
+    def food_units(self):
+        '''Food in the world, counted in bites (the food_count statistic in food mass mode)'''
+        return int(round(self.total / self.bite))
+
+    def cells_with_food(self):
+        '''Returns (cell indices (row * cols + col), center x, center y, energy) arrays for every cell with food'''
+        cells = np.flatnonzero(self.mass)
+        rows, cols = np.divmod(cells, self.cols)
+        return cells, (cols + 0.5) * self.cell_size, (rows + 0.5) * self.cell_size, self.mass.ravel()[cells]
+
+    def cell_radii(self, energies, food_size):
+        '''Radii to draw cells holding energies with: one bite looks like a food of food_size, more grows up to the cell size'''
+        radii = np.round(food_size * np.sqrt(energies / self.bite))
+        return np.clip(radii, 1, max(1, self.cell_size // 2)).astype(np.int64)
+
+    def can_eat(self, x, y):
+        '''True if eat(x, y) would find food'''
+        return self.mass[self.cell_of(x, y)] >= 1
+
+    def eat(self, x, y):
+        '''Removes up to one bite from the cell at (x, y) and returns the energy eaten'''
+        cell = self.cell_of(x, y)
+        eaten = int(min(self.mass[cell], self.bite)) # Masses are sums of integer food energies, so this is exact
+        if eaten > 0:
+            self.mass[cell] -= eaten
+            self.total -= eaten
+        return eaten
+
+    def ring_cells(self, cell_y, cell_x, ring):
+        '''Returns (rows, cols) arrays of the grid cells exactly ring cells away (Chebyshev) from (cell_y, cell_x)'''
+        if ring == 0:
+            return np.array([cell_y]), np.array([cell_x])
+        span = np.arange(-ring, ring + 1)
+        inner = span[1:-1]
+        rows = np.concatenate((np.full(len(span), cell_y - ring), np.full(len(span), cell_y + ring), cell_y + inner, cell_y + inner))
+        cols = np.concatenate((cell_x + span, cell_x + span, np.full(len(inner), cell_x - ring), np.full(len(inner), cell_x + ring)))
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return rows[inside], cols[inside]
+
+    def nearest_food_cell(self, x, y):
+        '''
+        Returns the center (x, y) of the cell with food whose center is closest to (x, y), the richest on
+        ties, or None. Searches outward one ring of cells at a time and stops once a ring can not hold
+        anything closer than the best cell found, so only the ring cells are ever read.
+        '''
+        if self.total <= 0:
+            return None
+        cell_y, cell_x = self.cell_of(x, y)
+        best = None  # (distance, -mass, center x, center y)
+        for ring in range(self.max_ring + 1):
+            if best is not None and (ring - 1) * self.cell_size > best[0]: # Every center in this ring is at least that far away
+                break
+            rows, cols = self.ring_cells(cell_y, cell_x, ring)
+            masses = self.mass[rows, cols]
+            has_food = masses > 0
+            if not has_food.any():
+                continue
+            rows, cols, masses = rows[has_food], cols[has_food], masses[has_food]
+            center_x = (cols + 0.5) * self.cell_size
+            center_y = (rows + 0.5) * self.cell_size
+            distances = np.hypot(center_x - x, center_y - y)
+            closest = np.lexsort((-masses, distances))[0]
+            candidate = (float(distances[closest]), -float(masses[closest]), float(center_x[closest]), float(center_y[closest]))
+            if best is None or candidate[:2] < best[:2]:
+                best = candidate
+        return None if best is None else best[2:]
@@ -0,0 +1,214 @@
+import argparse
+import os
+import numpy as np
+
+# Heritable blob traits, recorded with their change relative to the parent
+TRAITS = ("size", "speed", "required_reproduction_energy", "offspring_amount")
+
+# One record per blob, appended in birth (and so id) order to births.bin. root_id is the founder
+# (parent_id 0) the blob descends from, i.e. its lineage. Deltas are 0 for founders
+BIRTH_RECORD = np.dtype(
+    [("id", np.int64), ("parent_id", np.int64), ("root_id", np.int64), ("birth_frame", np.int64), ("generation", np.int32)]
+    + [(trait, np.int32) for trait in TRAITS]
+    + [(f"{trait}_delta", np.int32) for trait in TRAITS]
+)
+# One record per death, appended in frame order to deaths.bin
+DEATH_RECORD = np.dtype([("id", np.int64), ("death_frame", np.int64)])
+# Death frame reported for blobs that were still alive when the log ended
+ALIVE = np.iinfo(np.int64).max
+
+
+class LineageRecorder:
+    """
+    Simulation observer that records every birth and death into directory as two append-only,
+    fixed-width columnar logs (births.bin and deaths.bin, see BIRTH_RECORD and DEATH_RECORD). Read
+    them back with LineageLog.
+
+    Records are buffered and appended every chunk_size records, so a crash loses at most the last
+    unwritten chunk. The only in-memory state is (root_id, generation) of the blobs currently alive.
+    With record_existing the blobs already alive at the first step are recorded as founders (their
+    parent, if any, is kept as parent_id).
+    """
+
+    def __init__(self, directory, chunk_size=4096, record_existing=True):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.record_existing = record_existing
+        os.makedirs(directory, exist_ok=True)
+
+        self.birth_file = open(os.path.join(directory, "births.bin"), "wb")
+        self.death_file = open(os.path.join(directory, "deaths.bin"), "wb")
+        self.births = []
+        self.deaths = []
+        self.alive = {}  # id -> (root_id, generation, traits tuple)
+        self.started = False
+
+    def on_step(self, simulation, statistics):
+        if not self.started:
+            self.started = True
+            if self.record_existing:
+                # Everyone alive at the start of the first frame, including those that died in it. Sorted, births.bin is in id order
+                newborn_ids = {blob.id for blob in simulation.newborn_blobs}
+                existing = [blob for blob in simulation.blobs if blob.id not in newborn_ids] + simulation.dead_blobs
+                for blob in sorted(existing, key=lambda blob: blob.id):
+                    self.record_birth(blob, founder=True)
+
+        for blob in simulation.newborn_blobs:
+            self.record_birth(blob, founder=blob.parent_id not in self.alive)
+        for blob in simulation.dead_blobs:
+            if self.alive.pop(blob.id, None) is not None:
+                self.deaths.append((blob.id, simulation.frame_count))
+
+        if len(self.births) >= self.chunk_size or len(self.deaths) >= self.chunk_size:
+            self.flush()
+
+    def on_finish(self, simulation):
+        self.close()
+
+    def record_birth(self, blob, founder):
+        traits = (blob.size, blob.speed, blob.required_reproduction_energy, blob.offspring_amount)
+        if founder:
+            root_id, generation, deltas = blob.id, 0, (0,) * len(TRAITS)
+        else:
+            parent_root, parent_generation, parent_traits = self.alive[blob.parent_id]
+            root_id, generation = parent_root, parent_generation + 1
+            deltas = tuple(value - parent_value for value, parent_value in zip(traits, parent_traits))
+        self.alive[blob.id] = (root_id, generation, traits)
+        self.births.append((blob.id, blob.parent_id, root_id, blob.birth_frame, generation) + traits + deltas)
+
+    def flush(self):
+        # Births go first, so deaths.bin never refers to a blob that is missing from births.bin
+        if self.births:
+            self.birth_file.write(np.array(self.births, dtype=BIRTH_RECORD).tobytes())
+            self.birth_file.flush()
+            self.births = []
+        if self.deaths:
+            self.death_file.write(np.array(self.deaths, dtype=DEATH_RECORD).tobytes())
+            self.death_file.flush()
+            self.deaths = []
+
+    def close(self):
+        if not self.birth_file.closed:
+            self.flush()
+            self.birth_file.close()
+            self.death_file.close()
+            print(f"Lineage log saved to {self.directory}")
+
+class LineageLog:
+    """
+    Read access to a lineage directory written by LineageRecorder. The logs are memory-mapped, and the
+    queries go through indexes built once on first use (all O(n log n) or better), never full scans:
+
+    - births are in id order, so a blob's record is found by binary search on id
+    - death_frames is aligned with births (ALIVE for blobs that never died)
+    - a stable sort of births by root_id makes every lineage one contiguous slice, in birth order
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.births = self.map_records("births.bin", BIRTH_RECORD)
+        self.deaths = self.map_records("deaths.bin", DEATH_RECORD)
+        self.ids = np.ascontiguousarray(self.births["id"]) # Strided memmap columns would be copied by every searchsorted
+        self._death_frames = None
+        self._root_order = None
+        self._lineage_spans = None
+
+    def map_records(self, filename, dtype):
+        path = os.path.join(self.directory, filename)
+        if os.path.getsize(path) == 0: # np.memmap can not map empty files
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return len(self.births)
+
+    def position(self, blob_id):
+        '''Returns the position of blob_id's record in births'''
+        position = np.searchsorted(self.ids, blob_id)
+        if position == len(self.ids) or self.ids[position] != blob_id:
+            raise KeyError(f"No birth recorded for blob {blob_id}")
+        return position
+
+    def record(self, blob_id):
+        return self.births[self.position(blob_id)]
+
+    @property
+    def death_frames(self):
+        '''Death frame of every blob, aligned with births (ALIVE if it never died)'''
+        if self._death_frames is None:
+            death_frames = np.full(len(self.births), ALIVE, dtype=np.int64)
+            death_frames[np.searchsorted(self.ids, self.deaths["id"])] = self.deaths["death_frame"]
+            self._death_frames = death_frames
+        return self._death_frames
+
+    def ancestry(self, blob_id):
+        '''Returns the birth records of blob_id and all its recorded ancestors, newest first'''
+        positions = []
+        while blob_id:
+            try:
+                position = self.position(blob_id)
+            except KeyError: # Parent born before recording started
+                break
+            positions.append(position)
+            blob_id = self.births["parent_id"][position]
+        return self.births[positions]
+
+    def root_order(self):
+        '''Returns (birth positions sorted by root_id, sorted root ids), births of one lineage stay in birth order'''
+        if self._root_order is None:
+            order = np.argsort(self.births["root_id"], kind="stable")
+            self._root_order = (order, self.births["root_id"][order])
+        return self._root_order
+
+    def lineage(self, root_id):
+        '''Returns the birth records of every blob in the lineage founded by root_id, in birth order'''
+        order, sorted_roots = self.root_order()
+        start, stop = np.searchsorted(sorted_roots, [root_id, root_id + 1])
+        return self.births[np.sort(order[start:stop])]
+
+    def lineage_spans(self):
+        '''
+        Returns (root ids, first frame, extinction frame) per lineage. A child is always born while its
+        parent is alive, so a lineage is alive from its founder's birth until its last member dies.
+        '''
+        if self._lineage_spans is None:
+            roots, lineage_index = np.unique(self.births["root_id"], return_inverse=True)
+            starts = np.full(len(roots), ALIVE, dtype=np.int64)
+            np.minimum.at(starts, lineage_index, self.births["birth_frame"])
+            ends = np.zeros(len(roots), dtype=np.int64)
+            np.maximum.at(ends, lineage_index, self.death_frames)
+            self._lineage_spans = (roots, starts, ends)
+        return self._lineage_spans
+
+    def surviving_lineage_counts(self, frames):
+        '''Returns the number of lineages with at least one living member at each of frames'''
+        _, starts, ends = self.lineage_spans()
+        frames = np.asarray(frames)
+        started = np.searchsorted(np.sort(starts), frames, side="right")
+        ended = np.searchsorted(np.sort(ends), frames, side="right") # A blob that died at frame f is gone at f
+        return started - ended
+
+    def trait_drift(self, root_id, trait, bin_size=1000):
+        '''Returns (bin start frames, mean trait value of the lineage's births in each bin) for one lineage'''
+        members = self.lineage(root_id)
+        bins = members["birth_frame"] // bin_size
+        bin_ids, bin_index = np.unique(bins, return_inverse=True)
+        means = np.bincount(bin_index, weights=members[trait]) / np.bincount(bin_index)
+        return bin_ids * bin_size, means
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a recorded lineage directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--ancestry", type=int, help="Print the ancestry of this blob id")
+    args = parser.parse_args()
+
+    log = LineageLog(args.directory)
+    roots, starts, ends = log.lineage_spans()
+    print(f"{len(log)} births, {len(log.deaths)} deaths, {len(roots)} lineages, {int((ends == ALIVE).sum())} still alive")
+    if args.ancestry is not None:
+        for record in log.ancestry(args.ancestry):
+            deltas = ", ".join(f"{trait} {int(record[f'{trait}_delta']):+d}" for trait in TRAITS if record[f"{trait}_delta"])
+            print(f"blob {record['id']} born frame {record['birth_frame']} generation {record['generation']}  {deltas}")
+
+if __name__ == "__main__":
+    main()
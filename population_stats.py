@@ -0,0 +1,101 @@
+from collections import Counter
+
+# Traits fixed at birth (only mutated when an offspring is generated). Tracked with value -> count histograms,
+# which also give min/max directly since the value ranges are small
+TRAIT_ATTRIBUTES = ("speed", "size", "required_reproduction_energy", "offspring_amount")
+
+
+class PopulationStats:
+    """
+    Incrementally maintained blob population statistics. Instead of scanning every blob each frame,
+    the simulation reports births (add), deaths (remove) and energy changes (update_energy), and every
+    statistic is kept up to date in O(1) or O(log n) per event.
+
+    - sums and sums of squares per attribute, for the mean and (optionally reported) variance
+    - a value -> count histogram per trait, which gives min/max and trait distributions
+    - energy changes for most blobs every frame, so its min/max are not maintained per change at all.
+      They are computed from the energies dict when first read after a change (one C-level pass each)
+      and cached until the next change
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sums = Counter()
+        self.squared_sums = Counter()
+        self.histograms = {attribute: Counter() for attribute in TRAIT_ATTRIBUTES}
+        self.energies = {}  # blob id -> energy as last reported
+        self.energy_extremes = None  # (min, max) of energies, None when outdated
+
+    def add(self, blob):
+        self.count += 1
+        for attribute in TRAIT_ATTRIBUTES:
+            value = getattr(blob, attribute)
+            self.sums[attribute] += value
+            self.squared_sums[attribute] += value * value
+            self.histograms[attribute][value] += 1
+        self.set_energy(blob.id, blob.energy)
+
+    def remove(self, blob):
+        self.count -= 1
+        for attribute in TRAIT_ATTRIBUTES:
+            value = getattr(blob, attribute)
+            self.sums[attribute] -= value
+            self.squared_sums[attribute] -= value * value
+            histogram = self.histograms[attribute]
+            histogram[value] -= 1
+            if not histogram[value]:
+                del histogram[value]
+
+        energy = self.energies.pop(blob.id)
+        self.sums["energy"] -= energy
+        self.squared_sums["energy"] -= energy * energy
+        self.energy_extremes = None
+
+    def update_energy(self, blob):
+        '''Records blob's current energy. Call after the blob's energy changed'''
+        old_energy = self.energies[blob.id]
+        if blob.energy != old_energy:
+            self.sums["energy"] -= old_energy
+            self.squared_sums["energy"] -= old_energy * old_energy
+            self.set_energy(blob.id, blob.energy)
+
+    def set_energy(self, blob_id, energy):
+        self.energies[blob_id] = energy
+        self.sums["energy"] += energy
+        self.squared_sums["energy"] += energy * energy
+        self.energy_extremes = None
+
+    def energy_range(self):
+        '''Returns (min, max) energy, computed only when the energies changed since the last call'''
+        if self.energy_extremes is None:
+            energies = self.energies.values()
+            self.energy_extremes = (min(energies), max(energies))
+        return self.energy_extremes
+
+    def average(self, attribute):
+        return self.sums[attribute] / self.count if self.count else 0
+
+    def variance(self, attribute):
+        '''Population variance of attribute (0 for an empty population)'''
+        if not self.count:
+            return 0
+        mean = self.sums[attribute] / self.count
+        return max(self.squared_sums[attribute] / self.count - mean * mean, 0)
+
+    def minimum(self, attribute):
+        if not self.count:
+            return None
+        if attribute == "energy":
+            return self.energy_range()[0]
+        return min(self.histograms[attribute])
+
+    def maximum(self, attribute):
+        if not self.count:
+            return None
+        if attribute == "energy":
+            return self.energy_range()[1]
+        return max(self.histograms[attribute])
+
+    def histogram(self, attribute):
+        '''Returns {trait value: number of blobs} sorted by value'''
+        return dict(sorted(self.histograms[attribute].items()))
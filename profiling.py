@@ -0,0 +1,83 @@
+import time
+import numpy as np
+
+# Phases of one frame, in the order they happen. render/flip/idle are marked by the renderer (idle is clock.tick waiting)
+PHASES = ("spawn", "shuffle", "blob_update", "stats", "render", "flip", "idle")
+# Parts of blob_update, timed per blob inside it (they add up to slightly less than blob_update)
+BLOB_PHASES = ("energy_drain", "nearest_food", "movement", "reproduction")
+COUNTERS = ("distance_evaluations", "collisions", "removals", "births")
+
+
+class FrameProfiler:
+    """
+    Low-overhead per-frame instrumentation for the simulation loop. Can be switched on and off at any
+    time through enabled; while off, mark() and the counters cost a couple of attribute lookups.
+
+    The loop calls start_frame(), then mark(phase) at the end of every phase (the time since the previous
+    mark is charged to that phase), and end_frame() once the frame is done. The step adds BLOB_PHASES
+    to phase_times itself, as they interleave per blob inside blob_update. Counters are added with
+    count(). The last window_size frame times (all phases except idle) are kept in a ring buffer for
+    rolling p50/p99.
+    """
+
+    def __init__(self, enabled=False, window_size=1024):
+        self.enabled = enabled
+        self.frame_times = np.zeros(window_size)
+        self.frames_recorded = 0
+        self.phase_times = dict.fromkeys(PHASES + BLOB_PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.last_frame = None  # (phase_times, counters, frame time) of the last completed frame
+        self.frame_start = None
+        self.last_mark = None
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last_mark = time.perf_counter()
+        for phase in self.phase_times:
+            self.phase_times[phase] = 0.0
+        for counter in COUNTERS:
+            self.counters[counter] = 0
+
+    def mark(self, phase):
+        if not self.enabled or self.last_mark is None:
+            return
+        now = time.perf_counter()
+        self.phase_times[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def count(self, counter, amount=1):
+        if self.enabled:
+            self.counters[counter] += amount
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        frame_time = time.perf_counter() - self.frame_start - self.phase_times["idle"]
+        self.frame_times[self.frames_recorded % len(self.frame_times)] = frame_time
+        self.frames_recorded += 1
+        self.last_frame = (dict(self.phase_times), dict(self.counters), frame_time)
+        self.frame_start = self.last_mark = None
+
+    def frame_time_percentiles(self, percentiles=(50, 99)):
+        '''Returns frame time percentiles in ms over the rolling window (None if nothing was recorded)'''
+        recorded = self.frame_times[:min(self.frames_recorded, len(self.frame_times))]
+        if not len(recorded):
+            return [None] * len(percentiles)
+        return [float(value) * 1000 for value in np.percentile(recorded, percentiles)]
+
+    def statistics(self):
+        '''
+        Returns profiler values for the stats stream, always with the same keys: the last completed frame's
+        phase times (ms) and counters, plus rolling p50/p99 frame times. Values are None while disabled.
+        '''
+        keys = [f"{phase}_ms" for phase in PHASES + BLOB_PHASES] + list(COUNTERS) + ["frame_ms", "frame_p50_ms", "frame_p99_ms"]
+        if not self.enabled or self.last_frame is None:
+            return dict.fromkeys(keys)
+
+        phase_times, counters, frame_time = self.last_frame
+        statistics = {f"{phase}_ms": phase_times[phase] * 1000 for phase in PHASES + BLOB_PHASES}
+        statistics.update(counters)
+        statistics["frame_ms"] = frame_time * 1000
+        statistics["frame_p50_ms"], statistics["frame_p99_ms"] = self.frame_time_percentiles()
+        return statistics
@@ -0,0 +1,245 @@
+import functools
+import numpy as np
+import pygame
+from scheduler import entity_records
+from simulator import BLACK, WHITE, BLUE, RED, SCREEN_WIDTH, SCREEN_HEIGHT, ARENA_WIDTH, ARENA_HEIGHT
+
+# Above this many dirty rectangles a full clear and display flip is cheaper than handling them one by one
+MAX_DIRTY_RECTS = 400
+# Rendered text surfaces kept by TextCache before it starts over
+TEXT_CACHE_SIZE = 512
+
+
+class SpriteCache:
+    '''Pre-rasterized circle sprites per (color, radius), so drawing an entity is a plain blit'''
+
+    def __init__(self):
+        self.sprites = {}
+
+    def get(self, color, radius):
+        key = (color, radius)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1)).convert() # Same pixel format as the display, so blits need no conversion
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            sprite.set_colorkey(BLACK, pygame.RLEACCEL) # Entities are never black, so black is transparent
+            self.sprites[key] = sprite
+        return sprite
+
+class TextCache:
+    '''Rendered text surfaces keyed by (text, color). A stat line is only re-rendered when its text changes'''
+
+    def __init__(self, font):
+        self.font = font
+        self.surfaces = {}
+
+    def render(self, text, color):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= TEXT_CACHE_SIZE:
+                self.surfaces.clear()
+            surface = self.surfaces[key] = self.font.render(text, True, color)
+        return surface
+
+def render_dict_as_text(surface, stats_dict, font, color, x, y, line_spacing=5, rounding=1, text_cache=None):
+    """Render a dictionary as text on the pygame screen. Returns the rects that were drawn to."""
+
+    y_offset = 0
+    rects = []
+
+    for key, value in stats_dict.items():
+        stat_text = f"{key}: {value if value is None else round(value, rounding)}"
+        text_surface = text_cache.render(stat_text, color) if text_cache else font.render(stat_text, True, color)
+        rects.append(surface.blit(text_surface, (x + 10, y + y_offset)))
+        y_offset += font.get_height() + line_spacing
+
+    return rects
+
+def arena_scale(width, height, arena_size):
+    '''Returns the factor that fits an arena of arena_size (width, height) into a width x height window, keeping circles round'''
+    arena_width, arena_height = arena_size
+    return min(width / arena_width, height / arena_height)
+
+def blit_circles(surface, sprite_cache, color, xs, ys, sizes, scale=1):
+    '''Draws circles of one color from coordinate and radius arrays in a single batched blit. Returns the drawn rects'''
+    radii = np.asarray(sizes, dtype=np.int64)
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+    if scale != 1:
+        radii = np.maximum(1, np.round(radii * scale)).astype(np.int64) # Always at least a dot
+        xs = xs * scale
+        ys = ys * scale
+    lefts = (xs - radii).astype(np.int64).tolist()
+    tops = (ys - radii).astype(np.int64).tolist()
+    return surface.blits(
+        [(sprite_cache.get(color, radius), (left, top)) for radius, left, top in zip(radii.tolist(), lefts, tops)]
+    )
+
+def blit_entities(surface, sprite_cache, entities):
+    '''Draws entities (with x, y, int size and color attributes) in a single batched blit. Returns the drawn rects'''
+    sprites = sprite_cache.sprites
+    get_sprite = sprite_cache.get
+    return surface.blits([
+        (sprites.get((entity.color, entity.size)) or get_sprite(entity.color, entity.size), (int(entity.x) - entity.size, int(entity.y) - entity.size))
+        for entity in entities
+    ])
+
+def blit_records(surface, sprite_cache, records):
+    '''Like blit_entities, for (x, y, size, color) tuples (see scheduler.entity_records). Returns the drawn rects'''
+    sprites = sprite_cache.sprites
+    get_sprite = sprite_cache.get
+    return surface.blits([
+        (sprites.get((color, size)) or get_sprite(color, size), (int(x) - size, int(y) - size))
+        for x, y, size, color in records
+    ])
+
+def blit_scaled_records(surface, sprite_cache, records, scale):
+    '''Like blit_records, for an arena drawn at scale (see arena_scale). Returns the drawn rects'''
+    get_sprite = sprite_cache.get
+    blits = []
+    for x, y, size, color in records:
+        radius = max(1, round(size * scale))
+        blits.append((get_sprite(color, radius), (int(x * scale) - radius, int(y * scale) - radius)))
+    return surface.blits(blits)
+
+def blit_scaled_entities(surface, sprite_cache, entities, scale):
+    '''Like blit_entities, for an arena drawn at scale (see arena_scale). Returns the drawn rects'''
+    return blit_scaled_records(surface, sprite_cache, ((entity.x, entity.y, entity.size, entity.color) for entity in entities), scale)
+
+class PygameRenderer:
+    """
+    Observer that draws a Simulation into a pygame window every render_every steps.
+    Attach with simulation.attach(PygameRenderer(...)). Closing the window stops the simulation.
+    Pressing P switches the simulation's profiler on/off (simulation.set_profiling), its values are shown next
+    to the stats while on. Stats sinks fix their columns at the first frame, so the values only reach the
+    stats file if the simulation was created with profile=True.
+    Up/Down double/halve render_every, i.e. how many simulation steps run per drawn frame.
+    For a simulation running on its own thread, see scheduler.run_threaded (which uses show_frame).
+    An arena_size (width, height) other than the window's is scaled to fit the window.
+    In food mass mode every cell with food is drawn as one circle that grows with the cell's energy.
+
+    Entities are blitted in bulk from cached sprites and only the regions drawn this frame or the previous
+    one are cleared and pushed to the display (falling back to a full flip when too much changed).
+    Stat lines are rendered once per distinct text.
+    """
+
+    def __init__(self, width, height, fps, live_stats_display=True, render_every=1, arena_size=None):
+        pygame.init()
+        self.screen = pygame.display.set_mode((width, height))
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.Font(None, 24)
+        self.fps = fps
+        self.live_stats_display = live_stats_display
+        self.render_every = render_every
+        self.sprite_cache = SpriteCache()
+        self.text_cache = TextCache(self.font)
+        self.previous_rects = []
+        self.shown_frame = None
+
+        scale = arena_scale(width, height, arena_size) if arena_size is not None else 1
+        self.blit_entities = blit_entities if scale == 1 else functools.partial(blit_scaled_entities, scale=scale)
+        self.blit_records = blit_records if scale == 1 else functools.partial(blit_scaled_records, scale=scale)
+
+    def on_step(self, simulation, statistics):
+        if simulation.frame_count % self.render_every:
+            return
+
+        profiler = simulation.profiler
+        self.handle_events(simulation, self)
+        if simulation.food_mass is None:
+            blit, entity_lists = self.blit_entities, (simulation.foods, simulation.blobs, simulation.dead_blobs)
+        else: # Food is energy per cell, drawn as one circle per cell with food
+            blit, entity_lists = self.blit_records, (simulation.food_mass_records(), entity_records(simulation.blobs), entity_records(simulation.dead_blobs))
+        self.draw(blit, entity_lists, statistics, profiler.statistics() if profiler.enabled else None, profiler)
+
+        self.clock.tick(self.fps)
+        profiler.mark("idle")
+
+    def show_frame(self, simulation, frame, speed_control):
+        '''
+        Draws a frame published by scheduler.FramePublisher (None or an already shown frame draws nothing new)
+        and waits for the next display tick. The Up/Down keys go to speed_control.
+        '''
+        self.handle_events(simulation, speed_control)
+        if frame is not None and frame is not self.shown_frame:
+            statistics = dict(frame["statistics"], steps_per_second=speed_control.measured_rate)
+            self.draw(self.blit_records, (frame["foods"], frame["blobs"], frame["dead_blobs"]), statistics, frame["profiler_statistics"])
+            self.shown_frame = frame
+        self.clock.tick(self.fps)
+
+    def handle_events(self, simulation, speed_control):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                simulation.stop()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_p:
+                    simulation.set_profiling(not simulation.profiler.enabled)
+                elif event.key == pygame.K_UP:
+                    speed_control.speed_up()
+                elif event.key == pygame.K_DOWN:
+                    speed_control.slow_down()
+
+    def speed_up(self):
+        self.render_every *= 2
+
+    def slow_down(self):
+        self.render_every = max(1, self.render_every // 2)
+
+    def draw(self, blit, entity_lists, statistics, profiler_statistics=None, profiler=None):
+        '''Draws entity_lists (foods, blobs, dead blobs) with blit and the stat overlays, then updates the display'''
+        # Erase only what was drawn last frame, unless so much was drawn that clearing everything is cheaper
+        full_redraw = len(self.previous_rects) > MAX_DIRTY_RECTS
+        if full_redraw:
+            self.screen.fill(BLACK)
+        else:
+            for rect in self.previous_rects:
+                self.screen.fill(BLACK, rect)
+
+        rects = []
+        for entities in entity_lists: # Dead blobs come last, drawn white for the frame they die in
+            rects += blit(self.screen, self.sprite_cache, entities)
+
+        if self.live_stats_display:
+            rects += render_dict_as_text(self.screen, statistics, self.font, WHITE, 0, 350, text_cache=self.text_cache)
+        if profiler_statistics is not None:
+            rects += render_dict_as_text(self.screen, profiler_statistics, self.font, WHITE, self.screen.get_width() - 260, 10,
+                                         rounding=2, text_cache=self.text_cache)
+        if profiler is not None:
+            profiler.mark("render")
+
+        if full_redraw or len(rects) > MAX_DIRTY_RECTS:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous_rects + rects)
+        self.previous_rects = rects
+        if profiler is not None:
+            profiler.mark("flip")
+
+    def on_finish(self, simulation):
+        pygame.quit()
+
+def replay_snapshots(reader, fps, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, arena_size=(ARENA_WIDTH, ARENA_HEIGHT)):
+    """Plays back a snapshots.SnapshotReader in a pygame window without re-simulating. Close the window to stop."""
+    scale = arena_scale(width, height, arena_size)
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    clock = pygame.time.Clock()
+    font = pygame.font.Font(None, 24)
+    sprite_cache = SpriteCache()
+    text_cache = TextCache(font)
+
+    for frame, blobs, foods in reader.scan():
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            break
+
+        screen.fill(BLACK)
+        blit_circles(screen, sprite_cache, RED, foods["x"], foods["y"], foods["size"], scale)
+        blit_circles(screen, sprite_cache, BLUE, blobs["x"], blobs["y"], blobs["size"], scale)
+        render_dict_as_text(screen, {"frame": frame, "blob_count": len(blobs), "food_count": len(foods)}, font, WHITE, 0, 10,
+                            text_cache=text_cache)
+
+        pygame.display.flip()
+        clock.tick(fps)
+
+    pygame.quit()
@@ -0,0 +1,120 @@
+import threading
+import time
+
+# Lowest step rate slow_down() goes to, in steps/sec
+MIN_STEPS_PER_SECOND = 1
+# How often StepThrottle re-measures the actual step rate, in seconds
+RATE_WINDOW = 1.0
+
+
+def entity_records(entities):
+    '''Returns (x, y, size, color) tuples for entities, a copy the viewer can draw while the simulation moves on'''
+    return [(entity.x, entity.y, entity.size, entity.color) for entity in entities]
+
+def capture_frame(simulation, statistics):
+    '''Returns a self-contained copy of everything the window shows for the current frame'''
+    profiler = simulation.profiler
+    return {
+        "frame": simulation.frame_count,
+        "statistics": statistics,
+        "profiler_statistics": profiler.statistics() if profiler.enabled else None,
+        "foods": entity_records(simulation.foods) if simulation.food_mass is None else simulation.food_mass_records(),
+        "blobs": entity_records(simulation.blobs),
+        "dead_blobs": entity_records(simulation.dead_blobs)
+    }
+
+class FramePublisher:
+    """
+    Simulation observer that hands frames to a viewer running on another thread.
+
+    The simulation only copies its state when the viewer asked for a new frame through take(), so
+    at most one copy is made per displayed frame no matter how fast the simulation steps.
+    """
+
+    def __init__(self):
+        self.latest = None
+        self.requested = threading.Event()
+
+    def on_step(self, simulation, statistics):
+        if self.requested.is_set():
+            self.requested.clear()
+            self.latest = capture_frame(simulation, statistics) # A plain attribute swap, readers see the old or the new frame
+
+    def on_finish(self, simulation):
+        pass
+
+    def take(self):
+        '''Returns the newest published frame (None before the first one) and asks for a fresh one'''
+        self.requested.set()
+        return self.latest
+
+class StepThrottle:
+    """
+    Simulation observer that limits the simulation to steps_per_second (None runs flat out).
+    steps_per_second can be changed at any time, also from another thread, e.g. through speed_up() and
+    slow_down(). measured_rate holds the actual steps/sec over the last RATE_WINDOW seconds.
+    """
+
+    def __init__(self, steps_per_second=None):
+        self.steps_per_second = steps_per_second
+        self.measured_rate = 0.0
+        self.next_step = None
+        self.window_start = time.perf_counter()
+        self.window_steps = 0
+
+    def on_step(self, simulation, statistics):
+        now = time.perf_counter()
+        self.window_steps += 1
+        if now - self.window_start >= RATE_WINDOW:
+            self.measured_rate = self.window_steps / (now - self.window_start)
+            self.window_start = now
+            self.window_steps = 0
+
+        steps_per_second = self.steps_per_second
+        if steps_per_second is None:
+            self.next_step = None
+            return
+
+        # Keep a steady schedule, but don't try to catch up after the simulation fell far behind it
+        if self.next_step is None or now - self.next_step > 0.25:
+            self.next_step = now
+        self.next_step += 1 / steps_per_second
+        if self.next_step > now:
+            time.sleep(self.next_step - now)
+
+    def on_finish(self, simulation):
+        pass
+
+    def speed_up(self):
+        '''Doubles the step rate, going back to flat out once the limit is above what the simulation manages'''
+        if self.steps_per_second is None:
+            return
+        self.steps_per_second *= 2
+        if self.measured_rate and self.steps_per_second > 2 * self.measured_rate:
+            self.steps_per_second = None
+
+    def slow_down(self):
+        '''Halves the step rate (starting from the measured rate when running flat out)'''
+        current = self.steps_per_second or self.measured_rate or MIN_STEPS_PER_SECOND * 2
+        self.steps_per_second = max(MIN_STEPS_PER_SECOND, current / 2)
+
+def run_threaded(simulation, renderer, steps_per_second=None):
+    """
+    Steps simulation on a worker thread, flat out or at steps_per_second, while renderer (a
+    renderer.PygameRenderer) shows the latest frame in this thread at its own fps. The Up/Down keys
+    change the step rate. Returns once the window is closed or the simulation stops by itself.
+    """
+    publisher = FramePublisher()
+    throttle = StepThrottle(steps_per_second)
+    simulation.attach(publisher)
+    simulation.attach(throttle)
+
+    worker = threading.Thread(target=simulation.run, daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            renderer.show_frame(simulation, publisher.take(), throttle)
+    finally:
+        simulation.stop()
+        worker.join()
+        renderer.on_finish(simulation)
@@ -0,0 +1,461 @@
+"""
+Sharded execution for very large arenas. ShardedWorld splits the arena into a grid of tiles and steps
+every tile in its own worker process (a TileWorld, i.e. a VectorizedWorld over just that tile), so a
+population of millions of blobs spreads over all cores of the machine.
+
+The tiles run in lockstep, one frame at a time. Everything that crosses a tile border goes through
+one shared memory block instead of pipes:
+
+- migrants: blobs that ended the frame outside their tile (moved over the border, or born there, as
+  offspring are placed anywhere in the arena) are written to their tile's outbox, sorted by destination
+- ghosts: every tile publishes its foods within GHOST_MARGIN of its border. Neighbouring tiles let their
+  blobs head for those foods, but only the owning tile's blobs can eat them (a blob has to cross over first)
+- statistics: one row of counts, sums, minimums and maximums per tile, combined by ShardedWorld into the
+  same statistics dict as Simulation and VectorizedWorld
+
+Food always spawns as a Poisson batch per tile: FOOD_SPAWN_MODE "chance" becomes a Poisson rate with the
+same mean foods per frame (check_food_config says so). Density maps and food mass mode are not supported.
+
+Runs are reproducible for a given seed and tile layout. They are not identical to an unsharded run.
+"""
+import multiprocessing
+import signal
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+from simulator import SIMULATION_START_CONFIG, BLOB_CONFIG, FOOD_CONFIG, ARENA_WIDTH, ARENA_HEIGHT
+from vectorized_world import VectorizedWorld, BLOB_FIELDS
+
+# Blobs one tile can hand over to other tiles per frame. Any beyond that wait in their old tile for the next frame
+MIGRATION_CAPACITY = 8192
+# Border foods one tile can show its neighbours. Any beyond that are only visible inside their own tile
+GHOST_CAPACITY = 16384
+# How far into neighbouring tiles blobs can see food
+GHOST_MARGIN = 50
+# Seconds the coordinator and the workers wait for each other per barrier before giving up on a stuck peer
+BARRIER_TIMEOUT = 600
+
+# Commands from ShardedWorld to the workers, read after the first barrier of every frame
+COMMAND_STEP = 0
+COMMAND_STOP = 1
+
+MIGRANT_RECORD = np.dtype([(field, np.float64 if field in ("x", "y") else np.int64) for field in BLOB_FIELDS])
+GHOST_RECORD = np.dtype([("id", np.int64), ("x", np.int64), ("y", np.int64), ("size", np.int64)])
+STATISTICS_ATTRIBUTES = ("speed", "size", "energy")
+TILE_STATISTICS_RECORD = np.dtype(
+    [("blob_count", np.int64), ("food_count", np.int64), ("num_offsprings", np.int64), ("num_mutations", np.int64)]
+    + [(f"{attribute}_{part}", np.int64) for attribute in STATISTICS_ATTRIBUTES for part in ("sum", "min", "max")]
+)
+
+
+def check_food_config(food_config):
+    '''
+    Raises ValueError for food settings tiles can not follow, and returns a note for the ones they follow
+    differently from Simulation (None if there is none)
+    '''
+    if food_config["FOOD_MASS_MODE"]:
+        raise ValueError("FOOD_MASS_MODE is not supported by sharded worlds")
+    if food_config["FOOD_DENSITY_MAP"] is not None:
+        raise ValueError("FOOD_DENSITY_MAP is not supported by sharded worlds")
+    if food_config["FOOD_SPAWN_MODE"] not in ("chance", "poisson"):
+        raise ValueError(f"Unknown FOOD_SPAWN_MODE '{food_config['FOOD_SPAWN_MODE']}'. Expected 'chance' or 'poisson'")
+    if food_config["FOOD_SPAWN_MODE"] == "chance":
+        return (f"FOOD_SPAWN_MODE 'chance' runs as Poisson spawning with the same mean "
+                f"({food_config['FOOD_SPAWN_CHANCE_PER_FRAME']} foods per frame) in sharded worlds")
+    return None
+
+class TileLayout:
+    '''Splits a width x height arena into a columns x rows grid of tiles with integer edges, numbered row by row'''
+
+    def __init__(self, width, height, columns, rows):
+        self.width = width
+        self.height = height
+        self.columns = columns
+        self.rows = rows
+        self.x_edges = np.linspace(0, width, columns + 1).round().astype(np.int64)
+        self.y_edges = np.linspace(0, height, rows + 1).round().astype(np.int64)
+
+    @property
+    def tile_count(self):
+        return self.columns * self.rows
+
+    def bounds(self, tile_index):
+        '''Returns (left, top, right, bottom) of a tile. Points on the right or bottom edge belong to the next tile'''
+        column, row = tile_index % self.columns, tile_index // self.columns
+        return self.x_edges[column], self.y_edges[row], self.x_edges[column + 1], self.y_edges[row + 1]
+
+    def area_fraction(self, tile_index):
+        left, top, right, bottom = self.bounds(tile_index)
+        return (right - left) * (bottom - top) / (self.width * self.height)
+
+    def tiles_of(self, x, y):
+        '''Returns the index of the tile every (x, y) arena position lies in (positions outside the arena go to the closest tile)'''
+        columns = np.clip(np.searchsorted(self.x_edges, x, side="right") - 1, 0, self.columns - 1)
+        rows = np.clip(np.searchsorted(self.y_edges, y, side="right") - 1, 0, self.rows - 1)
+        return rows * self.columns + columns
+
+    def neighbours(self, tile_index):
+        '''Returns the indices of the (up to 8) tiles around a tile'''
+        column, row = tile_index % self.columns, tile_index // self.columns
+        return [
+            neighbour_row * self.columns + neighbour_column
+            for neighbour_row in range(max(row - 1, 0), min(row + 2, self.rows))
+            for neighbour_column in range(max(column - 1, 0), min(column + 2, self.columns))
+            if (neighbour_row, neighbour_column) != (row, column)
+        ]
+
+class SharedBuffers:
+    """
+    NumPy views into one shared memory block that all tiles exchange data through. Created by
+    ShardedWorld (name None) and attached to by name in every worker.
+
+    - control: the command for the next frame (COMMAND_STEP or COMMAND_STOP)
+    - migrant_offsets[tile, destination:destination + 2]: slice of migrants[tile] headed for destination
+    - migrants[tile]: the MIGRANT_RECORDs tile hands over this frame, sorted by destination
+    - ghost_counts, ghosts[tile]: tile's border foods (GHOST_RECORD, arena coordinates)
+    - statistics[tile]: TILE_STATISTICS_RECORD of tile after the frame
+    """
+
+    def __init__(self, tile_count, migration_capacity, ghost_capacity, name=None):
+        self.layout = (
+            ("control", np.int64, (1,)),
+            ("migrant_offsets", np.int64, (tile_count, tile_count + 1)),
+            ("migrants", MIGRANT_RECORD, (tile_count, migration_capacity)),
+            ("ghost_counts", np.int64, (tile_count,)),
+            ("ghosts", GHOST_RECORD, (tile_count, ghost_capacity)),
+            ("statistics", TILE_STATISTICS_RECORD, (tile_count,))
+        )
+        size = sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in self.layout)
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.memory.name
+
+        offset = 0
+        for attribute, dtype, shape in self.layout: # Every record is a multiple of 8 bytes, so all views stay aligned
+            array = np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=offset)
+            setattr(self, attribute, array)
+            offset += array.nbytes
+
+    def close(self, unlink=False):
+        for attribute, _, _ in self.layout: # The views have to go before the memory can be closed
+            delattr(self, attribute)
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+class TileWorld(VectorizedWorld):
+    """
+    One tile of a ShardedWorld: a VectorizedWorld over the tile, with positions relative to the tile's
+    top left corner. Starting blobs and food spawn inside the tile (food at the tile's share of the
+    arena's food spawn rate and capacity), offspring anywhere in the arena.
+    IDs are interleaved (tile_index + 1, then every tile_count-th), so they are unique across tiles.
+    """
+
+    def __init__(self, tile_index, layout, start_config, blob_config, food_config, seed_sequence):
+        check_food_config(food_config)
+        self.tile_index = tile_index
+        self.layout = layout
+        self.left, self.top, right, bottom = layout.bounds(tile_index)
+        super().__init__(start_config, blob_config, food_config, right - self.left, bottom - self.top, seed_sequence)
+        self.next_blob_id = self.next_food_id = tile_index + 1
+
+        area_fraction = layout.area_fraction(tile_index)
+        # A per-frame chance turns into a Poisson rate with the same mean, split over the tiles by area
+        spawn_rate = food_config["FOOD_SPAWN_RATE"] if food_config["FOOD_SPAWN_MODE"] == "poisson" else food_config["FOOD_SPAWN_CHANCE_PER_FRAME"]
+        self.food_spawn_rate = spawn_rate * area_fraction
+        self.food_capacity = None if food_config["FOOD_CAPACITY"] is None else round(food_config["FOOD_CAPACITY"] * area_fraction)
+        self.ghosts = np.empty(0, dtype=GHOST_RECORD) # Neighbours' border foods, in tile coordinates
+
+    def issue_blob_ids(self, n):
+        ids = self.next_blob_id + self.layout.tile_count * np.arange(n)
+        self.next_blob_id += self.layout.tile_count * n
+        return ids
+
+    def issue_food_ids(self, n):
+        ids = self.next_food_id + self.layout.tile_count * np.arange(n)
+        self.next_food_id += self.layout.tile_count * n
+        return ids
+
+    def random_positions(self, sizes):
+        '''Returns tile coordinate (x, y) arrays placing circles of the given sizes inside the tile and fully inside the arena'''
+        x = self.rng.integers(np.maximum(self.left, sizes), np.minimum(self.left + self.width - 1, self.layout.width - sizes), endpoint=True)
+        y = self.rng.integers(np.maximum(self.top, sizes), np.minimum(self.top + self.height - 1, self.layout.height - sizes), endpoint=True)
+        return x - self.left, y - self.top
+
+    def offspring_positions(self, sizes):
+        '''Offspring land anywhere in the arena, like in Simulation. The ones outside this tile migrate'''
+        x = self.rng.integers(sizes, self.layout.width - sizes, endpoint=True)
+        y = self.rng.integers(sizes, self.layout.height - sizes, endpoint=True)
+        return x - self.left, y - self.top
+
+    def populate_tile(self, n_blobs, n_foods):
+        self.spawn_food(n_foods)
+        self.spawn_blobs(n_blobs)
+
+    def spawn_frame_food(self):
+        count = int(self.rng.poisson(self.food_spawn_rate))
+        if self.food_capacity is not None:
+            count = max(0, min(count, self.food_capacity - self.food_count))
+        if count:
+            self.spawn_food(count)
+
+    def visible_foods(self):
+        if not len(self.ghosts):
+            return super().visible_foods()
+        foods = self.foods
+        return tuple(np.concatenate((foods[field], self.ghosts[field])) for field in ("id", "x", "y", "size"))
+
+    def collect_statistics(self):
+        # Statistics are only meaningful once migrants have arrived, see write_statistics
+        return None
+
+    def step(self):
+        super().step()
+        self.statistics_log.clear() # Only holds the Nones from collect_statistics
+
+    def publish(self, buffers):
+        '''Moves blobs that left the tile into this tile's outbox and publishes the border foods (first phase of the exchange)'''
+        blobs = self.blobs
+        tile_count = self.layout.tile_count
+        destinations = self.layout.tiles_of(blobs["x"] + self.left, blobs["y"] + self.top)
+        leaving = np.flatnonzero(destinations != self.tile_index)[:buffers.migrants.shape[1]]
+        order = np.argsort(destinations[leaving], kind="stable")
+        leaving = leaving[order]
+        outbox = buffers.migrants[self.tile_index, :len(leaving)]
+        for field in BLOB_FIELDS:
+            outbox[field] = blobs[field][leaving]
+        outbox["x"] += self.left
+        outbox["y"] += self.top
+        buffers.migrant_offsets[self.tile_index] = np.searchsorted(destinations[leaving], np.arange(tile_count + 1))
+        staying = np.ones(self.blob_count, dtype=bool)
+        staying[leaving] = False
+        self.keep(blobs, staying)
+
+        foods = self.foods
+        near_border = np.flatnonzero(
+            (foods["x"] < GHOST_MARGIN) | (foods["x"] >= self.width - GHOST_MARGIN)
+            | (foods["y"] < GHOST_MARGIN) | (foods["y"] >= self.height - GHOST_MARGIN)
+        )[:buffers.ghosts.shape[1]]
+        ghosts = buffers.ghosts[self.tile_index, :len(near_border)]
+        ghosts["id"] = foods["id"][near_border]
+        ghosts["x"] = foods["x"][near_border] + self.left
+        ghosts["y"] = foods["y"][near_border] + self.top
+        ghosts["size"] = foods["size"][near_border]
+        buffers.ghost_counts[self.tile_index] = len(near_border)
+
+    def collect(self, buffers):
+        '''Takes in the blobs other tiles handed over and the neighbours' border foods, then writes this tile's statistics'''
+        arrivals = []
+        for tile in range(self.layout.tile_count):
+            start, stop = buffers.migrant_offsets[tile, self.tile_index:self.tile_index + 2]
+            if stop > start:
+                arrivals.append(buffers.migrants[tile, start:stop])
+        if arrivals:
+            arrivals = np.concatenate(arrivals)
+            self.append(self.blobs, {field: arrivals[field] for field in BLOB_FIELDS})
+            self.blobs["x"][-len(arrivals):] -= self.left
+            self.blobs["y"][-len(arrivals):] -= self.top
+
+        ghosts = []
+        for tile in self.layout.neighbours(self.tile_index):
+            border_foods = buffers.ghosts[tile, :buffers.ghost_counts[tile]]
+            visible = ((border_foods["x"] >= self.left - GHOST_MARGIN) & (border_foods["x"] < self.left + self.width + GHOST_MARGIN)
+                       & (border_foods["y"] >= self.top - GHOST_MARGIN) & (border_foods["y"] < self.top + self.height + GHOST_MARGIN))
+            ghosts.append(border_foods[visible])
+        self.ghosts = np.concatenate(ghosts) if ghosts else np.empty(0, dtype=GHOST_RECORD)
+        self.ghosts["x"] -= self.left
+        self.ghosts["y"] -= self.top
+
+        self.write_statistics(buffers.statistics[self.tile_index])
+
+    def write_statistics(self, row):
+        blobs = self.blobs
+        row["blob_count"] = self.blob_count
+        row["food_count"] = self.food_count
+        row["num_offsprings"] = self.num_offsprings
+        row["num_mutations"] = self.num_mutations
+        for attribute in STATISTICS_ATTRIBUTES:
+            values = blobs[attribute]
+            row[f"{attribute}_sum"] = values.sum()
+            row[f"{attribute}_min"] = values.min() if len(values) else 0
+            row[f"{attribute}_max"] = values.max() if len(values) else 0
+
+def run_tile(tile_index, layout, configs, seed_sequence, start_counts, buffer_arguments, barrier):
+    '''Worker process main: steps one TileWorld in lockstep with the other tiles until told to stop'''
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by ShardedWorld, which then stops the workers
+    buffers = SharedBuffers(*buffer_arguments)
+    try:
+        world = TileWorld(tile_index, layout, *configs, seed_sequence)
+        world.populate_tile(*start_counts)
+        world.publish(buffers)
+        barrier.wait(BARRIER_TIMEOUT)
+        world.collect(buffers)
+        barrier.wait(BARRIER_TIMEOUT)
+
+        while True:
+            barrier.wait(BARRIER_TIMEOUT) # ShardedWorld has set the command
+            if buffers.control[0] == COMMAND_STOP:
+                break
+            world.step()
+            world.publish(buffers)
+            barrier.wait(BARRIER_TIMEOUT) # Every outbox is written
+            world.collect(buffers)
+            barrier.wait(BARRIER_TIMEOUT) # Every outbox is read and every statistics row written
+    except threading.BrokenBarrierError: # Another process gave up, it reports why
+        pass
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        buffers.close()
+
+class ShardedWorld:
+    """
+    A VectorizedWorld split over tiles = (columns, rows) worker processes (see the module docstring).
+    Used like a Simulation without rendering: attach observers, populate(), then step() or run().
+    Call close() when done, it stops the workers and frees the shared memory.
+
+    Every step is three barriers: the coordinator sets the command, the tiles step and fill their
+    outboxes, the tiles empty each other's outboxes and write their statistics. migration_capacity and
+    ghost_capacity bound the per-tile shared buffers (see MIGRATION_CAPACITY and GHOST_CAPACITY).
+    Food settings the tiles can not follow raise ValueError, food_config_note describes the ones they
+    follow differently (see check_food_config).
+    """
+
+    def __init__(self, start_config=SIMULATION_START_CONFIG, blob_config=BLOB_CONFIG, food_config=FOOD_CONFIG,
+                 width=ARENA_WIDTH, height=ARENA_HEIGHT, tiles=(2, 2), seed=None, keep_statistics_log=True,
+                 migration_capacity=MIGRATION_CAPACITY, ghost_capacity=GHOST_CAPACITY):
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
+        self.seed = seed
+        self.food_config_note = check_food_config(food_config)
+        self.configs = (start_config, blob_config, food_config)
+        self.width = width
+        self.height = height
+        self.layout = TileLayout(width, height, *tiles)
+        # Spawn positions must fit both the tile and the arena margin, which fails for tiles narrower than an entity
+        max_size = max(blob_config["BLOB_SIZE"]["max"], food_config["FOOD_SIZE"]["max"])
+        smallest_tile = min(np.diff(self.layout.x_edges).min(), np.diff(self.layout.y_edges).min())
+        if smallest_tile < 2 * max_size:
+            raise ValueError(f"Tiles of {tiles[0]}x{tiles[1]} over a {width}x{height} arena are {smallest_tile} wide, "
+                             f"at least {2 * max_size} (twice the largest blob/food size) is needed")
+        self.migration_capacity = migration_capacity
+        self.ghost_capacity = ghost_capacity
+        self.keep_statistics_log = keep_statistics_log
+
+        self.statistics_log = []
+        self.observers = []
+        self.running = False
+        self.frame_count = 0
+        self.blob_count = 0
+        self.buffers = None
+        self.barrier = None
+        self.processes = []
+        self.in_step = False
+
+    @property
+    def tile_count(self):
+        return self.layout.tile_count
+
+    def attach(self, observer):
+        self.observers.append(observer)
+
+    def populate(self):
+        """Starts one worker per tile, each creating its share (by area) of the starting blobs and foods."""
+        start_config = self.configs[0]
+        *tile_seeds, coordinator_seed = np.random.SeedSequence(self.seed).spawn(self.tile_count + 1)
+        rng = np.random.default_rng(coordinator_seed)
+        area_fractions = [self.layout.area_fraction(tile) for tile in range(self.tile_count)]
+        blob_counts = rng.multinomial(start_config["N_STARTING_BLOB"], area_fractions)
+        food_counts = rng.multinomial(start_config["N_STARTING_FOOD"], area_fractions)
+
+        context = multiprocessing.get_context("spawn") # Never fork a process that may be running telemetry/checkpoint threads
+        self.buffers = SharedBuffers(self.tile_count, self.migration_capacity, self.ghost_capacity)
+        self.barrier = context.Barrier(self.tile_count + 1)
+        buffer_arguments = (self.tile_count, self.migration_capacity, self.ghost_capacity, self.buffers.name)
+        self.processes = [
+            context.Process(target=run_tile, daemon=True, args=(
+                tile, self.layout, self.configs, tile_seeds[tile], (int(blob_counts[tile]), int(food_counts[tile])), buffer_arguments, self.barrier
+            ))
+            for tile in range(self.tile_count)
+        ]
+        for process in self.processes:
+            process.start()
+
+        self.in_step = True
+        self.wait() # Outboxes written
+        self.wait() # Outboxes read, statistics written
+        self.in_step = False
+        self.blob_count = int(self.buffers.statistics["blob_count"].sum())
+
+    def wait(self):
+        try:
+            self.barrier.wait(BARRIER_TIMEOUT)
+        except threading.BrokenBarrierError:
+            raise RuntimeError("A tile worker failed or stopped responding (see its traceback above)") from None
+
+    def collect_statistics(self):
+        '''Returns the same statistics dict as Simulation.collect_statistics, combined from the tiles' statistics rows'''
+        tiles = self.buffers.statistics
+        blob_count = int(tiles["blob_count"].sum())
+        populated = tiles["blob_count"] > 0
+        statistics = {"frame": self.frame_count, "blob_count": blob_count}
+        for attribute in STATISTICS_ATTRIBUTES:
+            statistics[f"blob_avg_{attribute}"] = float(tiles[f"{attribute}_sum"].sum() / blob_count) if blob_count else 0
+            statistics[f"blob_min_{attribute}"] = int(tiles[f"{attribute}_min"][populated].min()) if blob_count else None
+            statistics[f"blob_max_{attribute}"] = int(tiles[f"{attribute}_max"][populated].max()) if blob_count else None
+        statistics["food_count"] = int(tiles["food_count"].sum())
+        statistics["num_offsprings"] = int(tiles["num_offsprings"].sum())
+        statistics["num_mutations"] = int(tiles["num_mutations"].sum())
+        return statistics
+
+    def step(self):
+        """Advances every tile by one frame and returns the combined statistics dict."""
+        self.in_step = True
+        self.buffers.control[0] = COMMAND_STEP
+        self.wait() # Workers read the command
+        self.wait() # Outboxes written
+        self.wait() # Outboxes read, statistics written
+        self.in_step = False
+
+        statistics = self.collect_statistics()
+        self.blob_count = statistics["blob_count"]
+        if self.keep_statistics_log:
+            self.statistics_log.append(statistics)
+        for observer in self.observers:
+            observer.on_step(self, statistics)
+        self.frame_count += 1
+        return statistics
+
+    def run(self, max_frames=None):
+        """Steps until stop() is called, max_frames frames have run or every blob has died."""
+        self.running = True
+        try:
+            while self.running and self.blob_count and (max_frames is None or self.frame_count < max_frames):
+                self.step()
+        finally:
+            self.running = False
+            for observer in self.observers:
+                observer.on_finish(self)
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        '''Stops the workers and frees the shared memory. Safe to call more than once'''
+        if self.buffers is None:
+            return
+        if self.in_step or self.barrier.broken: # Interrupted mid-frame, the workers can only be released by breaking the barrier
+            self.barrier.abort()
+        else:
+            self.buffers.control[0] = COMMAND_STOP
+            try:
+                self.barrier.wait(BARRIER_TIMEOUT)
+            except threading.BrokenBarrierError:
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.buffers.close(unlink=True)
+        self.buffers = None
@@ -1,17 +1,25 @@
-import pygame
-import random
+import argparse
+import functools
 import math
-import csv
-import numpy as np
+import time
 from datetime import datetime
-
-pygame.init()
+from spatial_grid import SpatialGrid
+from stats_writer import make_stats_sink
+from population_stats import PopulationStats
+from trait_sampler import TraitSampler
+from rng import RNGStreams
+from entity_store import EntityStore
+from profiling import FrameProfiler
+from food_field import FoodField, FoodMass
+
+# The simulation engine in this module never imports pygame. Rendering lives in renderer.py
+# and is only loaded by main() when the window is actually shown.
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 800
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-clock = pygame.time.Clock()
-font = pygame.font.Font(None, 24)
+# Size of the simulated world. Independent of the window, the renderer scales the arena to fit it
+ARENA_WIDTH = SCREEN_WIDTH
+ARENA_HEIGHT = SCREEN_HEIGHT
 
 # CONSTANTS
 BLACK = (0, 0, 0)
@@ -20,11 +28,19 @@ RED = (255, 64, 64)
 GREEN = (64, 255, 64)
 BLUE = (64, 64, 255)
 
-QUICK_DATA_MODE = False # Don't display simulation, JUST GET DATA
+SIMULATION_SEED = None # Master seed for every random stream. None picks a fresh one (printed at start, so the run can be replayed)
+QUICK_DATA_MODE = False # Don't display simulation, JUST GET DATA (runs headless, no pygame needed)
 LIVE_STATS_DISPLAY = True
-NUM_OFFSPRINGS = 0
-NUM_MUTATIONS = 0
-statistics_log = []  # List to store simulation statistics over time
+PROFILE = False # Per-phase frame timings and counters in the stats stream and overlay. P in the window toggles them at runtime (stats files only have the columns when this is on)
+STATS_OUTPUT_FORMAT = "csv" # "csv", "npy" (directory of .npz chunks) or "parquet" (needs pyarrow)
+STATS_SAMPLE_INTERVAL = 1 # Record statistics every n frames
+STATS_CHUNK_SIZE = 1024 # Frames buffered in memory before being appended to the stats file
+SNAPSHOT_INTERVAL = 0 # Record full blob/food state every n frames for replay and analysis (see snapshots.py). 0 turns it off
+TELEMETRY_ADDRESS = None # Stream live statistics over HTTP, "host:port" or a Unix socket path (see telemetry.py). None turns it off
+TELEMETRY_SAMPLE_INTERVAL = 1 # Stream every n-th frame
+RECORD_LINEAGE = False # Log every birth (parent, trait changes) and death for ancestry/lineage analysis (see lineage.py)
+CHECKPOINT_INTERVAL = 0 # Save the full world state every n frames, resume with --resume (see checkpoint.py). 0 turns it off
+SHARD_TILES = None # (columns, rows): split the arena into tiles, each stepped by its own worker process (see sharded_world.py). Headless only. None turns it off
 
 #TODO Eventually make config dicts into jsons that i can extract from
 
@@ -84,7 +100,14 @@ FOOD_CONFIG = {
         "max": 7
     },
     "FOOD_ENERGY_TO_SIZE_MULTIPLIER": 6, # Energy food gives is calculated by area. after area calculation, this multiplier is applied to result as final energy value of food
-    "FOOD_SPAWN_CHANCE_PER_FRAME": 0.6
+    "FOOD_SPAWN_CHANCE_PER_FRAME": 0.6,
+    "FOOD_SPAWN_MODE": "chance", # "chance": one food with FOOD_SPAWN_CHANCE_PER_FRAME per frame. "poisson": Poisson(FOOD_SPAWN_RATE) foods per frame, spawned as one batch
+    "FOOD_SPAWN_RATE": 0.6, # Mean foods spawned per frame in "poisson" mode
+    "FOOD_CAPACITY": None, # Carrying capacity, no food spawns while this many foods exist (bounds the food list after extinction). None for no limit
+    "FOOD_DENSITY_MAP": None, # 2D grid (nested lists or .npy filename) of relative spawn weights stretched over the arena. None spawns uniformly
+    "FOOD_MASS_MODE": False, # Keep food as energy mass per grid cell instead of individual foods (for very large worlds, see food_field.FoodMass)
+    "FOOD_MASS_CELL_SIZE": 25,
+    "FOOD_GRID_CELL_SIZE": 50 # Cell size of the spatial grid used for nearest food lookups. Around the typical blob-to-food distance works best
 }
 
 # ENVIRONMENT CONFIG
@@ -93,11 +116,17 @@ ENVIRONMENT_CONFIG = {
     #TODO
 }
     
-FPS = 120
+# Blob action codes, index into Blob.action_counts
+ACTION_CONSUME_FOOD = 0
+ACTION_MOVE = 1
+ACTION_MOVE_ENERGY = 2
+ACTION_CONSTANT_ENERGY = 3
+ACTION_NAMES = ("consume food", "move", "move energy", "constant energy")
 
-# Track all existing foods and blobs
-foods = []
-blobs = []
+FPS = 120
+RENDER_EVERY = 1 # Draw the window every n simulation steps. Higher values let the simulation outrun the display (Up/Down keys change it while running)
+RUN_IN_THREAD = False # Step the simulation on a worker thread while the window shows its latest state at FPS (see scheduler.py)
+STEPS_PER_SECOND = None # Step rate limit when RUN_IN_THREAD. None runs flat out (Up/Down keys change it while running)
 
 
 # HELPER FUNCTIONS
@@ -115,7 +144,7 @@ def get_theta(x1, y1, x2, y2):
     return math.atan2(y2 - y1, x2 - x1)
 
 def find_closest_obj(obj_a, list_of_objects):
-    '''Returns closest obj to obj_a from a list of objs in list_of_objects, assuming all objs have x and y attributes'''
+    '''Returns closest obj to obj_a from a list of objs in list_of_objects, assuming all objs have x, y and id attributes. Ties go to the lowest id'''
     
     if len(list_of_objects) <= 1:
         print("[WARNING] ONE OBJ LEFT: FIND_CLOSEST_OBJ")
@@ -125,7 +154,7 @@ def find_closest_obj(obj_a, list_of_objects):
 
     for obj_b in list_of_objects[1:]: # avoid checking index 0 since that is already set for closest_obj
         distance = get_distance(obj_a.x, obj_a.y, obj_b.x, obj_b.y)
-        if distance < closest_obj_distance: # new closest obj
+        if distance < closest_obj_distance or (distance == closest_obj_distance and obj_b.id < closest_obj.id): # new closest obj
             closest_obj_distance = distance
             closest_obj = obj_b
 
@@ -142,114 +171,41 @@ def calculate_circle_area(radius):
     '''Returns circle area in same units as radius is in'''
     return math.pi * (radius ** 2)
 
-def generate_normal_stat(mean, std_dev, min, max):
-    '''Returns a random statistic based off predetermined normal distribution parameters as well as min and max value boundaries'''
-    generated_stat = np.random.normal(mean, std_dev)
-    while not (min <= generated_stat <= max):
-        generated_stat = np.random.normal(mean, std_dev)
-    return int(generated_stat)
-
-def generate_normal_stat_with_dict(stat_dict):
-    '''Returns a random statistic based off predetermined normal distribution parameters from a config dictionary. Config dictionary must have 'mean', 'std_dev', 'min', and 'max' keys.'''
-    return generate_normal_stat(
-        stat_dict['mean'],
-        stat_dict['std_dev'],
-        stat_dict['min'],
-        stat_dict['max']
-    )
-
-def mutate_attribute(value, attribute_dict):
-    """
-    Applies mutation to an attribute based on a probability.
-    If mutation occurs, generates a new value within the defined range.
-    """
-    global NUM_MUTATIONS
-    if random.random() < BLOB_CONFIG["BLOB_REPRODUCTION"]["mutation_chance"]:
-        NUM_MUTATIONS += 1
-        return generate_normal_stat_with_dict(attribute_dict)
-    return value
-
-def generate_blob(custom_blob_config=BLOB_CONFIG, parent_blob=None):
-    """
-    Generates a new Blob. If a parent_blob is provided, it inherits traits with possible mutations.
-    """
-    blob_size = generate_normal_stat_with_dict(custom_blob_config["BLOB_SIZE"])
-    
-    if parent_blob:
-        # Copy attributes from parent and apply mutations
-        offspring_attributes = {
-            "size": mutate_attribute(parent_blob.size, BLOB_CONFIG["BLOB_SIZE"]),
-            "speed": mutate_attribute(parent_blob.speed, BLOB_CONFIG["BLOB_SPEED"]),
-            "required_reproduction_energy": mutate_attribute(parent_blob.required_reproduction_energy, 
-                                                             BLOB_CONFIG["BLOB_REPRODUCTION"]["required_energy"]),
-            "offspring_amount": mutate_attribute(parent_blob.offspring_amount, BLOB_CONFIG["BLOB_REPRODUCTION"]["offspring_amount"]),
-            "energy": BLOB_CONFIG["BLOB_START_ENERGY"]["mean"],  # Reset energy for new blobs
-        }
-        
-    else:
-        # Normal new blob generation
-        offspring_attributes = {
-            "size": blob_size,
-            "speed": generate_normal_stat_with_dict(custom_blob_config["BLOB_SPEED"]),
-            "required_reproduction_energy": generate_normal_stat_with_dict(custom_blob_config["BLOB_REPRODUCTION"]["required_energy"]),
-            "offspring_amount": generate_normal_stat_with_dict(custom_blob_config["BLOB_REPRODUCTION"]["offspring_amount"]),
-            "energy": generate_normal_stat_with_dict(custom_blob_config["BLOB_START_ENERGY"])
-        }
-
-    return Blob(
-        blob_id_tracker.issue_id(),
-        random.choice(custom_blob_config["BLOB_COLORS"]),
-        random.randint(blob_size, SCREEN_WIDTH - blob_size),
-        random.randint(blob_size, SCREEN_HEIGHT - blob_size),
-        offspring_attributes["required_reproduction_energy"],
-        offspring_attributes["offspring_amount"],
-        offspring_attributes["size"],
-        offspring_attributes["speed"],
-        offspring_attributes["energy"]
-    )
-
-def generate_food(custom_food_config=FOOD_CONFIG):
-    '''Returns a Food object of Class Food based off (optional) dictionary config (else, defaults to global config, FOOD_CONFIG)'''
-
-    food_size = generate_normal_stat_with_dict(custom_food_config["FOOD_SIZE"])
-
-    return Food(
-        food_id_tracker.issue_id(), 
-        random.choice(custom_food_config["FOOD_COLORS"]),
-        random.randint(food_size, SCREEN_WIDTH - food_size), 
-        random.randint(food_size, SCREEN_HEIGHT - food_size),
-        food_size
-        )
-
-def average_attribute(entities, attribute):
-    return sum(getattr(obj, attribute) for obj in entities) / len(entities) if entities else 0
+# Canonical instance of every color in use, so entities all share one tuple per color
+_interned_colors = {}
+
+def intern_color(color):
+    '''Returns the shared tuple for color (any RGB sequence, e.g. a list from a JSON config)'''
+    color = tuple(color)
+    return _interned_colors.setdefault(color, color)
+
+# Energy costs only depend on small bounded integer traits, so they are computed once per distinct value
+@functools.lru_cache(maxsize=None)
+def constant_energy_cost(size):
+    '''Energy a blob of this size uses every frame no matter what (area scaled down by 200, rounded)'''
+    return round(calculate_circle_area(size) / 200)
+
+@functools.lru_cache(maxsize=None)
+def movement_energy_cost(size, speed):
+    '''Energy a blob of this size and speed uses per move (area * speed scaled down by 200, rounded)'''
+    return round(calculate_circle_area(size) * speed / 200)
+
+@functools.lru_cache(maxsize=None)
+def food_energy_value(size, energy_to_size_multiplier):
+    '''Energy a food of this size gives (area times the multiplier, rounded)'''
+    return round(energy_to_size_multiplier * calculate_circle_area(size))
+
+def precompute_energy_tables(blob_config, food_config):
+    '''Fills the energy cost and food energy caches for every size/speed the configs can produce'''
+    blob_sizes = range(blob_config["BLOB_SIZE"]["min"], blob_config["BLOB_SIZE"]["max"] + 1)
+    blob_speeds = range(blob_config["BLOB_SPEED"]["min"], blob_config["BLOB_SPEED"]["max"] + 1)
+    for size in blob_sizes:
+        constant_energy_cost(size)
+        for speed in blob_speeds:
+            movement_energy_cost(size, speed)
+    for size in range(food_config["FOOD_SIZE"]["min"], food_config["FOOD_SIZE"]["max"] + 1):
+        food_energy_value(size, food_config["FOOD_ENERGY_TO_SIZE_MULTIPLIER"])
 
-def max_attribute(entities, attribute):
-    return max(getattr(obj, attribute) for obj in entities) if entities else None
-
-def min_attribute(entities, attribute):
-    return min(getattr(obj, attribute) for obj in entities) if entities else None
-
-def render_dict_as_text(surface, stats_dict, font, color, x, y, line_spacing=5, rounding=1):
-    """Render a dictionary as text on the pygame screen."""
-    
-    y_offset = 0
-    
-    for key, value in stats_dict.items():
-        stat_text = f"{key}: {round(value, rounding)}"
-        text_surface = font.render(stat_text, True, color)
-        surface.blit(text_surface, (x + 10, y + y_offset))
-        y_offset += font.get_height() + line_spacing
-            
-def save_statistics_to_csv():
-    """Saves the logged simulation statistics to a CSV file."""
-    filename = f"data/simulation_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    with open(filename, mode="w", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=statistics_log[0].keys())
-        writer.writeheader()
-        writer.writerows(statistics_log)
-    print(f"Simulation statistics saved to {filename}")
-        
 class IDTracker:
     def __init__(self):
         self.current_id = 0
@@ -260,19 +216,18 @@ class IDTracker:
         self.issued_ids.add(self.current_id)
         return self.current_id
 
-food_id_tracker = IDTracker()
-blob_id_tracker = IDTracker()
-
 class Food:
-    def __init__(self, id, color, x, y, size):
+    __slots__ = ("id", "x", "y", "size", "color", "energy_value")
+
+    def __init__(self, id, color, x, y, size, energy_to_size_multiplier):
         self.id = id
         self.x = x
         self.y = y
         self.size = size
         self.color = color
 
-        # energy_value calculation (just calculates area of food then scales down by 10 and rounds)
-        self.energy_value = round(FOOD_CONFIG["FOOD_ENERGY_TO_SIZE_MULTIPLIER"] * math.pi * (size ** 2))
+        # energy_value calculation (just calculates area of food then applies the multiplier from the simulation's food_config and rounds)
+        self.energy_value = food_energy_value(size, energy_to_size_multiplier)
 
     def print_stats(self):
         print(f'''
@@ -301,11 +256,11 @@ class Food:
             return self.id == other.id
         return False
 
-    def draw(self):
-        pygame.draw.circle(screen, self.color, (self.x, self.y), self.size)
-
 class Blob:
-    def __init__(self, id, color, x, y, required_reproduction_energy, offspring_amount, size, speed, energy):
+    __slots__ = ("id", "color", "x", "y", "required_reproduction_energy", "offspring_amount", "size", "speed", "energy",
+                 "action_counts", "constant_energy_cost", "movement_energy_cost", "parent_id", "birth_frame")
+
+    def __init__(self, id, color, x, y, required_reproduction_energy, offspring_amount, size, speed, energy, parent_id=0, birth_frame=0):
         self.id = id
         self.color = color
         self.x = x
@@ -315,60 +270,84 @@ class Blob:
         self.size = size
         self.speed = speed
         self.energy = energy
-        self.actions = []
-
-    def food_action(self, foods):
-
-        closest_food = find_closest_obj(self, foods) # Find closest food obj out of list of food objects
-
+        self.parent_id = parent_id # 0 for blobs that were not born from another blob
+        self.birth_frame = birth_frame
+        self.action_counts = [0] * len(ACTION_NAMES) # How often each action was taken. Fixed size, so memory stays flat however old the blob gets
+
+        # Per-frame energy drains. Traits never change after birth (mutations create a new blob), so they are looked up once
+        self.constant_energy_cost = constant_energy_cost(size)
+        self.movement_energy_cost = movement_energy_cost(size, speed)
+
+    def find_food(self, foods, food_grid=None):
+        '''Returns the food the blob goes for this frame (the closest one), or None if there is no food left'''
+        if food_grid is not None:
+            return food_grid.find_closest(self) # Only searches grid cells near the blob
+        return find_closest_obj(self, foods) # Find closest food obj out of list of food objects
+
+    def approach_food(self, closest_food, foods, food_grid=None):
+        '''Eats closest_food if touching it, otherwise moves towards it and pays movement energy'''
         if collision(self, closest_food): # WE ARE TOUCHING FOOD
             self.energy += closest_food.energy_value # consume food and get energy
-            foods.remove(closest_food) # remove food from ecosystem
+            foods.remove(closest_food) # remove food from ecosystem (O(1) when foods is an EntityStore)
+            if food_grid is not None:
+                food_grid.remove(closest_food)
 
-            self.actions.append("consume food")
+            self.action_counts[ACTION_CONSUME_FOOD] += 1
 
         else: # WE ARE NOT TOUCHING FOOD
             theta = get_theta(self.x, self.y, closest_food.x, closest_food.y)
             self.move(theta)
             self.use_energy_for_movement()
 
+    def find_food_cell(self, food_mass):
+        '''find_food for food mass mode: the blob's own position if it can eat from its cell, otherwise the nearest cell with food (None if there is none)'''
+        if food_mass.can_eat(self.x, self.y):
+            return (self.x, self.y)
+        return food_mass.nearest_food_cell(self.x, self.y)
+
+    def approach_food_cell(self, target, food_mass):
+        '''approach_food for food mass mode: eat a bite from the cell the blob is in, otherwise move towards target'''
+        eaten = food_mass.eat(self.x, self.y)
+        if eaten:
+            self.energy += eaten
+            self.action_counts[ACTION_CONSUME_FOOD] += 1
+            return
+        self.move(get_theta(self.x, self.y, target[0], target[1]))
+        self.use_energy_for_movement()
+
     def move(self, theta):
         radius_endpoint_x, radius_endpoint_y = get_radius_endpoint(self.x, self.y, self.speed, theta)
         self.x = radius_endpoint_x
         self.y = radius_endpoint_y
 
-        self.actions.append("move")
+        self.action_counts[ACTION_MOVE] += 1
 
     def use_energy_for_movement(self):
-        area_size = calculate_circle_area(self.size)
-
-        # calculate energy use based off area_size * speed scaled down to 10 and rounded
-        energy_used = round(area_size * self.speed / 200)
-        self.energy -= energy_used
-        self.actions.append("move energy")
+        # energy use based off area_size * speed scaled down by 200 and rounded (see movement_energy_cost)
+        self.energy -= self.movement_energy_cost
+        self.action_counts[ACTION_MOVE_ENERGY] += 1
 
     def use_constant_energy(self): # energy used constantly, no matter what
-        area_size = calculate_circle_area(self.size)
+        # energy use based off area_size scaled down by 200 and rounded (see constant_energy_cost)
+        self.energy -= self.constant_energy_cost
+        self.action_counts[ACTION_CONSTANT_ENERGY] += 1
 
-        # calculate energy use based off area_size scaled down to 10 and rounded
-        energy_used = round(area_size / 200)
-        self.energy -= energy_used
+    @property
+    def actions(self):
+        '''Dict of action name -> number of times taken'''
+        return dict(zip(ACTION_NAMES, self.action_counts))
 
-        self.actions.append("constant energy")
-
-    def reproduce(self):
+    def reproduce(self, simulation):
         """
         Handles reproduction by generating offspring blobs with possible mutations.
         The parent blob loses the required reproduction energy.
         """
         self.energy -= self.required_reproduction_energy
-        
-        global NUM_OFFSPRINGS
 
         offspring_list = []
         for _ in range(self.offspring_amount):
-            NUM_OFFSPRINGS += 1
-            offspring_list.append(generate_blob(parent_blob=self))
+            simulation.num_offsprings += 1
+            offspring_list.append(simulation.generate_blob(parent_blob=self))
 
         return offspring_list
 
@@ -408,87 +387,457 @@ class Blob:
         if isinstance(other, Blob):
             return self.id == other.id
         return False
-    
-    def draw(self):
-        pygame.draw.circle(screen, self.color, (self.x, self.y), self.size)
 
-def main():
+class Simulation:
+    """
+    Headless simulation engine. Owns all world state (foods, blobs, ID trackers, counters, statistics_log)
+    and advances it one frame per step(). Does not depend on pygame.
+
+    Observers (e.g. renderer.PygameRenderer, stats_writer.CsvStatsSink) can be attached to get called after
+    every step with observer.on_step(simulation, statistics), and observer.on_finish(simulation) when run() ends.
+    Observers that also define on_frame_end(simulation) (e.g. checkpoint.CheckpointWriter) are called once more
+    at the very end of step(), when the frame is complete and frame_count already counts it.
+
+    With keep_statistics_log=False no statistics are kept in memory, attach a stats sink to record them instead.
+    With extra_statistics=True every frame's statistics also include per-trait variances.
+    With profile=True every frame's statistics also include the FrameProfiler values (phase times and counters
+    of the previous frame, rolling p50/p99 frame times). set_profiling() switches the profiler while running.
+    All randomness comes from RNGStreams derived from seed, so the same seed replays a bit-identical run.
+    """
 
-    # will remain static food elements for now. will change over time
-    for _ in range(SIMULATION_START_CONFIG["N_STARTING_FOOD"]): # Food Creation
-        foods.append(generate_food())
+    def __init__(self, start_config=SIMULATION_START_CONFIG, blob_config=BLOB_CONFIG, food_config=FOOD_CONFIG,
+                 width=ARENA_WIDTH, height=ARENA_HEIGHT, keep_statistics_log=True, extra_statistics=False, seed=None,
+                 profile=False):
+        self.start_config = start_config
+        self.blob_config = blob_config
+        self.food_config = food_config
+        self.width = width
+        self.height = height
+        precompute_energy_tables(blob_config, food_config)
+        self.blob_colors = [intern_color(color) for color in blob_config["BLOB_COLORS"]]
+        self.food_colors = [intern_color(color) for color in food_config["FOOD_COLORS"]]
+
+        # Track all existing foods and blobs
+        self.foods = EntityStore() # O(1) removal when food is eaten
+        self.blobs = EntityStore()
+        self.food_grid = SpatialGrid(food_config["FOOD_GRID_CELL_SIZE"], width, height) # Spatial index over foods, kept in sync with self.foods
+
+        self.food_id_tracker = IDTracker()
+        self.blob_id_tracker = IDTracker()
+        self.population_stats = PopulationStats() # Kept up to date on every birth, death and energy change
+        self.rng = RNGStreams(seed) # Independent per-subsystem random streams
+        self.seed = self.rng.master_seed
+        self.trait_sampler = TraitSampler(self.rng.traits) # Pre-generates trait values in blocks
+        self.food_field = FoodField(food_config, width, height, self.rng.food_spawn, self.rng.food_field) # How much food spawns and where
+        self.food_mass = None # Per-cell food energy replacing individual foods in food mass mode
+        if food_config["FOOD_MASS_MODE"]:
+            bite = food_energy_value(food_config["FOOD_SIZE"]["mean"], food_config["FOOD_ENERGY_TO_SIZE_MULTIPLIER"]) # Energy of an average food
+            self.food_mass = FoodMass(food_config["FOOD_MASS_CELL_SIZE"], width, height, bite)
+
+        self.num_offsprings = 0
+        self.num_mutations = 0
+        self.frame_count = 0
+        self.keep_statistics_log = keep_statistics_log
+        self.extra_statistics = extra_statistics
+        self.profile = profile
+        self.profiler = FrameProfiler(enabled=profile)
+        self.statistics_log = []  # List to store simulation statistics over time (only filled if keep_statistics_log)
+        self.dead_blobs = []  # Blobs that perished during the last step (kept around so observers can show them)
+        self.newborn_blobs = []  # Blobs born during the last step
+
+        self.observers = []
+        self.frame_end_observers = []  # Observers with on_frame_end
+        self.running = False
+
+    # Attributes that belong to the running process rather than to the world, left out of get_state()
+    TRANSIENT_ATTRIBUTES = ("observers", "frame_end_observers", "running", "profiler")
+
+    def attach(self, observer):
+        self.observers.append(observer)
+        if hasattr(observer, "on_frame_end"):
+            self.frame_end_observers.append(observer)
+
+    def get_state(self):
+        """
+        Returns the complete world state (entities, spatial index, ID trackers, counters, statistics and
+        RNG streams) as a dict that pickles as one object graph, e.g. for checkpoint.py. Observers and
+        the profiler are not part of it.
+        """
+        return {name: value for name, value in self.__dict__.items() if name not in self.TRANSIENT_ATTRIBUTES}
+
+    @classmethod
+    def from_state(cls, state):
+        '''Rebuilds a Simulation from get_state(), without observers. Stepping it continues exactly where the state left off'''
+        simulation = cls.__new__(cls)
+        simulation.__dict__.update(state)
+        precompute_energy_tables(simulation.blob_config, simulation.food_config)
+        simulation.profiler = FrameProfiler(enabled=simulation.profile)
+        simulation.observers = []
+        simulation.frame_end_observers = []
+        simulation.running = False
+        return simulation
+
+    def food_mass_records(self):
+        '''Returns (x, y, size, color) tuples drawing every food mass cell with food as one circle (see FoodMass.cell_radii)'''
+        _, x, y, energies = self.food_mass.cells_with_food()
+        sizes = self.food_mass.cell_radii(energies, self.food_config["FOOD_SIZE"]["mean"])
+        color = self.food_colors[0]
+        return [(center_x, center_y, size, color) for center_x, center_y, size in zip(x.tolist(), y.tolist(), sizes.tolist())]
+
+    def set_profiling(self, enabled):
+        '''Switches the profiler on/off. Once switched on, statistics include the profiler values (None while it is off)'''
+        self.profiler.enabled = enabled
+        if enabled:
+            self.profile = True
+
+    def stop(self):
+        self.running = False
+
+    def populate(self):
+        """Creates the starting foods and blobs from start_config."""
+        # will remain static food elements for now. will change over time
+        if self.food_field.batched or self.food_mass is not None:
+            self.spawn_food(self.start_config["N_STARTING_FOOD"])
+        else:
+            for _ in range(self.start_config["N_STARTING_FOOD"]): # Food Creation
+                self.add_food(self.generate_food())
+
+        for _ in range(self.start_config["N_STARTING_BLOB"]): # Blob Creation
+            self.add_blob(self.generate_blob())
+
+    def add_food(self, food):
+        '''Adds food to the ecosystem (foods list and food_grid index)'''
+        self.foods.append(food)
+        self.food_grid.insert(food)
+
+    def spawn_food(self, n):
+        '''Spawns n foods as one batch, placed by food_field (added to food_mass instead in food mass mode)'''
+        sizes = self.trait_sampler.draw_many(self.food_config["FOOD_SIZE"], n)
+        x, y = self.food_field.positions(sizes)
+        multiplier = self.food_config["FOOD_ENERGY_TO_SIZE_MULTIPLIER"]
+        if self.food_mass is not None:
+            self.food_mass.add(x, y, [food_energy_value(size, multiplier) for size in sizes.tolist()])
+            return
+
+        color_indices = self.rng.food_field.integers(len(self.food_colors), size=n)
+        for size, food_x, food_y, color_index in zip(sizes.tolist(), x.tolist(), y.tolist(), color_indices.tolist()):
+            self.add_food(Food(self.food_id_tracker.issue_id(), self.food_colors[color_index], food_x, food_y, size, multiplier))
+
+    def spawn_frame_food(self):
+        '''Spawns this frame's food (see FoodField). Without batching or food mass mode this is the original single food roll'''
+        count = self.food_field.spawn_count(self.food_count())
+        if not count:
+            return
+        if self.food_field.batched or self.food_mass is not None:
+            self.spawn_food(count)
+        else:
+            self.add_food(self.generate_food())
+
+    def food_count(self):
+        '''Number of foods in the world (in average-food bites in food mass mode)'''
+        return len(self.foods) if self.food_mass is None else self.food_mass.food_units()
+
+    def add_blob(self, blob):
+        '''Adds blob to the ecosystem (blobs list and population_stats)'''
+        self.blobs.append(blob)
+        self.population_stats.add(blob)
+
+    def mutate_attribute(self, value, attribute_dict):
+        """
+        Applies mutation to an attribute based on a probability.
+        If mutation occurs, generates a new value within the defined range.
+        """
+        if self.rng.mutation.random() < self.blob_config["BLOB_REPRODUCTION"]["mutation_chance"]:
+            self.num_mutations += 1
+            return self.trait_sampler.draw(attribute_dict)
+        return value
 
-    for _ in range(SIMULATION_START_CONFIG["N_STARTING_BLOB"]): # Blob Creation        
-        blobs.append(generate_blob())
-        
-    frame_count = 0
-    
-    running = True
-    
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+    def generate_blob(self, parent_blob=None):
+        """
+        Generates a new Blob. If a parent_blob is provided, it inherits traits with possible mutations.
+        """
+        blob_config = self.blob_config
+        blob_size = self.trait_sampler.draw(blob_config["BLOB_SIZE"])
+
+        if parent_blob:
+            # Copy attributes from parent and apply mutations
+            offspring_attributes = {
+                "size": self.mutate_attribute(parent_blob.size, blob_config["BLOB_SIZE"]),
+                "speed": self.mutate_attribute(parent_blob.speed, blob_config["BLOB_SPEED"]),
+                "required_reproduction_energy": self.mutate_attribute(parent_blob.required_reproduction_energy,
+                                                                      blob_config["BLOB_REPRODUCTION"]["required_energy"]),
+                "offspring_amount": self.mutate_attribute(parent_blob.offspring_amount, blob_config["BLOB_REPRODUCTION"]["offspring_amount"]),
+                "energy": blob_config["BLOB_START_ENERGY"]["mean"],  # Reset energy for new blobs
+            }
+
+        else:
+            # Normal new blob generation
+            offspring_attributes = {
+                "size": blob_size,
+                "speed": self.trait_sampler.draw(blob_config["BLOB_SPEED"]),
+                "required_reproduction_energy": self.trait_sampler.draw(blob_config["BLOB_REPRODUCTION"]["required_energy"]),
+                "offspring_amount": self.trait_sampler.draw(blob_config["BLOB_REPRODUCTION"]["offspring_amount"]),
+                "energy": self.trait_sampler.draw(blob_config["BLOB_START_ENERGY"])
+            }
+
+        return Blob(
+            self.blob_id_tracker.issue_id(),
+            self.rng.placement.choice(self.blob_colors),
+            self.rng.placement.randint(blob_size, self.width - blob_size),
+            self.rng.placement.randint(blob_size, self.height - blob_size),
+            offspring_attributes["required_reproduction_energy"],
+            offspring_attributes["offspring_amount"],
+            offspring_attributes["size"],
+            offspring_attributes["speed"],
+            offspring_attributes["energy"],
+            parent_blob.id if parent_blob else 0,
+            self.frame_count
+        )
 
-        screen.fill(BLACK)
+    def generate_food(self):
+        '''Returns a Food object of Class Food based off the simulation's food_config'''
 
-        # CHANCE OF FOOD SPAWNING
-        if random.random() < FOOD_CONFIG["FOOD_SPAWN_CHANCE_PER_FRAME"]:
-            foods.append(generate_food())
-            
-        if not QUICK_DATA_MODE:
-            for food in foods:
-                food.draw()
-            
-        random.shuffle(blobs) # Shuffle to ensure fairness and equal chance for best order
-        for blob in blobs:
-            blob.use_constant_energy()
-            blob.food_action(foods)
-            
-            if blob.energy <= 0: # Blob no longer has energy, so it will perish
-                blobs.remove(blob)
-                blob.color = WHITE # Change color to show it will die
-            
-            elif blob.energy >= blob.required_reproduction_energy + BLOB_CONFIG["BLOB_REPRODUCTION"]["excess_energy_required"]:
-                offspring = blob.reproduce()
-                blobs.extend(offspring)
-                
-            # blob.print_stats(show_actions=False)
-            if not QUICK_DATA_MODE:
-                blob.draw()
-
-        # TODO Add logic to store each game state for data purposes (time-based game state data so we can analyze trends over time and stuff)
-            # Should be a DF containing each Blob's attributes (diffrentiated by its id attribute) as well as the time (aka generation/day) of that data snapshot
-            
+        food_size = self.trait_sampler.draw(self.food_config["FOOD_SIZE"])
+
+        return Food(
+            self.food_id_tracker.issue_id(),
+            self.rng.placement.choice(self.food_colors),
+            self.rng.placement.randint(food_size, self.width - food_size),
+            self.rng.placement.randint(food_size, self.height - food_size),
+            food_size,
+            self.food_config["FOOD_ENERGY_TO_SIZE_MULTIPLIER"]
+            )
+
+    def collect_statistics(self):
+        # Read from the incrementally maintained population_stats, so this costs the same at any population size
+        population_stats = self.population_stats
         statistics = {
-            "frame": frame_count,
-            "blob_count": len(blobs),
-            "blob_avg_speed": average_attribute(blobs, "speed"),
-            "blob_min_speed": min_attribute(blobs, "speed"),
-            "blob_max_speed": max_attribute(blobs, "speed"),
-            "blob_avg_size": average_attribute(blobs, "size"),
-            "blob_min_size": min_attribute(blobs, "size"),
-            "blob_max_size": max_attribute(blobs, "size"),
-            "blob_avg_energy": average_attribute(blobs, "energy"),
-            "blob_min_energy": min_attribute(blobs, "energy"),
-            "blob_max_energy": max_attribute(blobs, "energy"),
-            "food_count": len(foods),
-            "num_offsprings": NUM_OFFSPRINGS,
-            "num_mutations": NUM_MUTATIONS
+            "frame": self.frame_count,
+            "blob_count": len(self.blobs),
+            "blob_avg_speed": population_stats.average("speed"),
+            "blob_min_speed": population_stats.minimum("speed"),
+            "blob_max_speed": population_stats.maximum("speed"),
+            "blob_avg_size": population_stats.average("size"),
+            "blob_min_size": population_stats.minimum("size"),
+            "blob_max_size": population_stats.maximum("size"),
+            "blob_avg_energy": population_stats.average("energy"),
+            "blob_min_energy": population_stats.minimum("energy"),
+            "blob_max_energy": population_stats.maximum("energy"),
+            "food_count": self.food_count(),
+            "num_offsprings": self.num_offsprings,
+            "num_mutations": self.num_mutations
         }
 
-        statistics_log.append(statistics)
+        if self.extra_statistics:
+            for attribute in ("speed", "size", "energy", "required_reproduction_energy", "offspring_amount"):
+                statistics[f"blob_var_{attribute}"] = population_stats.variance(attribute)
 
-        if LIVE_STATS_DISPLAY:
-            render_dict_as_text(screen, statistics, font, WHITE, 0, 350)
-    
-        pygame.display.flip()
+        if self.profile: # Keys stay the same while the profiler is switched off, values are None then
+            statistics.update(self.profiler.statistics())
 
-        if not QUICK_DATA_MODE:
-            clock.tick(FPS)
-        frame_count += 1
+        return statistics
 
-    pygame.quit()
-    save_statistics_to_csv()  # Save data when exiting
+    def step(self):
+        """Advances the simulation by one frame and returns that frame's statistics dict."""
+        profiler = self.profiler
+        profiler.start_frame()
+        distance_evaluations = self.food_grid.distance_evaluations
 
-main()
\ No newline at end of file
+        # CHANCE OF FOOD SPAWNING
+        self.spawn_frame_food()
+        profiler.mark("spawn")
+
+        self.dead_blobs = []
+        self.newborn_blobs = newborn_blobs = []
+        blobs = self.blobs
+        population_stats = self.population_stats
+        excess_energy_required = self.blob_config["BLOB_REPRODUCTION"]["excess_energy_required"]
+
+        # Births and deaths are deferred to the end of the frame, so every blob alive at the start of the
+        # frame acts exactly once and blobs is never modified while it is iterated
+        blobs.shuffle(self.rng.shuffle) # Shuffle to ensure fairness and equal chance for best order
+        profiler.mark("shuffle")
+
+        foods = self.foods
+        food_grid = self.food_grid
+        foods_before = len(foods)
+        food_mass = self.food_mass
+        # While profiling, blob_update is also split into BLOB_PHASES with four clock reads per blob. The
+        # reproduction phase of a blob runs from the end of its movement to the start of the next blob
+        timed = profiler.enabled
+        phase_times = profiler.phase_times
+        clock = time.perf_counter
+        moved = None
+        for blob in blobs:
+            if timed:
+                started = clock()
+                if moved is not None:
+                    phase_times["reproduction"] += started - moved
+            blob.use_constant_energy()
+            if timed:
+                drained = clock()
+                phase_times["energy_drain"] += drained - started
+
+            target = blob.find_food(foods, food_grid) if food_mass is None else blob.find_food_cell(food_mass)
+            if timed:
+                searched = clock()
+                phase_times["nearest_food"] += searched - drained
+
+            if target is not None: # Otherwise there is no food left anywhere, nothing to do
+                if food_mass is None:
+                    blob.approach_food(target, foods, food_grid)
+                else:
+                    blob.approach_food_cell(target, food_mass)
+            if timed:
+                moved = clock()
+                phase_times["movement"] += moved - searched
+
+            if blob.energy <= 0: # Blob no longer has energy, so it will perish
+                blob.color = WHITE # Change color to show it will die
+                self.dead_blobs.append(blob)
+                population_stats.remove(blob)
+                continue
+
+            if blob.energy >= blob.required_reproduction_energy + excess_energy_required:
+                offspring = blob.reproduce(self)
+                newborn_blobs.extend(offspring)
+                for child in offspring:
+                    population_stats.add(child)
+
+            population_stats.update_energy(blob)
+
+        if moved is not None:
+            phase_times["reproduction"] += clock() - moved
+
+        for blob in self.dead_blobs:
+            blobs.remove(blob)
+        blobs.extend(newborn_blobs)
+        profiler.mark("blob_update")
+
+        foods_eaten = foods_before - len(foods)
+        profiler.count("distance_evaluations", self.food_grid.distance_evaluations - distance_evaluations)
+        profiler.count("collisions", foods_eaten)
+        profiler.count("removals", foods_eaten + len(self.dead_blobs))
+        profiler.count("births", len(newborn_blobs))
+
+        statistics = self.collect_statistics()
+        if self.keep_statistics_log:
+            self.statistics_log.append(statistics)
+        profiler.mark("stats")
+
+        for observer in self.observers: # The renderer marks its own render/flip/idle phases
+            observer.on_step(self, statistics)
+
+        profiler.end_frame()
+        self.frame_count += 1
+        for observer in self.frame_end_observers:
+            observer.on_frame_end(self)
+        return statistics
+
+    def run(self, max_frames=None):
+        """Steps until stop() is called (e.g. by an observer) or max_frames frames have run."""
+        self.running = True
+        try:
+            while self.running and (max_frames is None or self.frame_count < max_frames):
+                self.step()
+        finally:
+            self.running = False
+            for observer in self.observers:
+                observer.on_finish(self)
+
+def run_sharded(args):
+    '''main() for SHARD_TILES / --shards: a headless ShardedWorld with the statistics sink and telemetry'''
+    from sharded_world import ShardedWorld
+    world = ShardedWorld(width=ARENA_WIDTH, height=ARENA_HEIGHT, tiles=tuple(args.shards), seed=args.seed)
+    print(f"Simulation seed: {world.seed}, {world.tile_count} tiles")
+    if world.food_config_note:
+        print(f"[NOTE] {world.food_config_note}")
+    world.attach(make_stats_sink(
+        STATS_OUTPUT_FORMAT,
+        f"data/simulation_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        STATS_CHUNK_SIZE,
+        STATS_SAMPLE_INTERVAL
+    ))
+    if args.telemetry:
+        from telemetry import TelemetryServer
+        telemetry_server = TelemetryServer(args.telemetry, TELEMETRY_SAMPLE_INTERVAL)
+        world.attach(telemetry_server)
+        print(f"Streaming telemetry on {telemetry_server.address}")
+
+    try:
+        world.populate()
+        world.run()
+    except KeyboardInterrupt: # Stopped with Ctrl+C
+        pass
+    finally:
+        world.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the survival of the fittest simulation.")
+    parser.add_argument("--seed", type=int, default=SIMULATION_SEED, help="Master seed. Passing the seed of an earlier run replays it exactly")
+    parser.add_argument("--telemetry", default=TELEMETRY_ADDRESS, help="host:port or Unix socket path to stream live statistics on")
+    parser.add_argument("--resume", help="Checkpoint file to continue from (keeps checkpointing to the same file)")
+    parser.add_argument("--shards", type=int, nargs=2, metavar=("COLUMNS", "ROWS"), default=SHARD_TILES,
+                        help="Run headless on a columns x rows grid of worker processes (see sharded_world.py)")
+    args = parser.parse_args()
+
+    if args.shards:
+        run_sharded(args)
+        return
+
+    if args.resume:
+        from checkpoint import load_simulation
+        simulation = load_simulation(args.resume)
+        checkpoint_filename = args.resume
+        print(f"Resuming simulation seed {simulation.seed} at frame {simulation.frame_count}")
+    else:
+        simulation = Simulation(keep_statistics_log=False, seed=args.seed, profile=PROFILE)
+        simulation.populate()
+        checkpoint_filename = f"data/checkpoint_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ckpt"
+        print(f"Simulation seed: {simulation.seed}")
+
+    # Statistics are streamed to disk as the simulation runs, so memory stays flat and a crash keeps everything up to the last chunk
+    simulation.attach(make_stats_sink(
+        STATS_OUTPUT_FORMAT,
+        f"data/simulation_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        STATS_CHUNK_SIZE,
+        STATS_SAMPLE_INTERVAL
+    ))
+
+    if CHECKPOINT_INTERVAL:
+        from checkpoint import CheckpointWriter
+        simulation.attach(CheckpointWriter(checkpoint_filename, CHECKPOINT_INTERVAL))
+
+    if RECORD_LINEAGE:
+        from lineage import LineageRecorder
+        simulation.attach(LineageRecorder(f"data/lineage_{datetime.now().strftime('%Y%m%d_%H%M%S')}"))
+
+    if SNAPSHOT_INTERVAL:
+        from snapshots import SnapshotWriter
+        simulation.attach(SnapshotWriter(f"data/snapshots_{datetime.now().strftime('%Y%m%d_%H%M%S')}", SNAPSHOT_INTERVAL))
+
+    if args.telemetry:
+        from telemetry import TelemetryServer
+        telemetry_server = TelemetryServer(args.telemetry, TELEMETRY_SAMPLE_INTERVAL)
+        simulation.attach(telemetry_server)
+        print(f"Streaming telemetry on {telemetry_server.address}")
+
+    renderer = None
+    if not QUICK_DATA_MODE:
+        from renderer import PygameRenderer # Only pull in pygame when we actually show the simulation
+        renderer = PygameRenderer(SCREEN_WIDTH, SCREEN_HEIGHT, FPS, LIVE_STATS_DISPLAY, RENDER_EVERY,
+                                  arena_size=(simulation.width, simulation.height))
+
+    try:
+        if renderer is not None and RUN_IN_THREAD:
+            from scheduler import run_threaded
+            run_threaded(simulation, renderer, STEPS_PER_SECOND)
+        else:
+            if renderer is not None:
+                simulation.attach(renderer)
+            simulation.run()
+    except KeyboardInterrupt: # Headless runs are stopped with Ctrl+C
+        pass
+
+if __name__ == "__main__":
+    main()
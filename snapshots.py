@@ -0,0 +1,227 @@
+import argparse
+import os
+import queue
+import threading
+import numpy as np
+
+# Fixed-width record layouts. Each snapshot is a contiguous run of records in blobs.bin / foods.bin
+BLOB_RECORD = np.dtype([
+    ("id", np.int32),
+    ("x", np.float32),
+    ("y", np.float32),
+    ("size", np.int16),
+    ("speed", np.int16),
+    ("offspring_amount", np.int16),
+    ("energy", np.int32),
+    ("required_reproduction_energy", np.int32)
+])
+FOOD_RECORD = np.dtype([
+    ("id", np.int32),
+    ("x", np.float32),
+    ("y", np.float32),
+    ("size", np.int16),
+    ("energy_value", np.int32)
+])
+# One index entry per snapshot. Offsets and counts are in records, not bytes
+INDEX_RECORD = np.dtype([
+    ("frame", np.int64),
+    ("blob_offset", np.int64),
+    ("blob_count", np.int64),
+    ("food_offset", np.int64),
+    ("food_count", np.int64)
+])
+
+
+def blob_records(blobs):
+    '''Returns a BLOB_RECORD array with the current state of every blob'''
+    return np.array(
+        [(blob.id, blob.x, blob.y, blob.size, blob.speed, blob.offspring_amount, blob.energy, blob.required_reproduction_energy) for blob in blobs],
+        dtype=BLOB_RECORD
+    )
+
+def food_records(foods):
+    '''Returns a FOOD_RECORD array with the current state of every food'''
+    return np.array([(food.id, food.x, food.y, food.size, food.energy_value) for food in foods], dtype=FOOD_RECORD)
+
+def food_mass_records(food_mass, food_size):
+    '''
+    Returns a FOOD_RECORD array for food mass mode: one record per cell with food, holding the cell index as
+    id, the cell center, the radius it is drawn with (see FoodMass.cell_radii) and the cell's energy
+    '''
+    cells, x, y, energies = food_mass.cells_with_food()
+    records = np.empty(len(cells), dtype=FOOD_RECORD)
+    records["id"] = cells
+    records["x"] = x
+    records["y"] = y
+    records["size"] = food_mass.cell_radii(energies, food_size)
+    records["energy_value"] = energies
+    return records
+
+class SnapshotWriter:
+    """
+    Simulation observer that records blob and food state every interval frames into directory
+    (blobs.bin, foods.bin and index.bin, all append-only fixed-width records). In food mass mode the
+    food records are the cells with food (see food_mass_records).
+
+    The simulation thread only packs the state into record arrays. Writing happens on a background
+    thread fed by a bounded queue. If the disk falls so far behind that the queue is full, the snapshot
+    is dropped (counted in dropped_snapshots) rather than stalling the step loop.
+    """
+
+    def __init__(self, directory, interval=1, max_pending=64):
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.blob_file = open(os.path.join(directory, "blobs.bin"), "wb")
+        self.food_file = open(os.path.join(directory, "foods.bin"), "wb")
+        self.index_file = open(os.path.join(directory, "index.bin"), "wb")
+        self.blob_offset = 0
+        self.food_offset = 0
+        self.dropped_snapshots = 0
+
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self.write_pending, daemon=True)
+        self.thread.start()
+
+    def on_step(self, simulation, statistics):
+        if simulation.frame_count % self.interval:
+            return
+        if simulation.food_mass is None:
+            foods = food_records(simulation.foods)
+        else:
+            foods = food_mass_records(simulation.food_mass, simulation.food_config["FOOD_SIZE"]["mean"])
+        self.record(simulation.frame_count, blob_records(simulation.blobs), foods)
+
+    def on_finish(self, simulation):
+        self.close()
+
+    def record(self, frame, blobs, foods):
+        '''Queues one snapshot of BLOB_RECORD and FOOD_RECORD arrays for writing'''
+        try:
+            self.pending.put_nowait((frame, blobs, foods))
+        except queue.Full:
+            self.dropped_snapshots += 1
+
+    def write_pending(self):
+        while True:
+            snapshot = self.pending.get()
+            if snapshot is None: # close() was called
+                break
+
+            frame, blobs, foods = snapshot
+            self.blob_file.write(blobs.tobytes())
+            self.food_file.write(foods.tobytes())
+            # The index entry goes last, so readers never see an entry for records that are not written yet
+            index_entry = np.array([(frame, self.blob_offset, len(blobs), self.food_offset, len(foods))], dtype=INDEX_RECORD)
+            self.blob_file.flush()
+            self.food_file.flush()
+            self.index_file.write(index_entry.tobytes())
+            self.index_file.flush()
+            self.blob_offset += len(blobs)
+            self.food_offset += len(foods)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+            for file in (self.blob_file, self.food_file, self.index_file):
+                file.close()
+            if self.dropped_snapshots:
+                print(f"[WARNING] {self.dropped_snapshots} snapshots dropped because the disk could not keep up")
+            print(f"Snapshots saved to {self.directory}")
+
+class SnapshotReader:
+    """
+    Read access to a snapshot directory written by SnapshotWriter. blobs.bin and foods.bin are
+    memory-mapped, so only the pages actually touched are read. frame, scan and blob_range return views
+    into them without copying. blob_history gathers one blob's records from all over blobs.bin, so it
+    returns a copy, found through an id index (argsort of all blob ids) built once on first use.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = np.fromfile(os.path.join(directory, "index.bin"), dtype=INDEX_RECORD)
+        self.blobs = self.map_records("blobs.bin", BLOB_RECORD)
+        self.foods = self.map_records("foods.bin", FOOD_RECORD)
+        self.frames = self.index["frame"]
+        self._id_index = None
+
+    def map_records(self, filename, dtype):
+        path = os.path.join(self.directory, filename)
+        if os.path.getsize(path) == 0: # np.memmap can not map empty files
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return len(self.index)
+
+    def entry_position(self, frame):
+        '''Returns the index position of the snapshot taken at frame'''
+        position = np.searchsorted(self.frames, frame)
+        if position == len(self.frames) or self.frames[position] != frame:
+            raise KeyError(f"No snapshot recorded for frame {frame}")
+        return position
+
+    def snapshot_at(self, position):
+        '''Returns (frame, blob records, food records) for the position-th snapshot'''
+        entry = self.index[position]
+        blob_offset, food_offset = entry["blob_offset"], entry["food_offset"]
+        return (
+            int(entry["frame"]),
+            self.blobs[blob_offset:blob_offset + entry["blob_count"]],
+            self.foods[food_offset:food_offset + entry["food_count"]]
+        )
+
+    def frame(self, frame):
+        '''Returns (blob records, food records) of the snapshot taken at frame'''
+        _, blobs, foods = self.snapshot_at(self.entry_position(frame))
+        return blobs, foods
+
+    def scan(self, start_frame=None, stop_frame=None):
+        '''Yields (frame, blob records, food records) for every snapshot with start_frame <= frame < stop_frame'''
+        start = 0 if start_frame is None else np.searchsorted(self.frames, start_frame)
+        stop = len(self.frames) if stop_frame is None else np.searchsorted(self.frames, stop_frame)
+        for position in range(start, stop):
+            yield self.snapshot_at(position)
+
+    def blob_range(self, start_frame, stop_frame):
+        '''
+        Returns (frames, blob records) for all snapshots with start_frame <= frame < stop_frame as one
+        contiguous view, with frames[i] being the frame blob record i was taken at.
+        '''
+        start = np.searchsorted(self.frames, start_frame)
+        stop = np.searchsorted(self.frames, stop_frame)
+        if start == stop:
+            return np.empty(0, dtype=np.int64), self.blobs[:0]
+        entries = self.index[start:stop]
+        first = entries["blob_offset"][0]
+        last = entries["blob_offset"][-1] + entries["blob_count"][-1]
+        return np.repeat(entries["frame"], entries["blob_count"]), self.blobs[first:last]
+
+    def id_index(self):
+        '''Returns (record positions sorted by blob id, the sorted ids). A blob's records stay in frame order'''
+        if self._id_index is None:
+            order = np.argsort(self.blobs["id"], kind="stable")
+            self._id_index = (order, self.blobs["id"][order])
+        return self._id_index
+
+    def blob_history(self, blob_id):
+        '''Returns (frames, blob records) for every snapshot a blob appears in. The records are a copy'''
+        order, sorted_ids = self.id_index()
+        start, stop = np.searchsorted(sorted_ids, [blob_id, blob_id + 1])
+        matches = order[start:stop]
+        snapshot_positions = np.searchsorted(self.index["blob_offset"], matches, side="right") - 1
+        return self.frames[snapshot_positions], self.blobs[matches]
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded snapshot directory in a pygame window.")
+    parser.add_argument("directory")
+    parser.add_argument("--fps", type=int, default=120)
+    args = parser.parse_args()
+
+    from renderer import replay_snapshots
+    replay_snapshots(SnapshotReader(args.directory), args.fps)
+
+if __name__ == "__main__":
+    main()
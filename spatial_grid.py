@@ -0,0 +1,116 @@
+import math
+
+
+class SpatialGrid:
+    '''
+    Uniform-grid spatial hash for objects with x, y and id attributes (e.g. Food).
+
+    Objects are bucketed into square cells of cell_size. Queries only look at the cells
+    around the query point, expanding ring by ring until no unvisited cell can contain
+    anything closer. Ties are broken by the lowest id, the same rule as find_closest_obj
+    and vectorized_world.nearest_food_indices, so the result never depends on storage order.
+    '''
+
+    def __init__(self, cell_size, width, height):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> {id: obj}
+        self.count = 0
+        self.distance_evaluations = 0
+
+        # Cell index bounds that can hold objects. Starts as the world area and only grows, so queries never need a full scan
+        self.min_cell_x, self.min_cell_y = 0, 0
+        self.max_cell_x, self.max_cell_y = self.cell_of(width, height)
+
+    def __len__(self):
+        return self.count
+
+    def cell_of(self, x, y):
+        '''Returns (cell_x, cell_y) key of the cell containing (x, y)'''
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, obj):
+        cell_x, cell_y = self.cell_of(obj.x, obj.y)
+        self.cells.setdefault((cell_x, cell_y), {})[obj.id] = obj
+        self.min_cell_x, self.max_cell_x = min(self.min_cell_x, cell_x), max(self.max_cell_x, cell_x)
+        self.min_cell_y, self.max_cell_y = min(self.min_cell_y, cell_y), max(self.max_cell_y, cell_y)
+        self.count += 1
+
+    def remove(self, obj):
+        key = self.cell_of(obj.x, obj.y)
+        cell = self.cells[key]
+        del cell[obj.id]
+        if not cell:
+            del self.cells[key]
+        self.count -= 1
+
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+
+    def ring_cells(self, center_x, center_y, ring):
+        '''Yields keys of occupied cells at Chebyshev distance ring from (center_x, center_y)'''
+        if ring == 0:
+            if (center_x, center_y) in self.cells:
+                yield (center_x, center_y)
+            return
+
+        for cell_x in range(center_x - ring, center_x + ring + 1):
+            for cell_y in (center_y - ring, center_y + ring):
+                if (cell_x, cell_y) in self.cells:
+                    yield (cell_x, cell_y)
+        for cell_y in range(center_y - ring + 1, center_y + ring):
+            for cell_x in (center_x - ring, center_x + ring):
+                if (cell_x, cell_y) in self.cells:
+                    yield (cell_x, cell_y)
+
+    def max_ring(self, center_x, center_y):
+        '''Returns the largest ring around (center_x, center_y) that can still hold occupied cells'''
+        return max(
+            center_x - self.min_cell_x,
+            self.max_cell_x - center_x,
+            center_y - self.min_cell_y,
+            self.max_cell_y - center_y,
+            0
+        )
+
+    def find_closest(self, obj_a):
+        '''Returns closest stored obj to obj_a (same result as find_closest_obj over the equivalent list), or None if empty'''
+        if not self.cells:
+            return None
+
+        center_x, center_y = self.cell_of(obj_a.x, obj_a.y)
+        last_ring = self.max_ring(center_x, center_y)
+
+        closest_obj = None
+        closest_obj_distance = math.inf
+
+        for ring in range(last_ring + 1):
+            for key in self.ring_cells(center_x, center_y, ring):
+                for obj_b in self.cells[key].values():
+                    self.distance_evaluations += 1
+                    distance = math.sqrt(((obj_a.x - obj_b.x) ** 2) + ((obj_a.y - obj_b.y) ** 2)) # same formula as get_distance
+                    if distance < closest_obj_distance or (distance == closest_obj_distance and obj_b.id < closest_obj.id):
+                        closest_obj = obj_b
+                        closest_obj_distance = distance
+
+            # Everything outside rings 0..ring is at least ring * cell_size away, so stop once we beat that
+            if closest_obj_distance < ring * self.cell_size:
+                break
+
+        return closest_obj
+
+    def query_radius(self, x, y, radius):
+        '''Returns all stored objs whose centers are within radius of (x, y), in id order'''
+        min_cell_x, min_cell_y = self.cell_of(x - radius, y - radius)
+        max_cell_x, max_cell_y = self.cell_of(x + radius, y + radius)
+
+        found = []
+        for cell_x in range(min_cell_x, max_cell_x + 1):
+            for cell_y in range(min_cell_y, max_cell_y + 1):
+                for obj in self.cells.get((cell_x, cell_y), {}).values():
+                    self.distance_evaluations += 1
+                    if math.sqrt(((x - obj.x) ** 2) + ((y - obj.y) ** 2)) <= radius:
+                        found.append(obj)
+
+        found.sort(key=lambda obj: obj.id)
+        return found
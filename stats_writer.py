@@ -0,0 +1,163 @@
+import csv
+import math
+import os
+import numpy as np
+
+try:
+    import pyarrow as pa # Optional, only needed for ParquetStatsSink
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class StatsSink:
+    """
+    Streams per-frame statistics dicts to disk with constant memory use. Frames are buffered in a
+    fixed-size columnar chunk (one float64 array per statistic, None stored as NaN) and the chunk is
+    appended to the output whenever it fills up, and once more on close().
+
+    Only every sample_interval-th frame is recorded. Works as a Simulation observer
+    (simulation.attach(sink)), or standalone through write() and close().
+    Subclasses implement write_chunk() and close_output().
+    """
+
+    def __init__(self, chunk_size=1024, sample_interval=1):
+        self.chunk_size = chunk_size
+        self.sample_interval = sample_interval
+        self.columns = None  # statistic name -> float64 array of length chunk_size, created on first write
+        self.buffered = 0
+        self.frames_seen = 0
+        self.frames_written = 0
+        self.closed = False
+
+    def on_step(self, simulation, statistics):
+        self.write(statistics)
+
+    def on_finish(self, simulation):
+        self.close()
+
+    def write(self, statistics):
+        frame_index = self.frames_seen
+        self.frames_seen += 1
+        if frame_index % self.sample_interval:
+            return
+
+        if self.columns is None:
+            self.columns = {key: np.empty(self.chunk_size) for key in statistics}
+
+        for key, column in self.columns.items():
+            value = statistics[key]
+            column[self.buffered] = math.nan if value is None else value
+        self.buffered += 1
+
+        if self.buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffered:
+            self.write_chunk({key: column[:self.buffered] for key, column in self.columns.items()})
+            self.frames_written += self.buffered
+            self.buffered = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        self.close_output()
+        self.closed = True
+
+    def write_chunk(self, chunk):
+        raise NotImplementedError
+
+    def close_output(self):
+        pass
+
+class CsvStatsSink(StatsSink):
+    """Appends chunks to a CSV file (same layout the simulation has always saved). NaN is written as an empty field."""
+
+    def __init__(self, filename, chunk_size=1024, sample_interval=1):
+        super().__init__(chunk_size, sample_interval)
+        self.filename = filename
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self.file = open(filename, mode="w", newline="")
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def format_value(self, value):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return int(value)
+        return value
+
+    def write_chunk(self, chunk):
+        if not self.header_written:
+            self.writer.writerow(chunk.keys())
+            self.header_written = True
+
+        for row in zip(*(column.tolist() for column in chunk.values())):
+            self.writer.writerow([self.format_value(value) for value in row])
+        self.file.flush() # Everything up to the last full chunk survives a crash
+
+    def close_output(self):
+        self.file.close()
+        print(f"Simulation statistics saved to {self.filename}")
+
+class NpyChunkStatsSink(StatsSink):
+    """Writes every chunk as its own chunk_<n>.npz (one array per statistic) into a directory. Read back with load_npy_chunks."""
+
+    def __init__(self, directory, chunk_size=1024, sample_interval=1):
+        super().__init__(chunk_size, sample_interval)
+        self.directory = directory
+        self.chunks_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write_chunk(self, chunk):
+        filename = os.path.join(self.directory, f"chunk_{self.chunks_written:06d}.npz")
+        np.savez(filename + ".tmp.npz", **chunk)
+        os.replace(filename + ".tmp.npz", filename) # Chunks are either complete or absent
+        self.chunks_written += 1
+
+    def close_output(self):
+        print(f"Simulation statistics saved to {self.directory}")
+
+class ParquetStatsSink(StatsSink):
+    """Appends every chunk as a row group of a Parquet file. Requires pyarrow."""
+
+    def __init__(self, filename, chunk_size=1024, sample_interval=1):
+        if pq is None:
+            raise ImportError("pyarrow is required for Parquet statistics output (pip install pyarrow)")
+        super().__init__(chunk_size, sample_interval)
+        self.filename = filename
+        self.writer = None
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+
+    def write_chunk(self, chunk):
+        table = pa.table(chunk)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.filename, table.schema)
+        self.writer.write_table(table)
+
+    def close_output(self):
+        if self.writer is not None:
+            self.writer.close()
+            print(f"Simulation statistics saved to {self.filename}")
+
+def load_npy_chunks(directory):
+    '''Returns {statistic: array} with every chunk written by NpyChunkStatsSink into directory, in order'''
+    filenames = sorted(name for name in os.listdir(directory) if name.startswith("chunk_") and name.endswith(".npz") and ".tmp" not in name)
+    chunks = [np.load(os.path.join(directory, name)) for name in filenames]
+    if not chunks:
+        return {}
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0].files}
+
+def make_stats_sink(output_format, base_filename, chunk_size=1024, sample_interval=1):
+    '''Returns a stats sink for output_format ("csv", "npy" or "parquet") writing to base_filename plus the matching extension'''
+    if output_format == "csv":
+        return CsvStatsSink(base_filename + ".csv", chunk_size, sample_interval)
+    if output_format == "npy":
+        return NpyChunkStatsSink(base_filename, chunk_size, sample_interval)
+    if output_format == "parquet":
+        return ParquetStatsSink(base_filename + ".parquet", chunk_size, sample_interval)
+    raise ValueError(f"Unknown statistics output format '{output_format}'. Expected 'csv', 'npy' or 'parquet'")
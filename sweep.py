@@ -0,0 +1,203 @@
+"""
+Parameter sweeps over the simulation config dicts.
+
+Example sweep spec (JSON, or the same structure in YAML):
+
+{
+    "output_dir": "data/sweeps/food_vs_mutation",
+    "mode": "grid",                # "grid" or "latin_hypercube"
+    "samples": 20,                 # number of points, latin_hypercube only
+    "seed": 1,
+    "replicates": 10,              # replicates per point
+    "frames": 3000,                # frame budget per replicate
+    "stop_on_extinction": true,
+    "parameters": {
+        "FOOD_CONFIG.FOOD_SPAWN_CHANCE_PER_FRAME": {"values": [0.2, 0.4, 0.6]},
+        "BLOB_CONFIG.BLOB_REPRODUCTION.mutation_chance": {"min": 0.01, "max": 0.2, "steps": 4},
+        "BLOB_CONFIG.BLOB_SPEED.mean": {"min": 1, "max": 3, "integer": true}
+    }
+}
+
+Grid mode uses "values", or "steps" evenly spaced values between "min" and "max".
+Latin hypercube mode samples every parameter between "min" and "max" (or from "values").
+"""
+
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from batch_runner import run_replicate, aggregate_statistics, save_rows_to_csv
+from simulator import SIMULATION_START_CONFIG, BLOB_CONFIG, FOOD_CONFIG
+
+try:
+    import yaml # Optional, only needed for .yaml/.yml sweep specs
+except ImportError:
+    yaml = None
+
+# Parameter paths look like "FOOD_CONFIG.FOOD_SPAWN_CHANCE_PER_FRAME" or "BLOB_CONFIG.BLOB_SPEED.mean".
+# The first part picks which config dict is being changed
+BASE_CONFIGS = {
+    "SIMULATION_START_CONFIG": SIMULATION_START_CONFIG,
+    "BLOB_CONFIG": BLOB_CONFIG,
+    "FOOD_CONFIG": FOOD_CONFIG
+}
+# Config keys nothing in the simulation reads, with what to sweep instead. Sweeping one would silently run the same simulation at every value
+UNUSED_PARAMETERS = {
+    "BLOB_CONFIG.BLOB_MUTATION_CHANCE": "BLOB_CONFIG.BLOB_REPRODUCTION.mutation_chance"
+}
+
+
+def load_spec(path):
+    '''Returns the sweep spec dict stored in a JSON or YAML file'''
+    with open(path) as file:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("PyYAML is required for YAML sweep specs (pip install pyyaml), or use a JSON spec")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+def parameter_grid_values(parameter):
+    '''Returns the list of values a parameter takes in grid mode'''
+    if "values" in parameter:
+        return list(parameter["values"])
+    values = np.linspace(parameter["min"], parameter["max"], parameter["steps"])
+    if parameter.get("integer"):
+        return sorted(set(int(round(value)) for value in values))
+    return [float(value) for value in values]
+
+def expand_grid(parameters):
+    '''Returns every combination of parameter values as a list of {path: value} dicts'''
+    paths = list(parameters)
+    combinations = itertools.product(*(parameter_grid_values(parameters[path]) for path in paths))
+    return [dict(zip(paths, combination)) for combination in combinations]
+
+def expand_latin_hypercube(parameters, samples, seed=None):
+    '''Returns samples {path: value} dicts, each parameter's range split into samples strata hit exactly once'''
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(samples)]
+
+    for path, parameter in parameters.items():
+        unit_values = (rng.permutation(samples) + rng.random(samples)) / samples
+        for point, unit_value in zip(points, unit_values):
+            if "values" in parameter:
+                point[path] = parameter["values"][int(unit_value * len(parameter["values"]))]
+            else:
+                value = parameter["min"] + unit_value * (parameter["max"] - parameter["min"])
+                point[path] = int(round(value)) if parameter.get("integer") else float(value)
+
+    return points
+
+def expand_spec(spec):
+    '''Returns the list of parameter points described by a sweep spec'''
+    if spec.get("mode", "grid") == "latin_hypercube":
+        return expand_latin_hypercube(spec["parameters"], spec["samples"], spec.get("seed"))
+    return expand_grid(spec["parameters"])
+
+def point_id(point, settings=None):
+    '''
+    Returns a short stable id for a parameter point (same values -> same id, across runs). With
+    settings (see run_settings) the id also changes whenever how the point is run changes.
+    '''
+    key = point if settings is None else {"point": point, "run_settings": settings}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+
+def run_settings(spec):
+    '''Returns the spec values besides the parameters that change a point's results'''
+    return {
+        "seed": spec.get("seed"),
+        "replicates": spec.get("replicates", 10),
+        "frames": spec.get("frames", 3000),
+        "stop_on_extinction": spec.get("stop_on_extinction", True)
+    }
+
+def configs_for_point(point):
+    '''Returns (start_config, blob_config, food_config) copies of the base configs with point's values applied'''
+    configs = {name: copy.deepcopy(config) for name, config in BASE_CONFIGS.items()}
+    for path, value in point.items():
+        if path in UNUSED_PARAMETERS:
+            raise KeyError(f"Parameter '{path}' is not used by the simulation, sweep '{UNUSED_PARAMETERS[path]}' instead")
+        config_name, *keys = path.split(".")
+        if config_name not in configs:
+            raise KeyError(f"Unknown config '{config_name}' in parameter '{path}'. Expected one of {list(configs)}")
+        target = configs[config_name]
+        for key in keys[:-1]:
+            target = target[key]
+        if keys[-1] not in target:
+            raise KeyError(f"Unknown parameter '{path}'")
+        target[keys[-1]] = value
+    return configs["SIMULATION_START_CONFIG"], configs["BLOB_CONFIG"], configs["FOOD_CONFIG"]
+
+def point_seeds(master_seed, point, replicates):
+    '''Returns replicate seeds for a point. Derived from the master seed and the point's values, so they survive resumes'''
+    entropy = [master_seed if master_seed is not None else 0, int(point_id(point), 16)]
+    return [int(seed) for seed in np.random.SeedSequence(entropy).generate_state(replicates)]
+
+def write_json_atomic(data, filename):
+    temporary_filename = filename + ".tmp"
+    with open(temporary_filename, "w") as file:
+        json.dump(data, file, indent=4)
+    os.replace(temporary_filename, filename)
+
+def run_sweep(spec, workers=None):
+    """
+    Runs every point of a sweep spec across a process pool. Each point gets its own directory under
+    output_dir holding point.json and, once all its replicates are done, stats.csv (aggregated with
+    batch_runner.aggregate_statistics). Points that already have stats.csv are skipped, so re-running
+    the same spec after a crash resumes where it stopped. Directory names also cover the seed,
+    replicates, frames and stop_on_extinction, so changing any of those never reuses old results.
+    """
+    output_dir = spec["output_dir"]
+    settings = run_settings(spec)
+    replicates = settings["replicates"]
+    frames = settings["frames"]
+    stop_on_extinction = settings["stop_on_extinction"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    points = expand_spec(spec)
+    for point in points: # Reject bad parameters before anything runs
+        configs_for_point(point)
+    pending = []
+    for point in points:
+        point_dir = os.path.join(output_dir, f"point_{point_id(point, settings)}")
+        if os.path.exists(os.path.join(point_dir, "stats.csv")):
+            continue # Already done in an earlier run
+        os.makedirs(point_dir, exist_ok=True)
+        write_json_atomic({"point": point, "run_settings": settings}, os.path.join(point_dir, "point.json"))
+        pending.append((point, point_dir))
+
+    print(f"{len(points)} points, {len(points) - len(pending)} already done, {len(pending)} to run")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Every replicate of every pending point is its own task, so all cores stay busy even with few points
+        futures = {}
+        for point, point_dir in pending:
+            configs = configs_for_point(point)
+            for replicate, seed in enumerate(point_seeds(spec.get("seed"), point, replicates)):
+                future = executor.submit(run_replicate, seed, frames, stop_on_extinction, *configs)
+                futures[future] = (point_dir, replicate)
+
+        point_logs = {point_dir: [None] * replicates for _, point_dir in pending}
+        for future in as_completed(futures):
+            point_dir, replicate = futures[future]
+            logs = point_logs[point_dir]
+            logs[replicate] = future.result()
+
+            if all(log is not None for log in logs): # Point finished
+                # Written atomically, so a crash never leaves a half-written point that would be skipped on resume
+                save_rows_to_csv(aggregate_statistics(logs), os.path.join(point_dir, "stats.csv"))
+                del point_logs[point_dir]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a parameter sweep over the simulation configs.")
+    parser.add_argument("spec", help="Path to a JSON or YAML sweep spec")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    args = parser.parse_args()
+
+    run_sweep(load_spec(args.spec), args.workers)
+
+if __name__ == "__main__":
+    main()
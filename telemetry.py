@@ -0,0 +1,211 @@
+"""
+Live telemetry for running simulations. Attach a TelemetryServer and every subscriber gets the
+per-frame statistics as newline-delimited JSON over plain HTTP, on a TCP port or a Unix socket:
+
+    curl -N http://127.0.0.1:8765/stream
+    curl -N --unix-socket /tmp/simulation.sock http://localhost/stream
+    python telemetry.py 127.0.0.1:8765
+
+GET /latest returns only the most recent sample. The server runs an asyncio loop on its own thread;
+the simulation only hands over each sample and never waits for a subscriber.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import socket
+import threading
+import time
+
+# Batches of samples buffered per subscriber. A subscriber that falls further behind than this misses samples
+SUBSCRIBER_QUEUE_SIZE = 64
+# Seconds close() gives subscribers to receive what is still queued for them
+CLOSE_TIMEOUT = 1.0
+
+
+def parse_address(address):
+    '''Returns ("tcp", host, port) for "host:port" or ":port", and ("unix", path, None) for anything else'''
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit():
+        return "tcp", host or "127.0.0.1", int(port)
+    return "unix", address, None
+
+def encode_sample(sample):
+    return (json.dumps(sample, default=float) + "\n").encode()
+
+class TelemetryServer:
+    """
+    Simulation observer that streams every sample_interval-th frame's statistics to any number of HTTP
+    subscribers. Each sample also carries the wall clock time, the measured steps/sec and the seed.
+
+    Backpressure never reaches the simulation: on_step only appends the sample to a pending deque and
+    wakes the server's loop if it is not already about to run (nothing is queued while nobody is
+    subscribed). The loop encodes whatever piled up as one batch. Every subscriber has a bounded queue of
+    batches, when it is full new batches for that subscriber are dropped, counted in dropped_samples.
+    """
+
+    def __init__(self, address="127.0.0.1:8765", sample_interval=1, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.address = address
+        self.sample_interval = sample_interval
+        self.queue_size = queue_size
+        self.subscribers = {}  # asyncio.Queue -> StreamWriter per connected /stream client, only touched on the loop thread
+        self.subscriber_count = 0  # Mirrors len(subscribers) for the simulation thread
+        self.latest = None  # Most recent sample, for /latest
+        self.pending = collections.deque()  # Samples handed over by the simulation, not yet published
+        self.publish_scheduled = False
+        self.dropped_samples = 0
+        self.last_time = None
+        self.last_frame = None
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+        if self.server.sockets[0].family != socket.AF_UNIX:
+            host, port = self.server.sockets[0].getsockname()[:2]
+            self.address = f"{host}:{port}" # Resolves port 0 to the port actually bound
+
+    async def start(self):
+        kind, host, port = parse_address(self.address)
+        if kind == "tcp":
+            return await asyncio.start_server(self.handle_client, host, port)
+        if os.path.exists(host): # Left over from a run that did not shut down cleanly
+            os.remove(host)
+        return await asyncio.start_unix_server(self.handle_client, host)
+
+    def on_step(self, simulation, statistics):
+        if simulation.frame_count % self.sample_interval:
+            return
+
+        now = time.perf_counter()
+        steps_per_second = None
+        if self.last_time is not None and now > self.last_time:
+            steps_per_second = (simulation.frame_count - self.last_frame) / (now - self.last_time)
+        self.last_time = now
+        self.last_frame = simulation.frame_count
+
+        sample = {
+            "time": time.time(),
+            "seed": simulation.seed,
+            "steps_per_second": steps_per_second,
+            "statistics": statistics
+        }
+        self.latest = sample
+        if self.subscriber_count:
+            self.pending.append(sample)
+            if not self.publish_scheduled: # One loop wakeup per batch, not per sample
+                self.publish_scheduled = True
+                self.loop.call_soon_threadsafe(self.publish)
+
+    def on_finish(self, simulation):
+        self.close()
+
+    def publish(self):
+        '''Encodes all pending samples once and queues them as one batch for every subscriber (runs on the server loop)'''
+        self.publish_scheduled = False # Cleared before draining, so a sample added meanwhile is either drained here or schedules a new call
+        samples = []
+        while self.pending:
+            samples.append(self.pending.popleft())
+        if not samples:
+            return
+
+        batch = b"".join(encode_sample(sample) for sample in samples)
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self.dropped_samples += len(samples)
+
+    async def handle_client(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""): # Skip the request headers
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+
+            if path == "/latest":
+                body = encode_sample(self.latest)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                             + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            elif path == "/stream":
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+                await self.stream(writer)
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[queue] = writer
+        self.subscriber_count = len(self.subscribers)
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is None: # Server is closing
+                    return
+                writer.write(batch)
+                await writer.drain() # Only this subscriber waits for a slow reader
+        finally:
+            self.subscribers.pop(queue, None)
+            self.subscriber_count = len(self.subscribers)
+
+    async def shutdown(self):
+        self.publish()
+        for queue in self.subscribers:
+            if queue.full(): # Make room for the end of stream marker, this subscriber misses one more batch
+                self.dropped_samples += queue.get_nowait().count(b"\n")
+            queue.put_nowait(None)
+        deadline = time.monotonic() + CLOSE_TIMEOUT
+        while self.subscribers and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for writer in list(self.subscribers.values()): # Readers too slow to finish in time are cut off
+            writer.transport.abort()
+        while self.subscribers: # Let their handlers see the aborted connection and finish
+            await asyncio.sleep(0)
+        self.server.close()
+        await self.server.wait_closed()
+
+    def close(self):
+        '''Ends all streams, stops the server and its thread. Safe to call more than once'''
+        if not self.thread.is_alive():
+            return
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        kind, path, _ = parse_address(self.address)
+        if kind == "unix" and os.path.exists(path):
+            os.remove(path)
+
+async def print_stream(address):
+    '''Connects to a TelemetryServer and prints every sample it streams until the server closes'''
+    kind, host, port = parse_address(address)
+    if kind == "tcp":
+        reader, writer = await asyncio.open_connection(host, port)
+    else:
+        reader, writer = await asyncio.open_unix_connection(host)
+
+    writer.write(b"GET /stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    while (await reader.readline()) not in (b"\r\n", b""): # Skip the response headers
+        pass
+    while line := await reader.readline():
+        print(line.decode().rstrip())
+    writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the telemetry stream of a running simulation.")
+    parser.add_argument("address", help="host:port or Unix socket path the simulation's TelemetryServer listens on")
+    args = parser.parse_args()
+    try:
+        asyncio.run(print_stream(args.address))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
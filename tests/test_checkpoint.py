@@ -0,0 +1,31 @@
+import pickle
+from checkpoint import CheckpointWriter, load_simulation
+from simulator import Simulation, SIMULATION_START_CONFIG
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=20, N_STARTING_FOOD=60)
+
+
+def new_simulation():
+    simulation = Simulation(START_CONFIG, seed=11)
+    simulation.populate()
+    return simulation
+
+def test_resumed_run_is_bit_identical(tmp_path):
+    filename = str(tmp_path / "run.ckpt")
+    interrupted = new_simulation()
+    interrupted.attach(CheckpointWriter(filename, 50))
+    interrupted.run(120) # Crashes after frame 120, the last checkpoint holds 100 frames
+
+    resumed = load_simulation(filename)
+    assert resumed.frame_count == 100
+    assert resumed.statistics_log == interrupted.statistics_log[:100]
+    resumed.run(400)
+
+    uninterrupted = new_simulation()
+    uninterrupted.run(400)
+    assert resumed.statistics_log == uninterrupted.statistics_log
+    resumed_state, uninterrupted_state = resumed.get_state(), uninterrupted.get_state()
+    assert list(resumed_state) == list(uninterrupted_state)
+    for name in resumed_state: # Entities, spatial index, ID trackers and every RNG stream
+        if name != "statistics_log": # Equal, but its pickle depends on which values happen to be shared objects
+            assert pickle.dumps(resumed_state[name]) == pickle.dumps(uninterrupted_state[name]), name
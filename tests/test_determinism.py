@@ -0,0 +1,14 @@
+from simulator import Simulation, SIMULATION_START_CONFIG
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=20, N_STARTING_FOOD=60)
+
+
+def simulation_log(seed, frames=300):
+    simulation = Simulation(START_CONFIG, seed=seed)
+    simulation.populate()
+    simulation.run(frames)
+    return simulation.statistics_log
+
+def test_simulation_replays_identically_for_a_seed():
+    assert simulation_log(7) == simulation_log(7)
+    assert simulation_log(7) != simulation_log(8)
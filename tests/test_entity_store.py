@@ -0,0 +1,31 @@
+import random
+from types import SimpleNamespace
+from entity_store import EntityStore
+
+
+def entities(n):
+    return [SimpleNamespace(id=entity_id) for entity_id in range(1, n + 1)]
+
+def test_remove_swaps_the_last_entity_into_the_freed_slot():
+    items = entities(5)
+    store = EntityStore(items)
+    store.remove(items[1])
+    assert [entity.id for entity in store] == [1, 5, 3, 4]
+    store.remove(items[3]) # The last entity leaves no hole to fill
+    assert [entity.id for entity in store] == [1, 5, 3]
+    assert len(store) == 3 and items[1] not in store and items[4] in store
+
+def test_positions_stay_in_sync_through_removals_and_shuffles():
+    rng = random.Random(0)
+    items = entities(200)
+    store = EntityStore(items)
+    alive = set(range(1, 201))
+    for round_index in range(150):
+        victim = store.get(rng.choice(sorted(alive)))
+        store.remove(victim)
+        alive.remove(victim.id)
+        if round_index % 10 == 0:
+            store.shuffle(rng)
+        assert {entity.id for entity in store} == alive
+        assert all(store[store.positions[entity_id]].id == entity_id for entity_id in alive)
+    assert store.get(items[0].id) is (items[0] if items[0].id in alive else None)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from food_field import FoodField, FoodMass
+from simulator import Simulation, SIMULATION_START_CONFIG, FOOD_CONFIG
+
+POISSON_CONFIG = dict(FOOD_CONFIG, FOOD_SPAWN_MODE="poisson", FOOD_SPAWN_RATE=4.0)
+
+
+def food_field(food_config, seed=0):
+    return FoodField(food_config, 400, 300, np.random.default_rng(seed), np.random.default_rng(seed + 1))
+
+def test_poisson_spawn_counts_have_the_configured_mean():
+    field = food_field(POISSON_CONFIG)
+    counts = np.array([field.spawn_count(0) for _ in range(20000)])
+    assert counts.mean() == pytest.approx(4.0, rel=0.03)
+    assert counts.var() == pytest.approx(4.0, rel=0.06)
+
+def test_capacity_limits_spawning():
+    field = food_field(dict(POISSON_CONFIG, FOOD_SPAWN_RATE=50, FOOD_CAPACITY=100))
+    assert all(field.spawn_count(100) == 0 for _ in range(100))
+    assert all(field.spawn_count(97) <= 3 for _ in range(100))
+
+    simulation = Simulation(dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=0, N_STARTING_FOOD=10),
+                            food_config=dict(POISSON_CONFIG, FOOD_SPAWN_RATE=20, FOOD_CAPACITY=150), seed=1)
+    simulation.populate()
+    simulation.run(30)
+    assert simulation.statistics_log[-1]["food_count"] == 150
+    assert max(statistics["food_count"] for statistics in simulation.statistics_log) == 150
+
+def test_positions_follow_the_density_map():
+    # Only the right half of the bottom row has weight
+    field = food_field(dict(POISSON_CONFIG, FOOD_DENSITY_MAP=[[0, 0], [0, 1]]))
+    sizes = np.full(5000, 5)
+    x, y = field.positions(sizes)
+    assert (x >= 200).all() and (x <= 400 - 5).all()
+    assert (y >= 150).all() and (y <= 300 - 5).all()
+
+def test_uniform_positions_keep_foods_inside_the_arena():
+    sizes = np.random.default_rng(0).integers(1, 20, 5000)
+    x, y = food_field(POISSON_CONFIG).positions(sizes)
+    assert (x >= sizes).all() and (x <= 400 - sizes).all()
+    assert (y >= sizes).all() and (y <= 300 - sizes).all()
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError, match="FOOD_SPAWN_MODE"):
+        food_field(dict(FOOD_CONFIG, FOOD_SPAWN_MODE="sometimes"))
+    with pytest.raises(ValueError, match="FOOD_DENSITY_MAP"):
+        food_field(dict(FOOD_CONFIG, FOOD_DENSITY_MAP=[[0, 0], [0, 0]]))
+
+def test_food_mass_heads_for_the_nearest_cell_with_food():
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        food_mass = FoodMass(10, int(rng.integers(20, 400)), int(rng.integers(20, 400)), 5)
+        n_foods = int(rng.integers(1, 6))
+        food_mass.add(rng.integers(0, food_mass.cols * 10, n_foods), rng.integers(0, food_mass.rows * 10, n_foods),
+                      rng.integers(1, 20, n_foods).astype(float))
+        x, y = rng.uniform(0, food_mass.cols * 10), rng.uniform(0, food_mass.rows * 10)
+        rows, cols = np.nonzero(food_mass.mass)
+        center_x, center_y = (cols + 0.5) * 10, (rows + 0.5) * 10
+        closest = np.lexsort((-food_mass.mass[rows, cols], np.hypot(center_x - x, center_y - y)))[0] # Nearest, then richest
+        assert food_mass.nearest_food_cell(x, y) == (center_x[closest], center_y[closest])
@@ -0,0 +1,59 @@
+import numpy as np
+from lineage import ALIVE, LineageLog, LineageRecorder
+from simulator import Simulation, SIMULATION_START_CONFIG
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=20, N_STARTING_FOOD=80)
+
+
+class BlobTracker:
+    '''Remembers every blob that ever lived and when it died'''
+
+    def __init__(self):
+        self.blobs = {}
+        self.death_frames = {}
+
+    def on_step(self, simulation, statistics):
+        for blob in list(simulation.blobs) + simulation.dead_blobs:
+            self.blobs.setdefault(blob.id, blob)
+        for blob in simulation.dead_blobs:
+            self.death_frames[blob.id] = simulation.frame_count
+
+    def on_finish(self, simulation):
+        pass
+
+def record_run(directory, frames=800):
+    simulation = Simulation(START_CONFIG, seed=6)
+    simulation.populate()
+    tracker = BlobTracker()
+    simulation.attach(tracker)
+    simulation.attach(LineageRecorder(directory, chunk_size=16))
+    simulation.run(frames)
+    return simulation, tracker
+
+def founder_of(blobs, blob):
+    while blob.parent_id:
+        blob = blobs[blob.parent_id]
+    return blob.id
+
+def test_births_deaths_and_ancestry(tmp_path):
+    simulation, tracker = record_run(str(tmp_path))
+    log = LineageLog(str(tmp_path))
+    assert log.ids.tolist() == sorted(tracker.blobs)
+    assert simulation.num_offsprings > 0
+    for blob_id, blob in tracker.blobs.items():
+        assert log.death_frames[log.position(blob_id)] == tracker.death_frames.get(blob_id, ALIVE)
+        ancestry = log.ancestry(blob_id)
+        assert ancestry["id"][0] == blob_id
+        assert ancestry["id"][-1] == founder_of(tracker.blobs, blob)
+        assert (ancestry["parent_id"][:-1] == ancestry["id"][1:]).all()
+        assert (ancestry["generation"] == np.arange(len(ancestry))[::-1]).all()
+
+def test_lineages_and_survival_counts(tmp_path):
+    simulation, tracker = record_run(str(tmp_path))
+    log = LineageLog(str(tmp_path))
+    roots = {blob_id: founder_of(tracker.blobs, blob) for blob_id, blob in tracker.blobs.items()}
+    for root_id in set(roots.values()):
+        assert log.lineage(root_id)["id"].tolist() == sorted(blob_id for blob_id, root in roots.items() if root == root_id)
+    living_lineages = {roots[blob.id] for blob in simulation.blobs}
+    assert log.surviving_lineage_counts([simulation.frame_count]).tolist() == [len(living_lineages)]
+    assert log.surviving_lineage_counts([0]).tolist() == [START_CONFIG["N_STARTING_BLOB"]]
@@ -0,0 +1,40 @@
+import pytest
+from simulator import Simulation, SIMULATION_START_CONFIG
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=30, N_STARTING_FOOD=80)
+
+
+class RecomputingObserver:
+    '''Checks every frame's incrementally maintained statistics against a full pass over the blobs'''
+
+    def __init__(self):
+        self.frames_checked = 0
+
+    def on_step(self, simulation, statistics):
+        blobs = list(simulation.blobs)
+        assert statistics["blob_count"] == len(blobs)
+        for attribute in ("speed", "size", "energy"):
+            values = [getattr(blob, attribute) for blob in blobs]
+            if not values:
+                assert statistics[f"blob_min_{attribute}"] is None
+                continue
+            mean = sum(values) / len(values)
+            assert statistics[f"blob_avg_{attribute}"] == pytest.approx(mean)
+            assert statistics[f"blob_min_{attribute}"] == min(values)
+            assert statistics[f"blob_max_{attribute}"] == max(values)
+            variance = sum((value - mean) ** 2 for value in values) / len(values)
+            assert statistics[f"blob_var_{attribute}"] == pytest.approx(variance, rel=1e-6, abs=1e-6)
+        self.frames_checked += 1
+
+    def on_finish(self, simulation):
+        pass
+
+def test_incremental_statistics_match_recomputation():
+    simulation = Simulation(START_CONFIG, extra_statistics=True, seed=3)
+    simulation.populate()
+    observer = RecomputingObserver()
+    simulation.attach(observer)
+    simulation.run(600)
+    assert observer.frames_checked == 600
+    assert simulation.num_offsprings > 0 # Births and deaths were both exercised
+    assert simulation.statistics_log[-1]["blob_count"] < START_CONFIG["N_STARTING_BLOB"] + simulation.num_offsprings
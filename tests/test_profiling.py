@@ -0,0 +1,28 @@
+from profiling import BLOB_PHASES
+from simulator import Simulation, SIMULATION_START_CONFIG, FOOD_CONFIG
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=50, N_STARTING_FOOD=100)
+
+
+def profiled_frames(food_config=FOOD_CONFIG, frames=20):
+    simulation = Simulation(START_CONFIG, food_config=food_config, seed=2, profile=True)
+    simulation.populate()
+    for _ in range(frames):
+        simulation.step()
+        yield simulation.profiler.last_frame[0]
+
+def test_blob_phases_split_blob_update():
+    for food_config in (FOOD_CONFIG, dict(FOOD_CONFIG, FOOD_MASS_MODE=True)):
+        for phase_times in profiled_frames(food_config):
+            assert all(phase_times[phase] > 0 for phase in BLOB_PHASES)
+            assert sum(phase_times[phase] for phase in BLOB_PHASES) <= phase_times["blob_update"]
+
+def test_profiling_does_not_change_the_run():
+    plain = Simulation(START_CONFIG, seed=2)
+    plain.populate()
+    plain.run(20)
+    profiled = Simulation(START_CONFIG, seed=2, profile=True)
+    profiled.populate()
+    profiled.run(20)
+    profiler_keys = set(profiled.statistics_log[0]) - set(plain.statistics_log[0])
+    assert [{key: value for key, value in statistics.items() if key not in profiler_keys} for statistics in profiled.statistics_log] == plain.statistics_log
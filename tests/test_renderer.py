@@ -0,0 +1,24 @@
+import os
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window needed
+pygame = pytest.importorskip("pygame")
+
+from renderer import PygameRenderer
+from simulator import Simulation, SIMULATION_START_CONFIG, FOOD_CONFIG, RED
+
+
+def test_food_mass_cells_are_drawn():
+    simulation = Simulation(dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=0, N_STARTING_FOOD=200),
+                            food_config=dict(FOOD_CONFIG, FOOD_MASS_MODE=True), seed=1)
+    simulation.populate()
+    renderer = PygameRenderer(400, 400, fps=1000, live_stats_display=False, arena_size=(simulation.width, simulation.height))
+    try:
+        renderer.on_step(simulation, simulation.collect_statistics())
+        surface = pygame.surfarray.pixels3d(renderer.screen)
+        red_pixels = int(((surface[:, :, 0] == RED[0]) & (surface[:, :, 1] == RED[1])).sum())
+        del surface # Unlocks the screen
+        assert red_pixels > 0
+        assert len(simulation.food_mass_records()) == len(simulation.food_mass.cells_with_food()[0]) > 0
+    finally:
+        renderer.on_finish(simulation)
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from simulator import SIMULATION_START_CONFIG, BLOB_CONFIG, FOOD_CONFIG
+from sharded_world import ShardedWorld, SharedBuffers, TileLayout, TileWorld
+from vectorized_world import VectorizedWorld, BLOB_FIELDS
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=400, N_STARTING_FOOD=1200)
+FOOD_SPAWN_CONFIG = dict(FOOD_CONFIG, FOOD_SPAWN_MODE="poisson", FOOD_SPAWN_RATE=5)
+
+
+def step_tiles(worlds, buffers):
+    '''One ShardedWorld frame, with the tiles stepped in this process'''
+    for world in worlds:
+        world.step()
+    for world in worlds:
+        world.publish(buffers)
+    for world in worlds:
+        world.collect(buffers)
+
+def start_tiles(layout, food_config, seed, blob_counts, food_counts):
+    worlds = [
+        TileWorld(tile, layout, START_CONFIG, BLOB_CONFIG, food_config, seed_sequence)
+        for tile, seed_sequence in enumerate(np.random.SeedSequence(seed).spawn(layout.tile_count))
+    ]
+    for world, n_blobs, n_foods in zip(worlds, blob_counts, food_counts):
+        world.populate_tile(n_blobs, n_foods)
+    return worlds
+
+class NoFoodSpawnWorld(VectorizedWorld):
+    def spawn_frame_food(self):
+        pass
+
+def test_single_tile_matches_vectorized_world():
+    food_config = dict(FOOD_CONFIG, FOOD_SPAWN_MODE="poisson", FOOD_SPAWN_RATE=0) # The two worlds draw spawns differently
+    layout = TileLayout(800, 800, 1, 1)
+    buffers = SharedBuffers(1, 64, 64)
+    try:
+        tile, = start_tiles(layout, food_config, 5, [400], [1200])
+        world = NoFoodSpawnWorld(START_CONFIG, BLOB_CONFIG, food_config, 800, 800, np.random.SeedSequence(5).spawn(1)[0])
+        world.populate()
+        for _ in range(200):
+            step_tiles([tile], buffers)
+            world.step()
+        assert tile.blob_count == world.blob_count and tile.num_offsprings == world.num_offsprings > 0
+        for field in BLOB_FIELDS:
+            np.testing.assert_array_equal(tile.blobs[field], world.blobs[field])
+    finally:
+        buffers.close(unlink=True)
+
+def test_tiles_conserve_blobs_and_ids():
+    layout = TileLayout(1500, 1000, 3, 2)
+    buffers = SharedBuffers(layout.tile_count, 100, 5000)
+    try:
+        worlds = start_tiles(layout, FOOD_SPAWN_CONFIG, 3, [100] * 6, [300] * 6)
+        migrants = 0
+        for _ in range(150):
+            for world in worlds:
+                world.step()
+            stepped = sum(world.blob_count for world in worlds)
+            for world in worlds:
+                world.publish(buffers)
+            migrants += int(buffers.migrant_offsets[:, -1].sum())
+            for world in worlds:
+                world.collect(buffers)
+            assert sum(world.blob_count for world in worlds) == stepped
+            ids = np.concatenate([world.blobs["id"] for world in worlds])
+            assert len(np.unique(ids)) == len(ids)
+        assert migrants > 0
+        for world in worlds: # Every blob ends up in the tile it stands in
+            assert ((world.blobs["x"] >= 0) & (world.blobs["x"] < world.width)).all()
+            assert ((world.blobs["y"] >= 0) & (world.blobs["y"] < world.height)).all()
+    finally:
+        buffers.close(unlink=True)
+
+def test_worker_processes_match_in_process_tiles():
+    world = ShardedWorld(START_CONFIG, BLOB_CONFIG, FOOD_SPAWN_CONFIG, 800, 800, tiles=(2, 1), seed=9)
+    try:
+        world.populate()
+        world.run(40)
+    finally:
+        world.close()
+
+    # Same seeding as ShardedWorld.populate
+    *tile_seeds, coordinator_seed = np.random.SeedSequence(9).spawn(world.tile_count + 1)
+    rng = np.random.default_rng(coordinator_seed)
+    area_fractions = [world.layout.area_fraction(tile) for tile in range(world.tile_count)]
+    blob_counts = rng.multinomial(START_CONFIG["N_STARTING_BLOB"], area_fractions)
+    food_counts = rng.multinomial(START_CONFIG["N_STARTING_FOOD"], area_fractions)
+    worlds = [TileWorld(tile, world.layout, START_CONFIG, BLOB_CONFIG, FOOD_SPAWN_CONFIG, seed) for tile, seed in enumerate(tile_seeds)]
+    replica = ShardedWorld(START_CONFIG, BLOB_CONFIG, FOOD_SPAWN_CONFIG, 800, 800, tiles=(2, 1), seed=9)
+    replica.buffers = SharedBuffers(world.tile_count, world.migration_capacity, world.ghost_capacity)
+    try:
+        for tile_world, n_blobs, n_foods in zip(worlds, blob_counts, food_counts):
+            tile_world.populate_tile(int(n_blobs), int(n_foods))
+        for tile_world in worlds:
+            tile_world.publish(replica.buffers)
+        for tile_world in worlds:
+            tile_world.collect(replica.buffers)
+        for frame in range(40):
+            step_tiles(worlds, replica.buffers)
+            replica.frame_count = frame
+            assert replica.collect_statistics() == world.statistics_log[frame]
+    finally:
+        replica.buffers.close(unlink=True)
+
+def test_unsupported_food_settings_are_rejected():
+    for change in ({"FOOD_MASS_MODE": True}, {"FOOD_DENSITY_MAP": [[1, 2], [3, 4]]}, {"FOOD_SPAWN_MODE": "sometimes"}):
+        with pytest.raises(ValueError):
+            ShardedWorld(food_config=dict(FOOD_CONFIG, **change))
+    assert "Poisson" in ShardedWorld(food_config=dict(FOOD_CONFIG, FOOD_SPAWN_MODE="chance")).food_config_note
+    assert ShardedWorld(food_config=FOOD_SPAWN_CONFIG).food_config_note is None
+
+def test_tiles_narrower_than_entities_are_rejected():
+    with pytest.raises(ValueError, match="twice the largest"):
+        ShardedWorld(width=100, height=100, tiles=(8, 1))
@@ -0,0 +1,71 @@
+import numpy as np
+from simulator import Simulation, SIMULATION_START_CONFIG, FOOD_CONFIG
+from snapshots import SnapshotReader, SnapshotWriter, blob_records, food_records
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=20, N_STARTING_FOOD=60)
+
+
+class RecordKeeper:
+    '''Keeps the records SnapshotWriter should have written, in memory'''
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.snapshots = {}
+
+    def on_step(self, simulation, statistics):
+        if simulation.frame_count % self.interval == 0:
+            self.snapshots[simulation.frame_count] = (blob_records(simulation.blobs), food_records(simulation.foods))
+
+    def on_finish(self, simulation):
+        pass
+
+def record_run(directory, interval=5, frames=200):
+    simulation = Simulation(START_CONFIG, seed=4)
+    simulation.populate()
+    keeper = RecordKeeper(interval)
+    simulation.attach(keeper)
+    simulation.attach(SnapshotWriter(directory, interval))
+    simulation.run(frames)
+    return keeper.snapshots
+
+def test_frames_read_back_as_written(tmp_path):
+    expected = record_run(str(tmp_path))
+    reader = SnapshotReader(str(tmp_path))
+    assert reader.frames.tolist() == sorted(expected)
+    for frame, (blobs, foods) in expected.items():
+        read_blobs, read_foods = reader.frame(frame)
+        np.testing.assert_array_equal(read_blobs, blobs)
+        np.testing.assert_array_equal(read_foods, foods)
+    frames, blobs = reader.blob_range(50, 100)
+    assert sorted(set(frames.tolist())) == [frame for frame in sorted(expected) if 50 <= frame < 100]
+    assert len(blobs) == sum(len(expected[frame][0]) for frame in set(frames.tolist()))
+
+def test_blob_history_matches_a_full_scan(tmp_path):
+    expected = record_run(str(tmp_path))
+    reader = SnapshotReader(str(tmp_path))
+    for blob_id in (1, 7, 20, 10 ** 6):
+        frames, records = reader.blob_history(blob_id)
+        scanned = [(frame, blobs[blobs["id"] == blob_id]) for frame, (blobs, _) in sorted(expected.items())]
+        scanned = [(frame, found[0]) for frame, found in scanned if len(found)]
+        assert frames.tolist() == [frame for frame, _ in scanned]
+        np.testing.assert_array_equal(records, np.array([record for _, record in scanned], dtype=records.dtype))
+
+class MassKeeper(RecordKeeper):
+    def on_step(self, simulation, statistics):
+        if simulation.frame_count % self.interval == 0:
+            self.snapshots[simulation.frame_count] = simulation.food_mass.mass.copy()
+
+def test_food_mass_cells_are_recorded(tmp_path):
+    simulation = Simulation(START_CONFIG, food_config=dict(FOOD_CONFIG, FOOD_MASS_MODE=True), seed=4)
+    simulation.populate()
+    keeper = MassKeeper(10)
+    simulation.attach(keeper)
+    simulation.attach(SnapshotWriter(str(tmp_path), 10))
+    simulation.run(50)
+    reader = SnapshotReader(str(tmp_path))
+    for frame, mass in keeper.snapshots.items():
+        _, foods = reader.frame(frame)
+        rows, cols = np.nonzero(mass)
+        assert foods["id"].tolist() == (rows * mass.shape[1] + cols).tolist()
+        assert foods["energy_value"].tolist() == mass[rows, cols].astype(int).tolist()
+        assert (foods["size"] >= 1).all()
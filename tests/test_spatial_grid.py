@@ -0,0 +1,32 @@
+import numpy as np
+from types import SimpleNamespace
+from simulator import find_closest_obj
+from spatial_grid import SpatialGrid
+
+
+def random_points(rng, n, low, high, first_id=1):
+    # Integer coordinates on a coarse lattice, so equal distances (ties) are common
+    return [SimpleNamespace(id=first_id + i, x=int(x), y=int(y)) for i, (x, y) in enumerate(rng.integers(low, high, (n, 2)) * 5)]
+
+def test_grid_matches_brute_force_including_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        foods = random_points(rng, int(rng.integers(2, 60)), -10, 50)
+        grid = SpatialGrid(int(rng.integers(5, 80)), 200, 200)
+        for food in rng.permutation(foods): # Insertion order must not matter
+            grid.insert(food)
+        for blob in random_points(rng, 20, -20, 60):
+            assert grid.find_closest(blob) is find_closest_obj(blob, foods)
+
+def test_grid_matches_brute_force_after_removals():
+    rng = np.random.default_rng(1)
+    foods = random_points(rng, 200, 0, 40)
+    grid = SpatialGrid(20, 200, 200)
+    for food in foods:
+        grid.insert(food)
+    for food in [foods[i] for i in rng.choice(len(foods), 150, replace=False)]:
+        grid.remove(food)
+        foods.remove(food)
+    assert len(grid) == len(foods)
+    for blob in random_points(rng, 100, -5, 45):
+        assert grid.find_closest(blob) is find_closest_obj(blob, foods)
@@ -0,0 +1,39 @@
+import csv
+import math
+import pytest
+from stats_writer import CsvStatsSink, NpyChunkStatsSink, load_npy_chunks, make_stats_sink
+
+FRAMES = [{"frame": frame, "blob_count": 100 - frame, "blob_avg_speed": frame / 3, "blob_min_energy": None if frame % 4 == 0 else frame}
+          for frame in range(10)]
+
+
+def write_frames(sink):
+    for statistics in FRAMES:
+        sink.write(statistics)
+    sink.close()
+
+def test_csv_sink_round_trip_across_chunks(tmp_path):
+    filename = str(tmp_path / "stats.csv")
+    write_frames(CsvStatsSink(filename, chunk_size=3))
+    with open(filename, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == len(FRAMES)
+    for row, statistics in zip(rows, FRAMES):
+        assert int(row["frame"]) == statistics["frame"]
+        assert float(row["blob_avg_speed"]) == statistics["blob_avg_speed"]
+        assert row["blob_min_energy"] == ("" if statistics["blob_min_energy"] is None else str(statistics["blob_min_energy"]))
+
+def test_npy_sink_round_trip_with_sampling(tmp_path):
+    directory = str(tmp_path / "stats")
+    sink = NpyChunkStatsSink(directory, chunk_size=2, sample_interval=3)
+    write_frames(sink)
+    columns = load_npy_chunks(directory)
+    sampled = FRAMES[::3]
+    assert sink.frames_written == len(sampled)
+    assert columns["frame"].tolist() == [statistics["frame"] for statistics in sampled]
+    for value, statistics in zip(columns["blob_min_energy"], sampled):
+        assert math.isnan(value) if statistics["blob_min_energy"] is None else value == statistics["blob_min_energy"]
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown statistics output format"):
+        make_stats_sink("xlsx", str(tmp_path / "stats"))
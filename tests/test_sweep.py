@@ -0,0 +1,33 @@
+import pytest
+from simulator import Simulation, food_energy_value
+from sweep import configs_for_point, point_id, run_settings
+
+
+def food_energies(point):
+    start_config, blob_config, food_config = configs_for_point(point)
+    simulation = Simulation(start_config, blob_config, food_config, keep_statistics_log=False, seed=1)
+    simulation.populate()
+    return [(food.size, food.energy_value) for food in simulation.foods]
+
+def test_swept_food_energy_multiplier_changes_food_energy():
+    for multiplier in (1, 12):
+        energies = food_energies({"FOOD_CONFIG.FOOD_ENERGY_TO_SIZE_MULTIPLIER": multiplier})
+        assert energies
+        assert all(energy == food_energy_value(size, multiplier) for size, energy in energies)
+
+def test_swept_food_energy_multiplier_reaches_batched_spawning():
+    energies = food_energies({"FOOD_CONFIG.FOOD_ENERGY_TO_SIZE_MULTIPLIER": 1, "FOOD_CONFIG.FOOD_SPAWN_MODE": "poisson"})
+    assert all(energy == food_energy_value(size, 1) for size, energy in energies)
+
+def test_unused_and_unknown_parameters_are_rejected():
+    with pytest.raises(KeyError, match="not used"):
+        configs_for_point({"BLOB_CONFIG.BLOB_MUTATION_CHANCE": 0.9})
+    with pytest.raises(KeyError, match="Unknown parameter"):
+        configs_for_point({"FOOD_CONFIG.NOT_A_KEY": 1})
+
+def test_point_id_changes_with_run_settings():
+    point = {"FOOD_CONFIG.FOOD_SPAWN_CHANCE_PER_FRAME": 0.4}
+    spec = {"seed": 1, "replicates": 10, "frames": 3000}
+    assert point_id(point, run_settings(spec)) == point_id(point, run_settings(dict(spec)))
+    for change in ({"seed": 2}, {"replicates": 5}, {"frames": 100}, {"stop_on_extinction": False}):
+        assert point_id(point, run_settings(dict(spec, **change))) != point_id(point, run_settings(spec))
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from trait_sampler import TraitSampler, truncated_normal
+
+STAT = {"mean": 20, "std_dev": 8, "min": 10, "max": 30}
+
+
+def test_truncated_normal_stays_inside_the_bounds():
+    rng = np.random.default_rng(0)
+    for mean, std_dev, low, high in ((0, 1, -0.5, 0.5), (100, 50, 0, 10), (5, 2, 5, 5.1), (20, 8, 10, 30)):
+        samples = truncated_normal(rng, mean, std_dev, low, high, 20000)
+        assert len(samples) == 20000
+        assert samples.min() >= low and samples.max() <= high
+
+def test_truncated_normal_matches_redrawing():
+    samples = truncated_normal(np.random.default_rng(1), 0, 1, -1, 2, 200000)
+    # Mean of a standard normal truncated to [-1, 2]: (pdf(-1) - pdf(2)) / (cdf(2) - cdf(-1))
+    assert samples.mean() == pytest.approx((0.24197 - 0.05399) / (0.97725 - 0.15866), abs=0.01)
+
+def test_degenerate_and_impossible_bounds():
+    rng = np.random.default_rng(2)
+    assert truncated_normal(rng, 3, 0, 1, 5, 4).tolist() == [3.0] * 4
+    with pytest.raises(ValueError):
+        truncated_normal(rng, 9, 0, 1, 5, 4)
+    with pytest.raises(ValueError):
+        truncated_normal(rng, 0, 1, 100, 101, 4)
+
+def test_sampler_draws_ints_inside_the_bounds():
+    sampler = TraitSampler(np.random.default_rng(3), block_size=64)
+    values = [sampler.draw(STAT) for _ in range(1000)] # Crosses several block refills
+    values += sampler.draw_many(STAT, 1000).tolist()
+    assert all(isinstance(value, int) for value in values)
+    assert min(values) >= STAT["min"] and max(values) <= STAT["max"]
+
+def test_sampler_is_reproducible_for_a_seed():
+    first, second = TraitSampler(np.random.default_rng(4)), TraitSampler(np.random.default_rng(4))
+    assert [first.draw(STAT) for _ in range(100)] == [second.draw(STAT) for _ in range(100)]
@@ -0,0 +1,34 @@
+import numpy as np
+from simulator import SIMULATION_START_CONFIG
+from vectorized_world import VectorizedWorld, brute_force_nearest, nearest_food_indices
+
+START_CONFIG = dict(SIMULATION_START_CONFIG, N_STARTING_BLOB=500, N_STARTING_FOOD=1500)
+
+
+def world_after(seed, frames=300):
+    world = VectorizedWorld(START_CONFIG, seed=seed)
+    world.populate()
+    for _ in range(frames):
+        world.step()
+    return world
+
+def test_nearest_food_indices_matches_brute_force():
+    rng = np.random.default_rng(2)
+    for _ in range(100):
+        width, height = rng.integers(50, 500, 2)
+        n_foods = int(rng.integers(1, 300))
+        # Positions partly outside the arena, on a lattice so ties happen
+        food_x, food_y = (rng.integers(-2, 12, (2, n_foods)) * np.array([[width], [height]]) // 10).astype(np.int64)
+        food_ids = rng.permutation(n_foods) + 1
+        blob_x, blob_y = rng.uniform(-20, max(width, height) + 20, (2, 200))
+        closest, distance = nearest_food_indices(blob_x, blob_y, food_x, food_y, food_ids, width, height)
+        expected_closest, expected_distance = brute_force_nearest(blob_x, blob_y, food_x, food_y, food_ids)
+        np.testing.assert_array_equal(closest, expected_closest)
+        np.testing.assert_array_equal(distance, expected_distance)
+
+def test_vectorized_world_replays_identically_for_a_seed():
+    world, replay = world_after(7), world_after(7)
+    assert world.statistics_log == replay.statistics_log
+    for field, values in world.blobs.items():
+        np.testing.assert_array_equal(values, replay.blobs[field])
+    assert world_after(8).statistics_log != world.statistics_log
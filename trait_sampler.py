@@ -0,0 +1,75 @@
+import math
+import numpy as np
+
+# Upper bound on candidates drawn in one rejection round, keeps memory bounded for huge or very tight requests
+MAX_CANDIDATES_PER_ROUND = 1 << 22
+
+
+def acceptance_probability(mean, std_dev, min, max):
+    '''Returns the probability that a normal(mean, std_dev) draw lands inside [min, max]'''
+    scale = std_dev * math.sqrt(2)
+    return 0.5 * (math.erf((max - mean) / scale) - math.erf((min - mean) / scale))
+
+def truncated_normal(rng, mean, std_dev, min, max, n):
+    '''
+    Returns n floats from normal(mean, std_dev) restricted to [min, max], the same distribution as
+    redrawing until a value lands inside the bounds. Candidates are drawn in vectorized rounds sized by
+    the acceptance probability, so tight bounds cost a few large draws instead of many scalar ones.
+    '''
+    if std_dev == 0:
+        if not (min <= mean <= max):
+            raise ValueError(f"mean {mean} outside [{min}, {max}] with std_dev 0")
+        return np.full(n, float(mean))
+
+    probability = acceptance_probability(mean, std_dev, min, max)
+    if probability <= 0:
+        raise ValueError(f"normal({mean}, {std_dev}) practically never lands inside [{min}, {max}]")
+
+    samples = np.empty(n)
+    filled = 0
+    while filled < n:
+        remaining = n - filled
+        n_candidates = int(remaining / probability * 1.2) + 16
+        if n_candidates > MAX_CANDIDATES_PER_ROUND:
+            n_candidates = MAX_CANDIDATES_PER_ROUND
+        candidates = rng.normal(mean, std_dev, n_candidates)
+        accepted = candidates[(candidates >= min) & (candidates <= max)][:remaining]
+        samples[filled:filled + len(accepted)] = accepted
+        filled += len(accepted)
+    return samples
+
+def stat_key(stat_dict):
+    '''Returns the (mean, std_dev, min, max) tuple of a normal stat config dict'''
+    return (stat_dict["mean"], stat_dict["std_dev"], stat_dict["min"], stat_dict["max"])
+
+class TraitSampler:
+    """
+    Buffered truncated normal sampler for normal stat config dicts ('mean', 'std_dev', 'min', 'max').
+    Draws normal values restricted to [min, max] and truncated to int. Values are generated in blocks of
+    block_size per distinct config from a seeded np.random.Generator and then served from a buffer, so a
+    single draw is a list lookup instead of a NumPy call.
+    """
+
+    def __init__(self, rng=None, block_size=1024):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.block_size = block_size
+        self.buffers = {}  # stat_key -> [list of pre-generated ints, position of the next unused value]
+
+    def refill(self, key):
+        buffer = truncated_normal(self.rng, *key, self.block_size).astype(np.int64).tolist()
+        self.buffers[key] = [buffer, 0]
+        return self.buffers[key]
+
+    def draw(self, stat_dict):
+        '''Returns one int drawn from the distribution stat_dict describes'''
+        key = stat_key(stat_dict)
+        entry = self.buffers.get(key)
+        if entry is None or entry[1] == len(entry[0]):
+            entry = self.refill(key)
+        value = entry[0][entry[1]]
+        entry[1] += 1
+        return value
+
+    def draw_many(self, stat_dict, n):
+        '''Returns an int64 array of n values (generated directly, bypassing the buffer)'''
+        return truncated_normal(self.rng, *stat_key(stat_dict), n).astype(np.int64)
@@ -0,0 +1,365 @@
+import numpy as np
+from simulator import SIMULATION_START_CONFIG, BLOB_CONFIG, FOOD_CONFIG, ARENA_WIDTH, ARENA_HEIGHT, food_energy_value
+from trait_sampler import truncated_normal, stat_key
+
+# Max number of blob-food distance pairs evaluated at once by brute_force_nearest (the reference nearest food search)
+BRUTE_FORCE_CHUNK_PAIRS = 4_000_000
+
+# Food grid cells are sized so that on average about this many foods share a cell
+FOODS_PER_GRID_CELL = 2
+
+# Blob attribute arrays, in the order they are stored/compacted/concatenated
+BLOB_FIELDS = ("id", "x", "y", "size", "speed", "energy", "required_reproduction_energy", "offspring_amount",
+               "constant_energy_cost", "movement_energy_cost")
+FOOD_FIELDS = ("id", "x", "y", "size", "energy_value")
+
+
+def sample_normal_stats(rng, stat_dict, n):
+    '''Returns n ints drawn like TraitSampler.draw (normal, restricted to [min, max], truncated to int)'''
+    return truncated_normal(rng, *stat_key(stat_dict), n).astype(np.int64)
+
+def energy_costs(sizes, speeds):
+    '''Returns the per-frame (constant, movement) energy cost arrays for blobs with these traits, like Blob'''
+    areas = np.pi * sizes ** 2
+    return np.round(areas / 200).astype(np.int64), np.round(areas * speeds / 200).astype(np.int64)
+
+def brute_force_nearest(blob_x, blob_y, food_x, food_y, food_ids):
+    '''Returns (index of closest food, distance to it) for every blob by checking every food, in chunks. Ties go to the lowest food id'''
+    indices = np.empty(len(blob_x), dtype=np.int64)
+    distances = np.empty(len(blob_x))
+    chunk = max(1, BRUTE_FORCE_CHUNK_PAIRS // max(1, len(food_x)))
+    for start in range(0, len(blob_x), chunk):
+        stop = start + chunk
+        squared = (blob_x[start:stop, None] - food_x[None, :]) ** 2 + (blob_y[start:stop, None] - food_y[None, :]) ** 2
+        closest_squared = squared.min(axis=1)
+        tied_ids = np.where(squared == closest_squared[:, None], food_ids[None, :], np.iinfo(np.int64).max)
+        chunk_indices = tied_ids.argmin(axis=1) # Lowest id among the foods at the closest distance
+        indices[start:stop] = chunk_indices
+        distances[start:stop] = np.sqrt(closest_squared)
+    return indices, distances
+
+def ring_offsets(ring):
+    '''Returns (x offsets, y offsets) of the cells at Chebyshev distance ring from a cell, like SpatialGrid.ring_cells'''
+    if ring == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    span = np.arange(-ring, ring + 1)
+    inner = np.arange(-ring + 1, ring)
+    offset_x = np.concatenate((span, span, np.full(len(inner), -ring), np.full(len(inner), ring)))
+    offset_y = np.concatenate((np.full(len(span), -ring), np.full(len(span), ring), inner, inner))
+    return offset_x, offset_y
+
+def nearest_food_indices(blob_x, blob_y, food_x, food_y, food_ids, width, height):
+    '''
+    Returns (index of closest food, distance to it) for every blob. Ties go to the lowest food id (like
+    SpatialGrid.find_closest), so the result is identical to brute_force_nearest.
+
+    Foods are bucketed into a uniform grid, sorted by cell so every cell is one contiguous run. Like
+    SpatialGrid, every blob searches ring by ring outward from its own cell, and is done once its best
+    candidate is closer than anything outside the rings searched so far can be. Each ring is one batched
+    pass over the blobs still searching: every (blob, food) pair in the ring's cells is gathered at once
+    (a segmented arange over the cell runs) and reduced to the best food per blob.
+    '''
+    n_blobs = len(blob_x)
+    cell_size = max(1.0, np.sqrt(width * height * FOODS_PER_GRID_CELL / len(food_x)))
+    n_cols = int(width // cell_size) + 1
+    n_rows = int(height // cell_size) + 1
+
+    # Sort foods by cell so each cell is a contiguous [start, start + count) run of food_order
+    food_cell_x = np.clip((food_x // cell_size).astype(np.int64), 0, n_cols - 1)
+    food_cell_y = np.clip((food_y // cell_size).astype(np.int64), 0, n_rows - 1)
+    food_cell = food_cell_y * n_cols + food_cell_x
+    food_order = np.argsort(food_cell, kind="stable")
+    cell_count = np.bincount(food_cell, minlength=n_cols * n_rows)
+    cell_start = np.concatenate(([0], np.cumsum(cell_count)[:-1]))
+
+    blob_cell_x = (blob_x // cell_size).astype(np.int64)
+    blob_cell_y = (blob_y // cell_size).astype(np.int64)
+    # Beyond this ring there are no grid cells left to search
+    last_ring = np.maximum.reduce([blob_cell_x, n_cols - 1 - blob_cell_x, blob_cell_y, n_rows - 1 - blob_cell_y, np.zeros(n_blobs, dtype=np.int64)])
+    indices = np.zeros(n_blobs, dtype=np.int64)
+    squared_distances = np.full(n_blobs, np.inf)
+    best_ids = np.full(n_blobs, np.iinfo(np.int64).max)
+
+    active = np.arange(n_blobs)
+    ring = 1 # Ring 0 alone can never settle a blob, so the first pass searches rings 0 and 1 together
+    while len(active):
+        offset_x, offset_y = ring_offsets(ring)
+        if ring == 1:
+            offset_x, offset_y = np.append(offset_x, 0), np.append(offset_y, 0)
+        cell_x = (blob_cell_x[active, None] + offset_x).ravel()
+        cell_y = (blob_cell_y[active, None] + offset_y).ravel()
+        in_grid = (cell_x >= 0) & (cell_x < n_cols) & (cell_y >= 0) & (cell_y < n_rows)
+        cell = cell_y[in_grid] * n_cols + cell_x[in_grid]
+        owner = np.repeat(active, len(offset_x))[in_grid]
+        count = cell_count[cell]
+
+        # One row per (blob, food in one of its ring cells). Pairs stay grouped by blob
+        pair_blob = np.repeat(owner, count)
+        if len(pair_blob):
+            run_offset = np.arange(len(pair_blob)) - np.repeat(np.cumsum(count) - count, count)
+            candidate = food_order[np.repeat(cell_start[cell], count) + run_offset]
+            squared = (blob_x[pair_blob] - food_x[candidate]) ** 2 + (blob_y[pair_blob] - food_y[candidate]) ** 2
+
+            # Best pair per blob: smallest distance, then lowest id
+            group_start = np.flatnonzero(np.concatenate(([True], pair_blob[1:] != pair_blob[:-1])))
+            group_size = np.diff(np.append(group_start, len(pair_blob)))
+            group_squared = np.minimum.reduceat(squared, group_start)
+            candidate_ids = np.where(squared == np.repeat(group_squared, group_size), food_ids[candidate], np.iinfo(np.int64).max)
+            group_id = np.minimum.reduceat(candidate_ids, group_start)
+            winner = candidate_ids == np.repeat(group_id, group_size)
+            group_blob = pair_blob[group_start]
+
+            better = (group_squared < squared_distances[group_blob]) | (
+                (group_squared == squared_distances[group_blob]) & (group_id < best_ids[group_blob]))
+            improved = group_blob[better]
+            indices[improved] = candidate[winner][better]
+            squared_distances[improved] = group_squared[better]
+            best_ids[improved] = group_id[better]
+
+        # Everything outside rings 0..ring is at least ring * cell_size away
+        done = (np.sqrt(squared_distances[active]) < ring * cell_size) | (ring >= last_ring[active])
+        active = active[~done]
+        ring += 1
+
+    return indices, np.sqrt(squared_distances)
+
+class VectorizedWorld:
+    """
+    Structure-of-arrays alternative to Simulation. Every blob and food attribute lives in its own
+    contiguous NumPy array and a frame is computed with batched array operations instead of per-object
+    method calls, so very large populations (10^5 blobs) can be stepped quickly.
+
+    Per frame the rules follow Simulation.step: constant energy drain, then every blob either eats the
+    closest food it is touching or moves speed units towards it and pays movement energy, then blobs at
+    or below 0 energy die and blobs with enough energy reproduce.
+
+    Conflict resolution: all blobs act on the same start-of-frame food state. If several blobs touch the
+    same closest food, the one that comes first in this frame's random priority order (the equivalent of
+    Simulation's random.shuffle) eats it. The others stay where they are for the frame and pay no
+    movement energy, as they were already touching food.
+
+    Subclasses (sharded_world.TileWorld) hook in through issue_blob_ids/issue_food_ids,
+    offspring_positions, spawn_frame_food and visible_foods.
+    """
+
+    def __init__(self, start_config=SIMULATION_START_CONFIG, blob_config=BLOB_CONFIG, food_config=FOOD_CONFIG,
+                 width=ARENA_WIDTH, height=ARENA_HEIGHT, seed=None):
+        self.start_config = start_config
+        self.blob_config = blob_config
+        self.food_config = food_config
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+
+        self.blobs = {field: np.empty(0, dtype=np.float64 if field in ("x", "y") else np.int64) for field in BLOB_FIELDS}
+        self.foods = {field: np.empty(0, dtype=np.int64) for field in FOOD_FIELDS}
+        self.next_blob_id = 1
+        self.next_food_id = 1
+
+        # Food energy by size, from the same cache Food uses (sizes never leave the configured range)
+        food_sizes = range(food_config["FOOD_SIZE"]["min"], food_config["FOOD_SIZE"]["max"] + 1)
+        self.food_energy_table = np.array([food_energy_value(size, food_config["FOOD_ENERGY_TO_SIZE_MULTIPLIER"]) for size in food_sizes],
+                                          dtype=np.int64)
+
+        self.num_offsprings = 0
+        self.num_mutations = 0
+        self.frame_count = 0
+        self.statistics_log = []
+
+    @property
+    def blob_count(self):
+        return len(self.blobs["id"])
+
+    @property
+    def food_count(self):
+        return len(self.foods["id"])
+
+    def populate(self):
+        """Creates the starting foods and blobs from start_config."""
+        self.spawn_food(self.start_config["N_STARTING_FOOD"])
+        self.spawn_blobs(self.start_config["N_STARTING_BLOB"])
+
+    def random_positions(self, sizes):
+        '''Returns integer (x, y) arrays placing circles of the given sizes fully inside the arena'''
+        x = self.rng.integers(sizes, self.width - sizes, endpoint=True)
+        y = self.rng.integers(sizes, self.height - sizes, endpoint=True)
+        return x, y
+
+    def offspring_positions(self, sizes):
+        '''Returns (x, y) arrays for newborn blobs of the given sizes'''
+        return self.random_positions(sizes)
+
+    def issue_blob_ids(self, n):
+        ids = np.arange(self.next_blob_id, self.next_blob_id + n)
+        self.next_blob_id += n
+        return ids
+
+    def issue_food_ids(self, n):
+        ids = np.arange(self.next_food_id, self.next_food_id + n)
+        self.next_food_id += n
+        return ids
+
+    def spawn_food(self, n):
+        sizes = sample_normal_stats(self.rng, self.food_config["FOOD_SIZE"], n)
+        x, y = self.random_positions(sizes)
+        new_foods = {
+            "id": self.issue_food_ids(n),
+            "x": x,
+            "y": y,
+            "size": sizes,
+            "energy_value": self.food_energy_table[sizes - self.food_config["FOOD_SIZE"]["min"]]
+        }
+        self.append(self.foods, new_foods)
+
+    def spawn_blobs(self, n):
+        blob_config = self.blob_config
+        sizes = sample_normal_stats(self.rng, blob_config["BLOB_SIZE"], n)
+        x, y = self.random_positions(sizes)
+        speeds = sample_normal_stats(self.rng, blob_config["BLOB_SPEED"], n)
+        new_blobs = {
+            "id": self.issue_blob_ids(n),
+            "x": x.astype(np.float64),
+            "y": y.astype(np.float64),
+            "size": sizes,
+            "speed": speeds,
+            "energy": sample_normal_stats(self.rng, blob_config["BLOB_START_ENERGY"], n),
+            "required_reproduction_energy": sample_normal_stats(self.rng, blob_config["BLOB_REPRODUCTION"]["required_energy"], n),
+            "offspring_amount": sample_normal_stats(self.rng, blob_config["BLOB_REPRODUCTION"]["offspring_amount"], n)
+        }
+        new_blobs["constant_energy_cost"], new_blobs["movement_energy_cost"] = energy_costs(sizes, speeds)
+        self.append(self.blobs, new_blobs)
+
+    def append(self, arrays, new_arrays):
+        for field, values in new_arrays.items():
+            arrays[field] = np.concatenate((arrays[field], values.astype(arrays[field].dtype, copy=False)))
+
+    def keep(self, arrays, mask):
+        '''Compacts every array in arrays down to the entries where mask is True'''
+        for field in arrays:
+            arrays[field] = arrays[field][mask]
+
+    def mutate(self, values, stat_dict):
+        '''Returns values where each entry is redrawn from stat_dict with the blob mutation chance'''
+        mutated = self.rng.random(len(values)) < self.blob_config["BLOB_REPRODUCTION"]["mutation_chance"]
+        n_mutated = int(mutated.sum())
+        if n_mutated:
+            values = values.copy()
+            values[mutated] = sample_normal_stats(self.rng, stat_dict, n_mutated)
+            self.num_mutations += n_mutated
+        return values
+
+    def reproduce(self, parents):
+        '''Subtracts reproduction energy from the parent indices and appends their (possibly mutated) offspring'''
+        blobs = self.blobs
+        blob_config = self.blob_config
+        blobs["energy"][parents] -= blobs["required_reproduction_energy"][parents]
+
+        # One row per offspring, copied from its parent
+        parent_rows = np.repeat(parents, blobs["offspring_amount"][parents])
+        n = len(parent_rows)
+        if n == 0:
+            return
+
+        sizes = self.mutate(blobs["size"][parent_rows], blob_config["BLOB_SIZE"])
+        x, y = self.offspring_positions(sizes)
+        speeds = self.mutate(blobs["speed"][parent_rows], blob_config["BLOB_SPEED"])
+        offspring = {
+            "id": self.issue_blob_ids(n),
+            "x": x.astype(np.float64),
+            "y": y.astype(np.float64),
+            "size": sizes,
+            "speed": speeds,
+            "energy": np.full(n, blob_config["BLOB_START_ENERGY"]["mean"]),  # Reset energy for new blobs
+            "required_reproduction_energy": self.mutate(blobs["required_reproduction_energy"][parent_rows],
+                                                        blob_config["BLOB_REPRODUCTION"]["required_energy"]),
+            "offspring_amount": self.mutate(blobs["offspring_amount"][parent_rows],
+                                            blob_config["BLOB_REPRODUCTION"]["offspring_amount"])
+        }
+        # Offspring inherit their parent's energy costs, only the ones with a mutated size or speed get them recomputed
+        constant_costs = blobs["constant_energy_cost"][parent_rows]
+        movement_costs = blobs["movement_energy_cost"][parent_rows]
+        changed = (sizes != blobs["size"][parent_rows]) | (speeds != blobs["speed"][parent_rows])
+        if changed.any():
+            constant_costs[changed], movement_costs[changed] = energy_costs(sizes[changed], speeds[changed])
+        offspring["constant_energy_cost"] = constant_costs
+        offspring["movement_energy_cost"] = movement_costs
+        self.num_offsprings += n
+        self.append(blobs, offspring)
+
+    def collect_statistics(self):
+        '''Returns the same statistics dict as Simulation.collect_statistics'''
+        blobs = self.blobs
+        statistics = {"frame": self.frame_count, "blob_count": self.blob_count}
+        for attribute in ("speed", "size", "energy"):
+            values = blobs[attribute]
+            statistics[f"blob_avg_{attribute}"] = float(values.mean()) if len(values) else 0
+            statistics[f"blob_min_{attribute}"] = int(values.min()) if len(values) else None
+            statistics[f"blob_max_{attribute}"] = int(values.max()) if len(values) else None
+        statistics["food_count"] = self.food_count
+        statistics["num_offsprings"] = self.num_offsprings
+        statistics["num_mutations"] = self.num_mutations
+        return statistics
+
+    def spawn_frame_food(self):
+        # CHANCE OF FOOD SPAWNING
+        if self.rng.random() < self.food_config["FOOD_SPAWN_CHANCE_PER_FRAME"]:
+            self.spawn_food(1)
+
+    def visible_foods(self):
+        '''Returns the (id, x, y, size) arrays of the foods blobs can head for. The first food_count are this world's own foods'''
+        return self.foods["id"], self.foods["x"], self.foods["y"], self.foods["size"]
+
+    def step(self):
+        """Advances the world by one frame and returns that frame's statistics dict."""
+        blobs = self.blobs
+        foods = self.foods
+
+        self.spawn_frame_food()
+
+        blobs["energy"] -= blobs["constant_energy_cost"] # constant energy, same as Blob.use_constant_energy
+
+        food_ids, food_x, food_y, food_size = self.visible_foods()
+        if self.blob_count and len(food_x):
+            closest, distance = nearest_food_indices(blobs["x"], blobs["y"], food_x, food_y, food_ids, self.width, self.height)
+            touching = distance <= blobs["size"] + food_size[closest]
+            if len(food_x) > self.food_count: # Foods owned by someone else can be headed for, but not eaten
+                touching &= closest < self.food_count
+
+            # Resolve contested food: among blobs touching the same food, the lowest random priority eats it
+            eaters = np.flatnonzero(touching)
+            priority = self.rng.random(len(eaters))
+            order = np.lexsort((priority, closest[eaters]))
+            eaten_food, first = np.unique(closest[eaters][order], return_index=True)
+            winners = eaters[order][first]
+            blobs["energy"][winners] += foods["energy_value"][eaten_food]
+
+            # Everyone not touching food moves towards their closest food. A blob sitting exactly on a food
+            # it may not eat (owned by another tile) has no direction to move in and stays where it is
+            movers = np.flatnonzero(~touching & (distance > 0))
+            target = closest[movers]
+            dx = food_x[target] - blobs["x"][movers]
+            dy = food_y[target] - blobs["y"][movers]
+            step_scale = blobs["speed"][movers] / distance[movers]
+            blobs["x"][movers] += dx * step_scale
+            blobs["y"][movers] += dy * step_scale
+            blobs["energy"][movers] -= blobs["movement_energy_cost"][movers] # Blob.use_energy_for_movement
+
+            food_alive = np.ones(self.food_count, dtype=bool)
+            food_alive[eaten_food] = False
+            self.keep(foods, food_alive)
+
+        # Blob no longer has energy, so it will perish
+        self.keep(blobs, blobs["energy"] > 0)
+
+        ready = blobs["energy"] >= blobs["required_reproduction_energy"] + self.blob_config["BLOB_REPRODUCTION"]["excess_energy_required"]
+        self.reproduce(np.flatnonzero(ready))
+
+        statistics = self.collect_statistics()
+        self.statistics_log.append(statistics)
+        self.frame_count += 1
+        return statistics
+
+    def run(self, max_frames):
+        """Steps max_frames frames, stopping early if every blob has died."""
+        while self.frame_count < max_frames and self.blob_count:
+            self.step()
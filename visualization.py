@@ -1,106 +1,292 @@
+import argparse
+import json
+import os
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from stats_writer import load_npy_chunks
 
-def plot_overlapping_attributes(csv_filename, attributes):
+DEFAULT_ATTRIBUTES = ['blob_count', 'blob_avg_speed', 'blob_avg_size', 'blob_avg_energy', 'food_count', 'num_offsprings']
+# Points per plotted line. Longer series are reduced with min/max decimation, which keeps every spike visible
+DEFAULT_MAX_POINTS = 4000
+CACHE_SUFFIX = ".columns" # Sidecar directory next to a statistics file with one .npy per column already loaded
+
+
+def source_signature(filename):
+    '''Size and modification time of a statistics file (or chunk directory), a cache is only valid for the same signature'''
+    stat = os.stat(filename)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+def read_columns(filename, columns):
+    '''Reads only the given columns from a statistics file (CSV, Parquet or NpyChunkStatsSink directory) as float arrays'''
+    if os.path.isdir(filename):
+        data = load_npy_chunks(filename)
+        return {column: data[column].astype(np.float64) for column in columns}
+    if filename.endswith(".parquet"):
+        frame = pd.read_parquet(filename, columns=columns)
+    else:
+        frame = pd.read_csv(filename, usecols=columns)
+    return {column: frame[column].to_numpy(dtype=np.float64) for column in columns}
+
+def available_columns(filename):
+    if os.path.isdir(filename):
+        return list(load_npy_chunks(filename))
+    if filename.endswith(".parquet"):
+        import pyarrow.parquet as pq # Only here when pandas can read parquet at all
+        return pq.read_schema(filename).names
+    return pd.read_csv(filename, nrows=0).columns.tolist()
+
+def load_columns(filename, columns, use_cache=True):
+    """
+    Returns {column: float64 array} for the requested columns of a statistics file, ignoring columns
+    the file does not have (with a warning).
+
+    Every column read from the file is stored in a sidecar directory (filename + CACHE_SUFFIX) as a
+    .npy file, so later calls, also for other plots, only read columns they have not seen yet. The
+    cache is dropped automatically when the statistics file changes.
+    """
+    cache_directory = filename.rstrip("/\\") + CACHE_SUFFIX
+    signature_filename = os.path.join(cache_directory, "source.json")
+    signature = source_signature(filename)
+
+    cached = set()
+    if use_cache and os.path.exists(signature_filename):
+        with open(signature_filename) as file:
+            if json.load(file) == signature:
+                cached = {name[:-4] for name in os.listdir(cache_directory) if name.endswith(".npy")}
+
+    missing = [column for column in columns if column not in cached]
+    if missing:
+        existing = set(available_columns(filename))
+        invalid = [column for column in missing if column not in existing]
+        if invalid:
+            print(f"Warning: These attributes were not found in {filename} and will be skipped: {invalid}")
+        missing = [column for column in missing if column in existing]
+
+    data = read_columns(filename, missing) if missing else {}
+    if use_cache and data:
+        os.makedirs(cache_directory, exist_ok=True)
+        if not cached: # New or outdated cache, start over
+            for name in os.listdir(cache_directory):
+                os.remove(os.path.join(cache_directory, name))
+            with open(signature_filename, "w") as file:
+                json.dump(signature, file)
+        for column, values in data.items():
+            np.save(os.path.join(cache_directory, column + ".npy"), values)
+
+    for column in columns:
+        if column in cached:
+            data[column] = np.load(os.path.join(cache_directory, column + ".npy"), mmap_mode="r")
+    return data
+
+def minmax_decimate(x, y, max_points=DEFAULT_MAX_POINTS):
     """
-    Reads the simulation CSV file and plots multiple attributes on the same line chart 
-    with normalized values (0 to 1) for better comparison.
+    Returns (x, y) reduced to at most max_points points: the series is split into max_points / 2
+    equal buckets and only the minimum and maximum of each bucket are kept, in their original order.
+    Unlike plain striding this never hides a peak or a dip.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.asarray(x), np.asarray(y)
+
+    bucket_size = -(-n // (max_points // 2))
+    n_buckets = -(-n // bucket_size)
+    padded = np.pad(np.asarray(y, dtype=np.float64), (0, n_buckets * bucket_size - n), mode="edge").reshape(n_buckets, bucket_size)
+    has_value = ~np.isnan(padded)
+    lowest = np.argmin(np.where(has_value, padded, np.inf), axis=1) # All-NaN buckets pick their first (NaN) point, a gap
+    highest = np.argmax(np.where(has_value, padded, -np.inf), axis=1)
+
+    starts = np.arange(n_buckets) * bucket_size
+    positions = np.stack((np.minimum(lowest, highest), np.maximum(lowest, highest)), axis=1) + starts[:, None]
+    positions = np.minimum(positions.ravel(), n - 1)
+    return np.asarray(x)[positions], np.asarray(y)[positions]
+
+def envelope_decimate(x, lower, middle, upper, max_points=DEFAULT_MAX_POINTS):
+    '''Reduces a band to at most max_points buckets: bucket minimum of lower, mean of middle and maximum of upper'''
+    n = len(middle)
+    if n <= max_points:
+        return x, lower, middle, upper
+    edges = np.linspace(0, n, max_points + 1).astype(np.int64)[:-1]
+    with np.errstate(invalid="ignore"):
+        counts = np.add.reduceat(~np.isnan(middle), edges)
+        middle = np.add.reduceat(np.nan_to_num(middle), edges) / np.where(counts, counts, np.nan)
+    return (
+        np.asarray(x)[edges],
+        np.fmin.reduceat(lower, edges),
+        middle,
+        np.fmax.reduceat(upper, edges)
+    )
+
+def normalize(values):
+    '''Min-Max scales values to 0..1 (all 0 if they are constant)'''
+    min_val = np.nanmin(values)
+    max_val = np.nanmax(values)
+    if max_val != min_val:  # Avoid division by zero
+        return (values - min_val) / (max_val - min_val)
+    return np.zeros_like(values)
+
+def new_figure(figsize, output):
+    '''Returns a figure that is written to output headlessly, or a pyplot window figure when output is None'''
+    if output:
+        return Figure(figsize=figsize)
+    import matplotlib.pyplot as plt # Only needed (and only needs a display) when showing a window
+    return plt.figure(figsize=figsize)
+
+def finish_figure(figure, output):
+    '''Saves figure to output, or shows it in a window when output is None'''
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        figure.savefig(output, dpi=120, bbox_inches="tight")
+        print(f"Figure saved to {output}")
+    else:
+        import matplotlib.pyplot as plt
+        plt.show()
+
+def plot_overlapping_attributes(csv_filename, attributes, output=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Plots multiple attributes of one statistics file on the same line chart, with normalized values
+    (0 to 1) for better comparison.
 
     Parameters:
-    - csv_filename: The name of the CSV file generated from the simulation.
+    - csv_filename: The statistics file generated from the simulation (CSV, Parquet or npy chunk directory).
     - attributes: A list of column names to plot.
+    - output: Image file to write the chart to. None shows it in a window instead.
+    - max_points: Points per line, longer series are min/max decimated.
     """
-    try:
-        # Load CSV data
-        df = pd.read_csv(csv_filename)
-
-        # Validate attributes
-        available_attributes = df.columns.tolist()
-        valid_attributes = [attr for attr in attributes if attr in available_attributes]
-        invalid_attributes = [attr for attr in attributes if attr not in available_attributes]
-
-        if invalid_attributes:
-            print(f"Warning: These attributes were not found and will be skipped: {invalid_attributes}")
-
-        if not valid_attributes:
-            print("No valid attributes selected. Available columns:", available_attributes)
-            return
-
-        # Normalize the selected attributes using Min-Max Scaling (0 to 1)
-        normalized_df = df.copy()
-        for attribute in valid_attributes:
-            min_val = df[attribute].min()
-            max_val = df[attribute].max()
-            if max_val != min_val:  # Avoid division by zero
-                normalized_df[attribute] = (df[attribute] - min_val) / (max_val - min_val)
-            else:
-                normalized_df[attribute] = 0  # If all values are the same, set them to 0
-
-        # Create figure
-        plt.figure(figsize=(12, 6))
-
-        # Plot each valid attribute as a separate line (normalized)
-        for attribute in valid_attributes:
-            plt.plot(df["frame"], normalized_df[attribute], label=attribute, linestyle="-", marker="o", alpha=0.8)
-
-        # Labels and title
-        plt.xlabel("Frame (Time Step)")
-        plt.ylabel("Normalized Value (0 to 1)")
-        plt.title("Simulation Statistics Over Time (Normalized for Comparison)")
-        plt.legend()
-        plt.grid(True)
-
-        # Show the plot
-        plt.show()
+    data = load_columns(csv_filename, ["frame"] + list(attributes))
+    valid_attributes = [attribute for attribute in attributes if attribute in data]
+    if not valid_attributes:
+        print("No valid attributes selected. Available columns:", available_columns(csv_filename))
+        return
+
+    figure = new_figure((12, 6), output)
+    axes = figure.add_subplot()
+    for attribute in valid_attributes:
+        axes.plot(*minmax_decimate(data["frame"], normalize(data[attribute]), max_points), label=attribute, linewidth=1, alpha=0.8)
 
-    except Exception as e:
-        print(f"Error reading CSV file: {e}")
-        
-        
-def plot_multiple_attributes(csv_filename, attributes):
+    axes.set_xlabel("Frame (Time Step)")
+    axes.set_ylabel("Normalized Value (0 to 1)")
+    axes.set_title("Simulation Statistics Over Time (Normalized for Comparison)")
+    axes.legend()
+    axes.grid(True)
+    finish_figure(figure, output)
+
+def plot_multiple_attributes(csv_filename, attributes, output=None, max_points=DEFAULT_MAX_POINTS):
     """
-    Reads the simulation CSV file and plots multiple attributes over time in separate charts.
+    Plots multiple attributes of one statistics file over time, one chart per attribute, all in one figure.
 
     Parameters:
-    - csv_filename: The name of the CSV file generated from the simulation.
+    - csv_filename: The statistics file generated from the simulation (CSV, Parquet or npy chunk directory).
     - attributes: A list of column names to plot.
+    - output: Image file to write the charts to. None shows them in a window instead.
+    - max_points: Points per line, longer series are min/max decimated.
+    """
+    data = load_columns(csv_filename, ["frame"] + list(attributes))
+    valid_attributes = [attribute for attribute in attributes if attribute in data]
+    if not valid_attributes:
+        print("No valid attributes selected. Available columns:", available_columns(csv_filename))
+        return
+
+    figure = new_figure((10, 3 * len(valid_attributes)), output)
+    for index, attribute in enumerate(valid_attributes):
+        axes = figure.add_subplot(len(valid_attributes), 1, index + 1)
+        axes.plot(*minmax_decimate(data["frame"], data[attribute], max_points), label=attribute, linewidth=1)
+        axes.set_xlabel("Frame (Time Step)")
+        axes.set_ylabel(attribute.replace("_", " ").title())  # Make label readable
+        axes.set_title(f"{attribute.replace('_', ' ').title()} Over Time")
+        axes.grid(True)
+    figure.tight_layout()
+    finish_figure(figure, output)
+
+def replicate_matrix(filenames, attribute):
+    '''Returns (frames, values) with one row per replicate file, aligned on frame. Frames a replicate did not reach are NaN'''
+    runs = [load_columns(filename, ["frame", attribute]) for filename in filenames]
+    runs = [run for run in runs if attribute in run]
+    if not runs:
+        return None, None
+    frames = np.unique(np.concatenate([run["frame"] for run in runs]))
+    values = np.full((len(runs), len(frames)), np.nan)
+    for row, run in zip(values, runs):
+        row[np.searchsorted(frames, run["frame"])] = run[attribute]
+    return frames, values
+
+def plot_replicates(filenames, attributes, output=None, band="quantile", max_points=DEFAULT_MAX_POINTS, show_runs=True):
     """
-    try:
-        # Load CSV data
-        df = pd.read_csv(csv_filename)
-
-        # Validate attributes
-        available_attributes = df.columns.tolist()
-        valid_attributes = [attr for attr in attributes if attr in available_attributes]
-        invalid_attributes = [attr for attr in attributes if attr not in available_attributes]
-
-        if invalid_attributes:
-            print(f"Warning: These attributes were not found and will be skipped: {invalid_attributes}")
-
-        if not valid_attributes:
-            print("No valid attributes selected. Available columns:", available_attributes)
-            return
-
-        # Plot each valid attribute separately
-        for attribute in valid_attributes:
-            plt.figure(figsize=(10, 5))
-            plt.plot(df["frame"], df[attribute], label=attribute, linestyle="-", marker="o")
-
-            # Labels and title
-            plt.xlabel("Frame (Time Step)")
-            plt.ylabel(attribute.replace("_", " ").title())  # Make label readable
-            plt.title(f"{attribute.replace('_', ' ').title()} Over Time")
-            plt.legend()
-            plt.grid(True)
-
-            # Show the plot for each attribute
-            plt.show()
-
-    except Exception as e:
-        print(f"Error reading CSV file: {e}")
-        
-csv_file = "data\simulation_stats_20250312_211257.csv"  # Replace with actual filename
-attributes_to_plot = ['blob_count', 'blob_avg_speed','blob_avg_size','blob_avg_energy','food_count', 'num_offspring']  # List of attributes to visualize
-
-plot_multiple_attributes(csv_file, attributes_to_plot)
-plot_overlapping_attributes(csv_file, attributes_to_plot)
\ No newline at end of file
+    Overlays many replicate runs (one statistics file each) per attribute: every run as a faint line,
+    their mean, and a confidence band (5%-95% quantiles with band="quantile", mean +- one standard
+    deviation with band="std"). Runs are aligned on frame, runs that stopped early only count while
+    they ran.
+    """
+    figure = new_figure((10, 3 * len(attributes)), output)
+    for index, attribute in enumerate(attributes):
+        frames, values = replicate_matrix(filenames, attribute)
+        axes = figure.add_subplot(len(attributes), 1, index + 1)
+        axes.set_title(f"{attribute.replace('_', ' ').title()} Over Time ({len(filenames)} runs)")
+        if frames is None:
+            continue
+
+        if show_runs:
+            for row in values:
+                axes.plot(*minmax_decimate(frames, row, max_points), color="gray", linewidth=0.5, alpha=0.3)
+
+        running = ~np.isnan(values).all(axis=0) # Frames at least one replicate reached with a value
+        values = values[:, running]
+        mean = np.nanmean(values, axis=0)
+        if band == "std":
+            spread = np.nanstd(values, axis=0)
+            lower, upper = mean - spread, mean + spread
+        else:
+            lower, upper = np.nanquantile(values, [0.05, 0.95], axis=0)
+
+        x, lower, mean, upper = envelope_decimate(frames[running], lower, mean, upper, max_points)
+        axes.fill_between(x, lower, upper, alpha=0.3, label="5%-95%" if band != "std" else "mean +- std")
+        axes.plot(x, mean, linewidth=1.5, label="mean")
+        axes.set_xlabel("Frame (Time Step)")
+        axes.set_ylabel(attribute.replace("_", " ").title())
+        axes.legend()
+        axes.grid(True)
+    figure.tight_layout()
+    finish_figure(figure, output)
+
+def plot_batch_summary(csv_filename, attributes, output=None, max_points=DEFAULT_MAX_POINTS):
+    '''Plots mean and 5%-95% band per attribute from an aggregated batch_runner CSV (<attribute>_mean, _q05, _q95 columns)'''
+    columns = ["frame"] + [f"{attribute}_{suffix}" for attribute in attributes for suffix in ("mean", "q05", "q95")]
+    data = load_columns(csv_filename, columns)
+    valid_attributes = [attribute for attribute in attributes if f"{attribute}_mean" in data]
+
+    figure = new_figure((10, 3 * max(1, len(valid_attributes))), output)
+    for index, attribute in enumerate(valid_attributes):
+        axes = figure.add_subplot(len(valid_attributes), 1, index + 1)
+        x, lower, mean, upper = envelope_decimate(data["frame"], data[f"{attribute}_q05"], data[f"{attribute}_mean"],
+                                                  data[f"{attribute}_q95"], max_points)
+        axes.fill_between(x, lower, upper, alpha=0.3, label="5%-95%")
+        axes.plot(x, mean, linewidth=1.5, label="mean")
+        axes.set_title(f"{attribute.replace('_', ' ').title()} Over Time")
+        axes.set_xlabel("Frame (Time Step)")
+        axes.grid(True)
+        axes.legend()
+    figure.tight_layout()
+    finish_figure(figure, output)
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot simulation statistics. One file plots its attributes, several files are overlaid as replicates.")
+    parser.add_argument("files", nargs="+", help="Statistics files (CSV, Parquet or npy chunk directories)")
+    parser.add_argument("--attributes", nargs="+", default=DEFAULT_ATTRIBUTES)
+    parser.add_argument("--output", help="Image file to write (e.g. plot.png). Without it the figure is shown in a window")
+    parser.add_argument("--overlap", action="store_true", help="One chart with all attributes normalized to 0..1")
+    parser.add_argument("--batch", action="store_true", help="The file is an aggregated batch_runner CSV")
+    parser.add_argument("--band", choices=("quantile", "std"), default="quantile", help="Confidence band for replicates")
+    parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS, help="Points per plotted line")
+    args = parser.parse_args()
+
+    if args.batch:
+        plot_batch_summary(args.files[0], args.attributes, args.output, args.max_points)
+    elif len(args.files) > 1:
+        plot_replicates(args.files, args.attributes, args.output, args.band, args.max_points)
+    elif args.overlap:
+        plot_overlapping_attributes(args.files[0], args.attributes, args.output, args.max_points)
+    else:
+        plot_multiple_attributes(args.files[0], args.attributes, args.output, args.max_points)
+
+if __name__ == "__main__":
+    main()